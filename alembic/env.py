@@ -5,8 +5,9 @@ from sqlalchemy import pool
 
 from alembic import context
 
-from repositories.user_repository import Base as UserBase
-from repositories.contact_repository import Base as ContactBase
+from repositories.database import Base
+import repositories.user_repository  # noqa: F401
+import repositories.contact_repository  # noqa: F401
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -21,7 +22,7 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
-target_metadata = [UserBase.metadata, ContactBase.metadata]
+target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -0,0 +1,35 @@
+"""Add contact trigram search indexes
+
+Revision ID: 1d7b343b2b81
+Revises: 90f13bf869d4
+Create Date: 2026-10-17 11:03:27.604918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1d7b343b2b81'
+down_revision: Union[str, None] = '90f13bf869d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_contacts_first_name_trgm', 'contacts', ['first_name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'first_name': 'gin_trgm_ops'})
+    op.create_index('ix_contacts_last_name_trgm', 'contacts', ['last_name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'last_name': 'gin_trgm_ops'})
+    op.create_index('ix_contacts_email_trgm', 'contacts', ['email'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_email_trgm', table_name='contacts')
+    op.drop_index('ix_contacts_last_name_trgm', table_name='contacts')
+    op.drop_index('ix_contacts_first_name_trgm', table_name='contacts')
+    # The pg_trgm extension is left installed: other objects in the database may depend on it.
@@ -0,0 +1,30 @@
+"""Add contact keyset pagination indexes
+
+Revision ID: 90f13bf869d4
+Revises: 25f98c864eb0
+Create Date: 2026-10-17 10:12:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '90f13bf869d4'
+down_revision: Union[str, None] = '25f98c864eb0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_contacts_user_id_id', 'contacts', ['user_id', 'id'], unique=False)
+    op.create_index('ix_contacts_user_id_last_name_id', 'contacts', ['user_id', 'last_name', 'id'], unique=False)
+    op.create_index('ix_contacts_user_id_birthday_id', 'contacts', ['user_id', 'birthday', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_birthday_id', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_last_name_id', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_id', table_name='contacts')
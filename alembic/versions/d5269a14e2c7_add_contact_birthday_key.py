@@ -0,0 +1,32 @@
+"""Add contact birthday key
+
+Revision ID: d5269a14e2c7
+Revises: 1d7b343b2b81
+Create Date: 2026-10-17 11:48:09.217356
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5269a14e2c7'
+down_revision: Union[str, None] = '1d7b343b2b81'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column(
+        'birthday_key', sa.Integer(),
+        sa.Computed('(EXTRACT(MONTH FROM birthday) * 100 + EXTRACT(DAY FROM birthday))::integer', persisted=True),
+        nullable=True,
+    ))
+    op.create_index('ix_contacts_user_id_birthday_key', 'contacts', ['user_id', 'birthday_key'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_birthday_key', table_name='contacts')
+    op.drop_column('contacts', 'birthday_key')
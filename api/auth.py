@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, status, Body
+from fastapi import APIRouter, Depends, Request, status, Body
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import EmailStr
+from slowapi.util import get_remote_address
 
 from api.instances import auth_service
 from schemas.auth import Token
 from schemas.users import UserCreate, UserOut
+from services.auth_service import oauth2_scheme
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -15,24 +17,30 @@ async def register(user: UserCreate):
 
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    return auth_service.login_user(form_data.username, form_data.password)
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    return await auth_service.login_user(form_data.username, form_data.password, get_remote_address(request))
+
+
+@router.post("/logout", status_code=status.HTTP_200_OK)
+async def logout(token: str = Depends(oauth2_scheme)):
+    await auth_service.logout(token)
+    return {"message": "Logged out successfully."}
 
 
 @router.get("/confirm/{token}", response_model=UserOut)
-def confirm_email(token: str):
-    user = auth_service.confirm_email(token)
+async def confirm_email(token: str):
+    user = await auth_service.confirm_email(token)
     return user
 
 
 @router.post("/password-reset/request", status_code=status.HTTP_200_OK)
 async def request_password_reset(email: EmailStr = Body(..., embed=True)):
-    reset_token = auth_service.create_password_reset_token(email)
+    reset_token = await auth_service.create_password_reset_token(email)
     await auth_service.send_password_reset_email(email, reset_token)
     return {"message": "Password reset email sent."}
 
 
 @router.post("/password-reset/confirm", status_code=status.HTTP_200_OK)
 async def confirm_password_reset(token: str, new_password: str):
-    auth_service.reset_password(token, new_password)
+    await auth_service.reset_password(token, new_password)
     return {"message": "Password has been reset successfully."}
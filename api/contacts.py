@@ -1,57 +1,122 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 
 from api.instances import auth_service, contact_service
-from schemas.contacts import ContactCreate, ContactUpdate, ContactOut
+from schemas.contacts import (ContactCreate, ContactUpdate, ContactOut, ContactSortKey, ContactExportFormat,
+                              ContactImportFormat, ContactImportResult)
+
+EXPORT_MEDIA_TYPES = {
+    ContactExportFormat.ndjson: "application/x-ndjson",
+    ContactExportFormat.csv: "text/csv",
+}
 
 router = APIRouter(prefix="/contacts", tags=["contacts"])
 
 
+def _etag_matches(if_none_match: Optional[str], etag: str, exists: bool = True) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return exists
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
 @router.get("/", response_model=List[ContactOut])
-def read_contacts(
+async def read_contacts(
+        request: Request,
+        response: Response,
         first_name: str = None,
         last_name: str = None,
         email: str = None,
+        q: Optional[str] = Query(None, min_length=1, max_length=100),
+        limit: int = Query(50, ge=1, le=500),
+        cursor: Optional[str] = None,
+        sort: ContactSortKey = ContactSortKey.id,
         current_user: dict = Depends(auth_service.get_current_user),
 ):
-    if first_name or last_name or email:
-        contacts = contact_service.search_user_contacts(current_user.id, first_name, last_name, email)
+    variant = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    etag = await contact_service.get_contacts_etag(current_user.id, variant)
+    if _etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    if q:
+        contacts = await contact_service.rank_user_contacts(current_user.id, q, limit)
+    elif first_name or last_name or email:
+        contacts = await contact_service.search_user_contacts(current_user.id, first_name, last_name, email, limit)
     else:
-        contacts = contact_service.get_user_contacts(current_user.id)
+        contacts, next_cursor = await contact_service.get_user_contacts(current_user.id, limit, sort, cursor)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
     return contacts
 
 
 @router.get("/upcoming_birthdays", response_model=List[ContactOut])
-def read_upcoming_birthdays(current_user: dict = Depends(auth_service.get_current_user)):
-    return contact_service.get_upcoming_birthdays(current_user.id)
+async def read_upcoming_birthdays(
+        days: int = Query(7, ge=1, le=366),
+        current_user: dict = Depends(auth_service.get_current_user),
+):
+    return await contact_service.get_upcoming_birthdays(current_user.id, days)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_contacts(
+        format: ContactExportFormat = ContactExportFormat.ndjson,
+        current_user: dict = Depends(auth_service.get_current_user),
+):
+    return StreamingResponse(
+        contact_service.export_user_contacts(current_user.id, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="contacts.{format.value}"'},
+    )
 
 
 @router.post("/", response_model=ContactOut, status_code=status.HTTP_201_CREATED)
-def create_contact(contact: ContactCreate, current_user: dict = Depends(auth_service.get_current_user)):
-    return contact_service.create_contact(contact, current_user.id)
+async def create_contact(contact: ContactCreate, current_user: dict = Depends(auth_service.get_current_user)):
+    return await contact_service.create_contact(contact, current_user.id)
+
+
+@router.post("/import", response_model=ContactImportResult)
+async def import_contacts(
+        request: Request,
+        format: ContactImportFormat = ContactImportFormat.ndjson,
+        current_user: dict = Depends(auth_service.get_current_user),
+):
+    return await contact_service.import_user_contacts(current_user.id, request.stream(), format)
 
 
 @router.get("/{contact_id}", response_model=ContactOut)
-def read_contact(contact_id: int, current_user: dict = Depends(auth_service.get_current_user)):
-    contact = contact_service.get_user_contact(contact_id, current_user.id)
+async def read_contact(contact_id: int, request: Request, response: Response,
+                       current_user: dict = Depends(auth_service.get_current_user)):
+    if_none_match = request.headers.get("If-None-Match")
+    etag = await contact_service.get_contact_etag(current_user.id, contact_id)
+    # "*" only matches a contact that exists, which is not known before reading it.
+    if _etag_matches(if_none_match, etag, exists=False):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    contact = await contact_service.get_user_contact(contact_id, current_user.id)
     if contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return contact
 
 
 @router.put("/{contact_id}", response_model=ContactOut)
-def update_contact(contact_id: int, contact: ContactUpdate,
-                   current_user: dict = Depends(auth_service.get_current_user)):
-    updated_contact = contact_service.update_user_contact(contact_id, contact, current_user.id)
+async def update_contact(contact_id: int, contact: ContactUpdate,
+                         current_user: dict = Depends(auth_service.get_current_user)):
+    updated_contact = await contact_service.update_user_contact(contact_id, contact, current_user.id)
     if updated_contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
     return updated_contact
 
 
 @router.delete("/{contact_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_contact(contact_id: int, current_user: dict = Depends(auth_service.get_current_user)):
-    deleted_contact = contact_service.delete_user_contact(contact_id, current_user.id)
+async def delete_contact(contact_id: int, current_user: dict = Depends(auth_service.get_current_user)):
+    deleted_contact = await contact_service.delete_user_contact(contact_id, current_user.id)
     if deleted_contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
     return
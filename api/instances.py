@@ -1,16 +1,42 @@
 from clients.cloudinary_client import CloudinaryClient
+from clients.email_outbox import RedisEmailOutbox
 from clients.fast_api_mail_client import FastApiMailClient
+from clients.local_cache import CACHE_INVALIDATION_CHANNEL, LocalTTLCache, TieredCache
+from clients.password_hasher import ProcessPoolPasswordHasher
 from clients.redis_client import RedisCache
+from clients.token_revocations import RedisTokenRevocations
+from clients.token_versions import RedisTokenVersions
 from repositories.contact_repository import ContactRepository
 from repositories.user_repository import UserRepository
-from services.auth_service import AuthService
+from services.auth_service import ACCESS_TOKEN_EXPIRE_MINUTES, TOKEN_CLAIMS_CACHE_SIZE, AuthService
 from services.contact_service import ContactService
+from services.email_templates import EmailTemplates
+from services.login_throttle import LoginThrottle
 from services.user_service import UserService
 
 user_repository = UserRepository()
-email_client = FastApiMailClient()
+# Requests only queue their emails; the outbox worker sends them with the mail client.
+mail_client = FastApiMailClient()
+email_outbox = RedisEmailOutbox(mail_client)
 image_client = CloudinaryClient()
-cache_client = RedisCache()
-auth_service = AuthService(user_repository=user_repository, email_sender=email_client, cache=cache_client)
-user_service = UserService(user_repository=user_repository, image_client=image_client)
-contact_service = ContactService(ContactRepository())
\ No newline at end of file
+redis_cache = RedisCache()
+cache_client = TieredCache(redis_cache, channel=CACHE_INVALIDATION_CHANNEL)
+password_hasher = ProcessPoolPasswordHasher()
+# The throttle reads Redis directly: a block set by another process must be seen at once.
+login_throttle = LoginThrottle(redis_cache)
+token_versions = RedisTokenVersions()
+token_revocations = RedisTokenRevocations()
+auth_service = AuthService(
+    user_repository=user_repository,
+    email_sender=email_outbox,
+    cache=cache_client,
+    password_hasher=password_hasher,
+    login_throttle=login_throttle,
+    claims_cache=LocalTTLCache(max_size=TOKEN_CLAIMS_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60),
+    token_versions=token_versions,
+    token_revocations=token_revocations,
+    # Compiled here, at startup, so no request pays for it.
+    email_templates=EmailTemplates(),
+)
+user_service = UserService(user_repository=user_repository, image_client=image_client, cache=cache_client)
+contact_service = ContactService(ContactRepository(), cache=cache_client)
\ No newline at end of file
@@ -36,10 +36,10 @@ def mock_auth_service(monkeypatch):
             "avatar_url": None,
         }
 
-    def mock_login_user(username, password):
+    async def mock_login_user(username, password, client_ip=None):
         return {"access_token": "mock_token", "token_type": "bearer"}
 
-    def mock_confirm_email(token):
+    async def mock_confirm_email(token):
         return {
             "id": 1,
             "username": "testuser",
@@ -52,12 +52,15 @@ def mock_auth_service(monkeypatch):
     async def mock_create_password_reset_token(email):
         return "valid-reset-token"
 
-    def mock_reset_password(token, new_password):
+    async def mock_reset_password(token, new_password):
         return
 
     async def mock_send_password_reset_email(email, token):
         pass
 
+    async def mock_logout(token):
+        return
+
     monkeypatch.setattr(auth_service, "register_user", mock_register_user)
     monkeypatch.setattr(auth_service, "login_user", mock_login_user)
     monkeypatch.setattr(auth_service, "confirm_email", mock_confirm_email)
@@ -65,6 +68,7 @@ def mock_auth_service(monkeypatch):
         auth_service, "create_password_reset_token", mock_create_password_reset_token
     )
     monkeypatch.setattr(auth_service, "reset_password", mock_reset_password)
+    monkeypatch.setattr(auth_service, "logout", mock_logout)
     monkeypatch.setattr(
         auth_service, "send_password_reset_email", mock_send_password_reset_email
     )
@@ -103,6 +107,17 @@ def test_login_user(client):
     assert data["token_type"] == "bearer"
 
 
+def test_logout(client):
+    response = client.post("/auth/logout", headers={"Authorization": "Bearer mock_token"})
+    assert response.status_code == 200
+    assert response.json() == {"message": "Logged out successfully."}
+
+
+def test_logout_without_token(client):
+    response = client.post("/auth/logout")
+    assert response.status_code == 401
+
+
 def test_confirm_email(client):
     response = client.get("/auth/confirm/some-valid-token")
     assert response.status_code == 200
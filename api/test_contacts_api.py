@@ -39,6 +39,11 @@ def override_deps(test_user):
     orig_get_user_contact = contact_service.get_user_contact
     orig_update_user_contact = contact_service.update_user_contact
     orig_delete_user_contact = contact_service.delete_user_contact
+    orig_export_user_contacts = contact_service.export_user_contacts
+    orig_import_user_contacts = contact_service.import_user_contacts
+    orig_rank_user_contacts = contact_service.rank_user_contacts
+    orig_get_contacts_etag = contact_service.get_contacts_etag
+    orig_get_contact_etag = contact_service.get_contact_etag
 
     mock_contact_data = {
         "id": 10,
@@ -56,10 +61,12 @@ def override_deps(test_user):
         dict(mock_contact_data, id=11, first_name="Bob", last_name="Johnson"),
     ]
 
-    def mock_get_user_contacts(user_id: int):
-        return mock_contacts_list
+    async def mock_get_user_contacts(user_id: int, limit: int, sort_by, cursor=None):
+        if cursor is None and limit < len(mock_contacts_list):
+            return mock_contacts_list[:limit], "next-page-cursor"
+        return mock_contacts_list, None
 
-    def mock_search_user_contacts(user_id, first_name=None, last_name=None, email=None):
+    async def mock_search_user_contacts(user_id, first_name=None, last_name=None, email=None, limit=50):
         results = []
         for c in mock_contacts_list:
             if first_name and first_name.lower() not in c["first_name"].lower():
@@ -69,21 +76,30 @@ def override_deps(test_user):
             if email and email.lower() not in c["email"].lower():
                 continue
             results.append(c)
-        return results
+        return results[:limit]
 
-    def mock_get_upcoming_birthdays(user_id: int):
-        return mock_contacts_list
+    async def mock_rank_user_contacts(user_id: int, term: str, limit: int):
+        return [c for c in reversed(mock_contacts_list) if term.lower() in c["first_name"].lower()][:limit]
 
-    def mock_create_contact(contact, user_id: int):
+    async def mock_get_contacts_etag(user_id: int, variant: str = ""):
+        return f'"list-{len(variant)}"'
+
+    async def mock_get_contact_etag(user_id: int, contact_id: int):
+        return f'"contact-{contact_id}"'
+
+    async def mock_get_upcoming_birthdays(user_id: int, days: int):
+        return mock_contacts_list[:days]
+
+    async def mock_create_contact(contact, user_id: int):
         return dict(mock_contact_data, id=12, **contact.model_dump(), user_id=user_id)
 
-    def mock_get_user_contact(contact_id: int, user_id: int):
+    async def mock_get_user_contact(contact_id: int, user_id: int):
         for c in mock_contacts_list:
             if c["id"] == contact_id and c["user_id"] == user_id:
                 return c
         return None
 
-    def mock_update_user_contact(contact_id: int, contact, user_id: int):
+    async def mock_update_user_contact(contact_id: int, contact, user_id: int):
         for c in mock_contacts_list:
             if c["id"] == contact_id and c["user_id"] == user_id:
                 updated_data = c.copy()
@@ -93,7 +109,15 @@ def override_deps(test_user):
                 return updated_data
         return None
 
-    def mock_delete_user_contact(contact_id: int, user_id: int):
+    async def mock_export_user_contacts(user_id: int, export_format):
+        for c in mock_contacts_list:
+            yield f"{c['id']},{c['first_name']}\n" if export_format == "csv" else f'{{"id": {c["id"]}}}\n'
+
+    async def mock_import_user_contacts(user_id: int, chunks, import_format):
+        body = b"".join([chunk async for chunk in chunks])
+        return {"imported": len(body.splitlines()), "errors": [{"row": 1, "detail": import_format.value}]}
+
+    async def mock_delete_user_contact(contact_id: int, user_id: int):
         for i, c in enumerate(mock_contacts_list):
             if c["id"] == contact_id and c["user_id"] == user_id:
                 return mock_contacts_list.pop(i)
@@ -106,6 +130,11 @@ def override_deps(test_user):
     contact_service.get_user_contact = mock_get_user_contact
     contact_service.update_user_contact = mock_update_user_contact
     contact_service.delete_user_contact = mock_delete_user_contact
+    contact_service.export_user_contacts = mock_export_user_contacts
+    contact_service.import_user_contacts = mock_import_user_contacts
+    contact_service.rank_user_contacts = mock_rank_user_contacts
+    contact_service.get_contacts_etag = mock_get_contacts_etag
+    contact_service.get_contact_etag = mock_get_contact_etag
 
     yield
 
@@ -117,6 +146,11 @@ def override_deps(test_user):
     contact_service.get_user_contact = orig_get_user_contact
     contact_service.update_user_contact = orig_update_user_contact
     contact_service.delete_user_contact = orig_delete_user_contact
+    contact_service.export_user_contacts = orig_export_user_contacts
+    contact_service.import_user_contacts = orig_import_user_contacts
+    contact_service.rank_user_contacts = orig_rank_user_contacts
+    contact_service.get_contacts_etag = orig_get_contacts_etag
+    contact_service.get_contact_etag = orig_get_contact_etag
 
 
 def test_read_contacts_no_filters(client, override_deps):
@@ -129,6 +163,27 @@ def test_read_contacts_no_filters(client, override_deps):
     assert len(data) == 2
     assert data[0]["first_name"] == "Alice"
     assert data[1]["first_name"] == "Bob"
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_read_contacts_paginated(client, override_deps):
+    response = client.get(
+        "/contacts/?limit=1&sort=last_name",
+        headers={"Authorization": "Bearer mock_token"},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 1
+    assert data[0]["first_name"] == "Alice"
+    assert response.headers["X-Next-Cursor"] == "next-page-cursor"
+
+
+def test_read_contacts_invalid_sort(client, override_deps):
+    response = client.get(
+        "/contacts/?sort=phone_number",
+        headers={"Authorization": "Bearer mock_token"},
+    )
+    assert response.status_code == 422
 
 
 def test_read_contacts_with_filters(client, override_deps):
@@ -142,6 +197,36 @@ def test_read_contacts_with_filters(client, override_deps):
     assert data[0]["first_name"] == "Alice"
 
 
+def test_read_contacts_with_filters_applies_limit(client, override_deps):
+    response = client.get(
+        "/contacts/?email=example&limit=1",
+        headers={"Authorization": "Bearer mock_token"},
+    )
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+
+
+def test_read_contacts_exposes_cursor_to_browsers(client, override_deps):
+    response = client.get(
+        "/contacts/?limit=1",
+        headers={"Authorization": "Bearer mock_token", "Origin": "https://app.example.com"},
+    )
+    assert response.status_code == 200
+    exposed = [header.strip().lower() for header in response.headers["Access-Control-Expose-Headers"].split(",")]
+    assert "x-next-cursor" in exposed
+    assert "etag" in exposed
+
+
+def test_read_contacts_ranked_search(client, override_deps):
+    response = client.get(
+        "/contacts/?q=b&first_name=ali&limit=1",
+        headers={"Authorization": "Bearer mock_token"},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [c["first_name"] for c in data] == ["Bob"]
+
+
 def test_read_upcoming_birthdays(client, override_deps):
     response = client.get(
         "/contacts/upcoming_birthdays",
@@ -154,6 +239,21 @@ def test_read_upcoming_birthdays(client, override_deps):
     assert data[1]["id"] == 11
 
 
+def test_read_upcoming_birthdays_window(client, override_deps):
+    response = client.get(
+        "/contacts/upcoming_birthdays?days=1",
+        headers={"Authorization": "Bearer mock_token"},
+    )
+    assert response.status_code == 200
+    assert [c["id"] for c in response.json()] == [10]
+
+    response = client.get(
+        "/contacts/upcoming_birthdays?days=367",
+        headers={"Authorization": "Bearer mock_token"},
+    )
+    assert response.status_code == 422
+
+
 def test_create_contact(client, override_deps):
     payload = {
         "first_name": "Carol",
@@ -238,3 +338,85 @@ def test_delete_contact_not_found(client, override_deps):
     )
     assert response.status_code == 404
     assert response.json()["detail"] == "Contact not found"
+
+
+def test_export_contacts_ndjson(client, override_deps):
+    response = client.get(
+        "/contacts/export",
+        headers={"Authorization": "Bearer mock_token"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"] == 'attachment; filename="contacts.ndjson"'
+    assert response.text.splitlines() == ['{"id": 10}', '{"id": 11}']
+
+
+def test_export_contacts_csv(client, override_deps):
+    response = client.get(
+        "/contacts/export?format=csv",
+        headers={"Authorization": "Bearer mock_token"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines() == ["10,Alice", "11,Bob"]
+
+
+def test_import_contacts(client, override_deps):
+    response = client.post(
+        "/contacts/import?format=csv",
+        content=b"first_name,last_name\nJohn,Doe\nJane,Doe\n",
+        headers={"Authorization": "Bearer mock_token"},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"imported": 3, "errors": [{"row": 1, "detail": "csv"}]}
+
+
+def test_read_contacts_etag(client, override_deps):
+    response = client.get("/contacts/?limit=5", headers={"Authorization": "Bearer mock_token"})
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = client.get(
+        "/contacts/?limit=5",
+        headers={"Authorization": "Bearer mock_token", "If-None-Match": f'"other", W/{etag}'},
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+    response = client.get(
+        "/contacts/?limit=50",
+        headers={"Authorization": "Bearer mock_token", "If-None-Match": etag},
+    )
+    assert response.status_code == 200
+
+
+def test_read_contact_not_modified(client, override_deps):
+    response = client.get(
+        "/contacts/999",
+        headers={"Authorization": "Bearer mock_token", "If-None-Match": '"contact-999"'},
+    )
+    assert response.status_code == 304
+
+
+def test_read_contact_if_none_match_any(client, override_deps):
+    response = client.get(
+        "/contacts/10",
+        headers={"Authorization": "Bearer mock_token", "If-None-Match": "*"},
+    )
+    assert response.status_code == 304
+
+    response = client.get(
+        "/contacts/999",
+        headers={"Authorization": "Bearer mock_token", "If-None-Match": "*"},
+    )
+    assert response.status_code == 404
+
+
+def test_read_contact_etag(client, override_deps):
+    response = client.get(
+        "/contacts/10",
+        headers={"Authorization": "Bearer mock_token", "If-None-Match": '"stale"'},
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"contact-10"'
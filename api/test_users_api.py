@@ -30,7 +30,7 @@ def override_deps(test_user_data):
     async def mock_get_current_user(token: str = None):
         return test_user_data
 
-    def mock_change_avatar(user_id, file):
+    async def mock_change_avatar(user_id, file, background_tasks=None):
         test_user_data.avatar_url = "http://example.com/path/to/new-avatar.jpg"
         return test_user_data
 
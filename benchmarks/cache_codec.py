@@ -0,0 +1,95 @@
+"""
+Cache Codec Benchmark
+
+This module measures the CPU time spent per cache hit and per cache write for a cached user,
+comparing json with full Pydantic validation against the cache codecs with trusted rehydration.
+
+It needs neither Redis nor a database:
+
+    python -m benchmarks.cache_codec --number 20000
+"""
+
+import argparse
+import json
+import time
+import timeit
+from datetime import datetime
+
+from clients.cache_codecs import CODECS
+from schemas.users import UserOut
+from services.auth_service import user_from_cache
+
+USER = UserOut(
+    id=42,
+    username="benchmark-user",
+    email="benchmark-user@example.com",
+    created_at=datetime(2026, 1, 2, 3, 4, 5, 678901),
+    email_confirmed=True,
+    avatar_url="https://res.cloudinary.com/demo/image/upload/v1/avatars/benchmark-user.png",
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20_000, help="operations per timed run")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case; the fastest is reported")
+    return parser.parse_args()
+
+
+def json_default(obj):
+    # The encoder previously used for cached users handled datetimes only; URLs are added so
+    # that a user with an avatar can be measured at all.
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    return str(obj)
+
+
+def envelope(user: dict) -> dict:
+    return {"user": user, "delta": 0.004, "expires_at": time.time() + 1800}
+
+
+def cases():
+    stored_json = json.dumps(envelope(USER.dict()), default=json_default)
+    hits = {
+        "json + validation (before)": lambda: UserOut(**json.loads(stored_json)["user"]),
+    }
+    writes = {
+        "json (before)": lambda: json.dumps(envelope(USER.dict()), default=json_default),
+    }
+    for name, codec_class in CODECS.items():
+        codec = codec_class()
+        stored = codec.encode(envelope(USER.model_dump(mode="json")))
+        hits[f"{name} + validation"] = lambda codec=codec, stored=stored: UserOut(**codec.decode(stored)["user"])
+        hits[f"{name} + trusted"] = lambda codec=codec, stored=stored: user_from_cache(codec.decode(stored)["user"])
+        writes[name] = lambda codec=codec: codec.encode(envelope(USER.model_dump(mode="json")))
+
+    decoded = envelope(USER.model_dump(mode="json"))
+    hits["local tier, already decoded + trusted"] = lambda: user_from_cache(decoded["user"])
+    return hits, writes
+
+
+def measure(run, number: int, repeat: int) -> float:
+    timer = timeit.Timer(run, timer=time.process_time)
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1_000_000
+
+
+def print_table(title: str, runs: dict, args):
+    print(f"\n=== {title} (CPU µs per operation) ===")
+    baseline = None
+    for name, run in runs.items():
+        micros = measure(run, args.number, args.repeat)
+        baseline = baseline or micros
+        print(f"{name:<40} {micros:8.2f} µs  {baseline / micros:5.1f}x")
+
+
+def main():
+    args = parse_args()
+    hits, writes = cases()
+    for run in hits.values():
+        assert run() == USER
+    print_table("cache hit", hits, args)
+    print_table("cache write", writes, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Contact Search Benchmark
+
+This module seeds a large contacts table and compares the substring search against the
+trigram-ranked search, printing the query plans and latencies of both.
+
+Run it against a migrated database (``alembic upgrade head``) that is not used by anything else:
+
+    python -m benchmarks.contact_search --rows 1000000 --user-rows 100000 --term smit
+
+The "without trigram indexes" numbers are measured inside a transaction that drops the trigram
+indexes and is rolled back afterwards, so the table is locked while they run.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from repositories.contact_repository import ContactRepository
+from repositories.database import engine, session_scope
+
+BENCH_USER_ID = -1
+TRGM_INDEXES = ("ix_contacts_first_name_trgm", "ix_contacts_last_name_trgm", "ix_contacts_email_trgm")
+
+SEED_SQL = text("""
+    INSERT INTO contacts (user_id, first_name, last_name, email, phone_number, birthday, additional_data)
+    SELECT CASE WHEN i <= :user_rows THEN :user_id ELSE -2 - (i % :other_users) END,
+           initcap(substr(md5(i::text), 1, 3 + i % 6)),
+           (ARRAY['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Miller', 'Davis', 'Wilson'])[1 + i % 8]
+               || substr(md5((i * 7)::text), 1, 4),
+           'bench' || i || '@' || substr(md5((i * 13)::text), 1, 6) || '.example.com',
+           'bench-' || i,
+           DATE '1950-01-01' + (i % 20000),
+           NULL
+    FROM generate_series(1, :rows) AS i
+""")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="total contacts to seed")
+    parser.add_argument("--user-rows", type=int, default=100_000, help="contacts owned by the searched user")
+    parser.add_argument("--other-users", type=int, default=1000, help="owners of the remaining contacts")
+    parser.add_argument("--term", default="smit", help="search term")
+    parser.add_argument("--limit", type=int, default=20, help="top-k for the ranked search")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per query")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded rows")
+    return parser.parse_args()
+
+
+def compile_literal(query) -> str:
+    return str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+async def explain(session, query) -> str:
+    result = await session.execute(text("EXPLAIN (ANALYZE, BUFFERS) " + compile_literal(query)))
+    return "\n".join(row[0] for row in result)
+
+
+async def measure(session, args) -> dict:
+    repository = ContactRepository(session_provider=lambda: session)
+    cases = {
+        "substring (last_name ILIKE)": lambda: repository.search_by_user(BENCH_USER_ID, last_name=args.term),
+        f"ranked top-{args.limit}": lambda: repository.search_ranked_by_user(BENCH_USER_ID, args.term, args.limit),
+    }
+
+    report = {}
+    for name, run in cases.items():
+        timings = []
+        rows = 0
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            rows = len(await run())
+            timings.append((time.perf_counter() - started) * 1000)
+            session.expunge_all()
+        timings.sort()
+        report[name] = {
+            "rows": rows,
+            "median_ms": statistics.median(timings),
+            "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        }
+    return report
+
+
+async def capture_plans(session, args) -> dict:
+    captured = []
+    original_execute = session.execute
+
+    async def recording_execute(statement, *a, **kw):
+        captured.append(statement)
+        return await original_execute(statement, *a, **kw)
+
+    repository = ContactRepository(session_provider=lambda: session)
+    session.execute = recording_execute
+    try:
+        await repository.search_by_user(BENCH_USER_ID, last_name=args.term)
+        await repository.search_ranked_by_user(BENCH_USER_ID, args.term, args.limit)
+    finally:
+        del session.execute
+    session.expunge_all()
+    return {
+        "substring (last_name ILIKE)": await explain(session, captured[0]),
+        f"ranked top-{args.limit}": await explain(session, captured[1]),
+    }
+
+
+def print_report(title: str, plans: dict, report: dict):
+    print(f"\n=== {title} ===")
+    for name, plan in plans.items():
+        stats = report[name]
+        print(f"\n--- {name}: {stats['rows']} rows, median {stats['median_ms']:.2f} ms, "
+              f"p95 {stats['p95_ms']:.2f} ms")
+        print(plan)
+
+
+async def main():
+    args = parse_args()
+
+    async with session_scope() as session:
+        installed = await session.scalar(text("SELECT count(*) FROM pg_extension WHERE extname = 'pg_trgm'"))
+        indexes = await session.scalar(
+            text("SELECT count(*) FROM pg_indexes WHERE tablename = 'contacts' AND indexname = ANY(:names)"),
+            {"names": list(TRGM_INDEXES)},
+        )
+        if not installed or indexes != len(TRGM_INDEXES):
+            raise SystemExit("pg_trgm or the trigram indexes are missing; run `alembic upgrade head` first")
+
+        print(f"Seeding {args.rows} contacts ({args.user_rows} for user {BENCH_USER_ID})...")
+        await session.execute(text("DELETE FROM contacts WHERE user_id < 0"))
+        started = time.perf_counter()
+        await session.execute(SEED_SQL, {
+            "rows": args.rows, "user_rows": args.user_rows,
+            "user_id": BENCH_USER_ID, "other_users": args.other_users,
+        })
+        await session.commit()
+        print(f"Seeded in {time.perf_counter() - started:.1f} s")
+
+    async with engine.connect() as connection:
+        await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await connection.execute(text("VACUUM ANALYZE contacts"))
+
+    try:
+        async with session_scope() as session:
+            print_report("with trigram indexes", await capture_plans(session, args), await measure(session, args))
+
+        async with session_scope() as session:
+            for index in TRGM_INDEXES:
+                await session.execute(text(f"DROP INDEX {index}"))
+            print_report("without trigram indexes", await capture_plans(session, args), await measure(session, args))
+            await session.rollback()
+    finally:
+        if not args.keep:
+            async with session_scope() as session:
+                await session.execute(text("DELETE FROM contacts WHERE user_id < 0"))
+                await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
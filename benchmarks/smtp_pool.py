@@ -0,0 +1,136 @@
+"""
+SMTP Pool Benchmark
+
+This module measures how many emails per second reach a local SMTP sink when every email opens
+its own connection through FastMail.send_message, compared with FastApiMailClient.send_many
+over pooled connections.
+
+The sink is started in-process and accepts everything. A real mail server answers every command
+after a network round trip and needs a TLS handshake and a login per connection; --latency and
+--connect-latency add those delays to the sink's replies:
+
+    python -m benchmarks.smtp_pool --emails 500 --latency 5 --connect-latency 50
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi_mail import ConnectionConfig, FastMail, MessageSchema, MessageType
+
+from clients.fast_api_mail_client import FastApiMailClient
+from schemas.emails import EmailOut
+
+
+class SMTPSink:
+    """
+    A minimal SMTP server that accepts and discards every email.
+    """
+
+    def __init__(self, latency: float, connect_latency: float):
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.connections = 0
+        self.received = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        await asyncio.sleep(self.connect_latency)
+        await self.reply(writer, "220 sink ESMTP")
+        while line := await reader.readline():
+            command = line.decode().strip().upper()
+            if command.startswith("EHLO"):
+                await self.reply(writer, "250-sink\r\n250 8BITMIME")
+            elif command == "DATA":
+                await self.reply(writer, "354 End data with <CR><LF>.<CR><LF>")
+                while await reader.readline() != b".\r\n":
+                    pass
+                self.received += 1
+                await self.reply(writer, "250 OK")
+            elif command == "QUIT":
+                await self.reply(writer, "221 Bye")
+                break
+            else:
+                await self.reply(writer, "250 OK")
+        writer.close()
+
+    async def reply(self, writer: asyncio.StreamWriter, response: str):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        writer.write(f"{response}\r\n".encode())
+        await writer.drain()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=500, help="emails sent per case")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="concurrent sends without a pool, and the pool size")
+    parser.add_argument("--latency", type=float, default=5, help="milliseconds before every reply of the sink")
+    parser.add_argument("--connect-latency", type=float, default=50,
+                        help="extra milliseconds per connection, standing in for TLS and login")
+    return parser.parse_args()
+
+
+def emails(count: int):
+    return [
+        EmailOut(subject=f"Email {i}", recipients=[f"user{i}@example.com"], body="Please confirm your email.")
+        for i in range(count)
+    ]
+
+
+async def connection_per_email(config: ConnectionConfig, batch, concurrency: int):
+    mailer = FastMail(config)
+    slots = asyncio.Semaphore(concurrency)
+
+    async def send(email: EmailOut):
+        async with slots:
+            await mailer.send_message(MessageSchema(
+                subject=email.subject, recipients=email.recipients, body=email.body, subtype=MessageType.plain
+            ))
+
+    await asyncio.gather(*(send(email) for email in batch))
+
+
+async def pooled(config: ConnectionConfig, batch, pool_size: int):
+    client = FastApiMailClient(config, pool_size=pool_size)
+    errors = await client.send_many(batch)
+    await client.close()
+    assert errors == [None] * len(batch), errors
+
+
+async def main():
+    args = parse_args()
+    sink = SMTPSink(args.latency / 1000, args.connect_latency / 1000)
+    server = await asyncio.start_server(sink.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    config = ConnectionConfig(
+        MAIL_USERNAME="", MAIL_PASSWORD="", MAIL_FROM="benchmark@example.com", MAIL_SERVER="127.0.0.1",
+        MAIL_PORT=port, MAIL_STARTTLS=False, MAIL_SSL_TLS=False, USE_CREDENTIALS=False, VALIDATE_CERTS=False,
+    )
+
+    cases = {
+        f"connection per email, {args.concurrency} concurrent (before)":
+            lambda batch: connection_per_email(config, batch, args.concurrency),
+        "pooled send_many, 1 connection": lambda batch: pooled(config, batch, 1),
+        f"pooled send_many, {args.concurrency} connections": lambda batch: pooled(config, batch, args.concurrency),
+    }
+    print(f"\n=== {args.emails} emails, {args.latency:g} ms per reply, "
+          f"{args.connect_latency:g} ms per connection ===")
+    baseline = None
+    for name, run in cases.items():
+        batch = emails(args.emails)
+        sink.connections = sink.received = 0
+        started = time.perf_counter()
+        await run(batch)
+        rate = args.emails / (time.perf_counter() - started)
+        assert sink.received == args.emails
+        baseline = baseline or rate
+        print(f"{name:<50} {rate:8.1f} emails/s  {rate / baseline:5.1f}x  {sink.connections:5d} connections")
+
+    server.close()
+    await server.wait_closed()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""
+Cache Codecs Module
+
+This module provides the codecs that RedisCache uses to serialize cached objects.
+
+Every codec accepts JSON-compatible values (dicts, lists, strings, numbers, booleans and None)
+and writes JSON, so values written with one codec can be read with another.
+"""
+
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Type, Union
+
+import orjson
+
+CACHE_CODEC = os.environ.get("CACHE_CODEC", "orjson")
+
+
+class CacheCodec(ABC):
+    """
+    Converts cached objects to and from their stored form.
+
+    Methods:
+        encode(value): Serializes a JSON-compatible value.
+        decode(data): Deserializes a stored value.
+    """
+
+    @abstractmethod
+    def encode(self, value: Any) -> bytes:
+        pass
+
+    @abstractmethod
+    def decode(self, data: Union[bytes, str]) -> Any:
+        pass
+
+
+class JsonCodec(CacheCodec):
+    """
+    A codec built on the standard library json module.
+    """
+
+    def encode(self, value: Any) -> bytes:
+        """
+        Serializes a JSON-compatible value.
+
+        Args:
+            value (Any): The value to serialize.
+
+        Returns:
+            bytes: The UTF-8 encoded JSON document.
+        """
+        return json.dumps(value, separators=(",", ":")).encode()
+
+    def decode(self, data: Union[bytes, str]) -> Any:
+        """
+        Deserializes a stored value.
+
+        Args:
+            data (Union[bytes, str]): The JSON document.
+
+        Returns:
+            Any: The deserialized value.
+        """
+        return json.loads(data)
+
+
+class OrjsonCodec(CacheCodec):
+    """
+    A codec built on orjson, which serializes and parses JSON several times faster than json.
+    """
+
+    def encode(self, value: Any) -> bytes:
+        """
+        Serializes a JSON-compatible value.
+
+        Args:
+            value (Any): The value to serialize.
+
+        Returns:
+            bytes: The UTF-8 encoded JSON document.
+        """
+        return orjson.dumps(value)
+
+    def decode(self, data: Union[bytes, str]) -> Any:
+        """
+        Deserializes a stored value.
+
+        Args:
+            data (Union[bytes, str]): The JSON document.
+
+        Returns:
+            Any: The deserialized value.
+        """
+        return orjson.loads(data)
+
+
+CODECS: Dict[str, Type[CacheCodec]] = {
+    "json": JsonCodec,
+    "orjson": OrjsonCodec,
+}
+
+
+def get_codec(name: str = CACHE_CODEC) -> CacheCodec:
+    """
+    Creates the codec registered under a name.
+
+    Args:
+        name (str, optional): The codec name, "json" or "orjson". Defaults to the CACHE_CODEC setting.
+
+    Returns:
+        CacheCodec: The codec.
+
+    Raises:
+        ValueError: If no codec is registered under the name.
+    """
+    try:
+        return CODECS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown cache codec {name!r}, expected one of: {', '.join(CODECS)}")
@@ -0,0 +1,218 @@
+import asyncio
+
+import aioredis
+import pytest
+
+
+class FakeBroker:
+    """Pub/sub delivery shared by the fakes: every subscriber gets each message in its queue.
+
+    Putting an exception in a subscriber's queue makes its subscription fail, as when the
+    connection to Redis is lost.
+    """
+
+    def __init__(self):
+        self.subscribers = []
+
+    async def publish(self, channel, message):
+        for queue in self.subscribers:
+            queue.put_nowait(message)
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.redis.subscribers.append(self.queue)
+
+    async def listen(self):
+        while True:
+            yield self._message(await self.queue.get())
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        try:
+            message = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self._message(message)
+
+    async def close(self):
+        self.redis.subscribers.remove(self.queue)
+
+    @staticmethod
+    def _message(message):
+        if isinstance(message, Exception):
+            raise message
+        return {"type": "message", "data": message}
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class FakeRedis(FakeBroker):
+    """The Redis commands the clients use: one hash, one sorted set, streams with one consumer
+    group and pub/sub. Stream delivery times follow now_ms, a clock advanced by hand, and reads
+    counts the single-key reads (HGET, ZSCORE)."""
+
+    def __init__(self):
+        super().__init__()
+        self.hash = {}
+        self.zset = {}
+        self.streams = {}
+        self.groups = set()
+        self.delivered = set()
+        self.pending = {}
+        self.now_ms = 0
+        self.reads = 0
+        self._next_id = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+    async def hget(self, key, field):
+        self.reads += 1
+        return self.hash.get(field)
+
+    async def hgetall(self, key):
+        return dict(self.hash)
+
+    async def hincrby(self, key, field, amount):
+        self.hash[field] = str(int(self.hash.get(field, 0)) + amount)
+        return int(self.hash[field])
+
+    async def zadd(self, key, mapping):
+        self.zset.update(mapping)
+
+    async def zremrangebyscore(self, key, low, high):
+        for member, score in list(self.zset.items()):
+            if score <= high:
+                del self.zset[member]
+
+    async def zscore(self, key, member):
+        self.reads += 1
+        return self.zset.get(member)
+
+    async def zrangebyscore(self, key, low, high):
+        return [member for member, score in self.zset.items() if score >= low]
+
+    async def xadd(self, name, fields):
+        self._next_id += 1
+        entry_id = f"{self._next_id}-0"
+        self.streams.setdefault(name, {})[entry_id] = {key: str(value) for key, value in fields.items()}
+        return entry_id
+
+    async def xgroup_create(self, name, groupname, id="$", mkstream=False):
+        if (name, groupname) in self.groups:
+            raise aioredis.ResponseError("BUSYGROUP Consumer Group name already exists")
+        self.groups.add((name, groupname))
+        self.streams.setdefault(name, {})
+
+    async def xreadgroup(self, groupname, consumername, streams, count=None, block=None):
+        (name, _), = streams.items()
+        new = [entry_id for entry_id in self.streams[name] if entry_id not in self.delivered][:count]
+        for entry_id in new:
+            self.delivered.add(entry_id)
+            self.pending[entry_id] = {"consumer": consumername, "delivered_ms": self.now_ms, "count": 1}
+        return [[name, [(entry_id, self.streams[name][entry_id]) for entry_id in new]]] if new else []
+
+    async def xpending_range(self, name, groupname, min, max, count):
+        return [
+            {"message_id": entry_id, "consumer": entry["consumer"],
+             "time_since_delivered": self.now_ms - entry["delivered_ms"], "times_delivered": entry["count"]}
+            for entry_id, entry in list(self.pending.items())[:count]
+        ]
+
+    async def xclaim(self, name, groupname, consumername, min_idle_time, message_ids):
+        claimed = []
+        for entry_id in message_ids:
+            entry = self.pending.get(entry_id)
+            if entry is not None and self.now_ms - entry["delivered_ms"] >= min_idle_time:
+                entry.update(consumer=consumername, delivered_ms=self.now_ms, count=entry["count"] + 1)
+                claimed.append((entry_id, self.streams[name].get(entry_id)))
+        return claimed
+
+    async def xack(self, name, groupname, *ids):
+        for entry_id in ids:
+            self.pending.pop(entry_id, None)
+
+    async def xdel(self, name, *ids):
+        for entry_id in ids:
+            self.streams[name].pop(entry_id, None)
+
+
+class FakeRemoteCache(FakeBroker):
+    """The remote ICache tier, with the publish/subscribe of RedisCache."""
+
+    def __init__(self):
+        super().__init__()
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ttl):
+        self.values[key] = value
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+
+    async def get_many(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    async def set_many(self, items, ttl):
+        self.values.update(items)
+
+    async def delete_many(self, keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+    async def subscribe(self, channel):
+        queue = asyncio.Queue()
+        self.subscribers.append(queue)
+
+        async def messages():
+            while True:
+                message = await queue.get()
+                if isinstance(message, Exception):
+                    raise message
+                yield message
+        return messages()
+
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
+
+
+@pytest.fixture
+def fake_remote_cache():
+    return FakeRemoteCache()
+
+
+@pytest.fixture
+def settle():
+    async def settle():
+        # Lets background listeners handle what was published so far.
+        for _ in range(5):
+            await asyncio.sleep(0)
+    return settle
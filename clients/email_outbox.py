@@ -0,0 +1,236 @@
+"""
+Email Outbox Module
+
+This module provides an email outbox kept in a Redis stream. Requests only append their emails
+to the stream; a background worker in every process sends them in batches and retries failed
+sends, so neither the mail server's latency nor its outages reach the HTTP responses.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+from typing import List, Optional, Tuple
+
+import aioredis
+
+from schemas.emails import EmailOut
+from services.auth_service import IEmailSender
+
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379")
+EMAIL_OUTBOX_STREAM = os.environ.get("EMAIL_OUTBOX_STREAM", "email-outbox")
+EMAIL_OUTBOX_GROUP = os.environ.get("EMAIL_OUTBOX_GROUP", "email-senders")
+EMAIL_OUTBOX_DEAD_LETTER_STREAM = os.environ.get("EMAIL_OUTBOX_DEAD_LETTER_STREAM", "email-outbox:dead")
+EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get("EMAIL_OUTBOX_BATCH_SIZE", 50))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get("EMAIL_OUTBOX_MAX_ATTEMPTS", 8))
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = float(os.environ.get("EMAIL_OUTBOX_RETRY_BASE_SECONDS", 60))
+EMAIL_OUTBOX_RETRY_MAX_SECONDS = float(os.environ.get("EMAIL_OUTBOX_RETRY_MAX_SECONDS", 3600))
+EMAIL_OUTBOX_PENDING_SCAN_SIZE = int(os.environ.get("EMAIL_OUTBOX_PENDING_SCAN_SIZE", 500))
+EMAIL_OUTBOX_BLOCK_SECONDS = float(os.environ.get("EMAIL_OUTBOX_BLOCK_SECONDS", 1))
+EMAIL_OUTBOX_ERROR_RETRY_SECONDS = float(os.environ.get("EMAIL_OUTBOX_ERROR_RETRY_SECONDS", 1))
+
+logger = logging.getLogger("email_outbox")
+
+
+def retry_delay(attempts: int) -> float:
+    """
+    Returns how long an email waits before it is sent again.
+
+    Args:
+        attempts (int): The number of times the email was handed to a worker so far.
+
+    Returns:
+        float: The delay in seconds, doubling with every attempt up to EMAIL_OUTBOX_RETRY_MAX_SECONDS.
+    """
+    return min(EMAIL_OUTBOX_RETRY_BASE_SECONDS * 2 ** min(max(attempts - 1, 0), 32), EMAIL_OUTBOX_RETRY_MAX_SECONDS)
+
+
+class RedisEmailOutbox(IEmailSender):
+    """
+    An email sender that implements the IEmailSender interface by queueing emails in a Redis
+    stream, and a worker that sends the queued emails with another IEmailSender.
+
+    Every process reads the stream as a consumer of one group, so each email is taken by one
+    worker. An email is removed from the stream once it was sent. An email whose send failed, or
+    whose worker died, stays pending in the group and is claimed again after retry_delay() of
+    its attempts; after EMAIL_OUTBOX_MAX_ATTEMPTS it is moved to a dead letter stream. Emails are
+    therefore sent at least once, and in rare cases (a worker dying right after sending) twice.
+
+    Attributes:
+        sender (IEmailSender): The sender that delivers the emails.
+        consumer (str): The name of this worker in the consumer group.
+
+    Methods:
+        send_email(subject, recipients, body): Queues an email.
+        send_many(emails): Queues several emails in one round trip.
+        process_batch(block_seconds): Sends one batch of due emails.
+        start(): Starts sending queued emails in a background task.
+        stop(): Stops sending queued emails.
+    """
+
+    def __init__(self, sender: IEmailSender, redis: Optional[aioredis.Redis] = None, consumer: Optional[str] = None):
+        """
+        Initializes the RedisEmailOutbox.
+
+        Args:
+            sender (IEmailSender): The sender that delivers the emails.
+            redis (aioredis.Redis, optional): The Redis client. Defaults to one for REDIS_URL.
+            consumer (str, optional): The name of this worker. Defaults to the host name and process ID.
+        """
+        self.sender = sender
+        self.redis = redis if redis is not None else aioredis.from_url(
+            REDIS_URL, encoding="utf-8", decode_responses=True
+        )
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self._group_created = False
+        self._worker: Optional[asyncio.Task] = None
+
+    async def send_email(self, subject: str, recipients: List[str], body: str, html: Optional[str] = None):
+        """
+        Queues an email. It is sent by a worker after the call returns.
+
+        Args:
+            subject (str): The subject of the email.
+            recipients (List[str]): A list of recipient email addresses.
+            body (str): The plain text body of the email.
+            html (str, optional): The HTML body of the email.
+
+        Returns:
+            None
+        """
+        await self.send_many([EmailOut(subject=subject, recipients=recipients, body=body, html=html)])
+
+    async def send_many(self, emails: List[EmailOut]) -> List[Optional[Exception]]:
+        """
+        Queues several emails in one round trip.
+
+        Args:
+            emails (List[EmailOut]): The emails to queue.
+
+        Returns:
+            List[Optional[Exception]]: None for each email, as all of them were queued.
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for email in emails:
+                pipe.xadd(EMAIL_OUTBOX_STREAM, {"email": email.model_dump_json()})
+            await pipe.execute()
+        return [None] * len(emails)
+
+    async def process_batch(self, block_seconds: float = 0) -> int:
+        """
+        Sends one batch of due emails: pending emails whose retry delay has passed, or else
+        newly queued ones.
+
+        Args:
+            block_seconds (float, optional): How long to wait for new emails if none are due.
+
+        Returns:
+            int: The number of emails taken from the stream.
+        """
+        await self._create_group()
+        entries = await self._claim_due_retries()
+        if not entries:
+            response = await self.redis.xreadgroup(
+                EMAIL_OUTBOX_GROUP, self.consumer, {EMAIL_OUTBOX_STREAM: ">"},
+                count=EMAIL_OUTBOX_BATCH_SIZE, block=int(block_seconds * 1000) or None,
+            )
+            entries = [(entry_id, fields, 1) for entry_id, fields in response[0][1]] if response else []
+        if not entries:
+            return 0
+
+        sendable, dead = [], []
+        for entry_id, fields, attempts in entries:
+            if fields is None:
+                # Deleted by the worker that sent it after this one had listed it as pending.
+                continue
+            try:
+                sendable.append((entry_id, EmailOut.model_validate_json(fields["email"]), attempts))
+            except Exception as e:
+                dead.append((entry_id, fields, attempts, e))
+
+        errors = await self.sender.send_many([email for _, email, _ in sendable]) if sendable else []
+
+        sent_ids = []
+        for (entry_id, email, attempts), error in zip(sendable, errors):
+            if error is None:
+                sent_ids.append(entry_id)
+            elif attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+                dead.append((entry_id, {"email": email.model_dump_json()}, attempts, error))
+            else:
+                logger.warning(f"Failed to send email {entry_id} (attempt {attempts}), retrying in "
+                               f"{retry_delay(attempts):.0f}s: {error}")
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for entry_id, fields, attempts, error in dead:
+                logger.error(f"Giving up on email {entry_id} after {attempts} attempts: {error}")
+                pipe.xadd(EMAIL_OUTBOX_DEAD_LETTER_STREAM, {**fields, "attempts": attempts, "error": str(error)})
+            done = sent_ids + [entry_id for entry_id, *_ in dead]
+            if done:
+                pipe.xack(EMAIL_OUTBOX_STREAM, EMAIL_OUTBOX_GROUP, *done)
+                pipe.xdel(EMAIL_OUTBOX_STREAM, *done)
+            await pipe.execute()
+        return len(entries)
+
+    def start(self):
+        """
+        Starts sending queued emails in a background task.
+
+        Returns:
+            None
+        """
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._work())
+
+    async def stop(self):
+        """
+        Stops sending queued emails. Emails taken but not sent are sent again by a worker later.
+
+        Returns:
+            None
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def _create_group(self):
+        if self._group_created:
+            return
+        try:
+            await self.redis.xgroup_create(EMAIL_OUTBOX_STREAM, EMAIL_OUTBOX_GROUP, id="0", mkstream=True)
+        except aioredis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_created = True
+
+    async def _claim_due_retries(self) -> List[Tuple[str, Optional[dict], int]]:
+        pending = await self.redis.xpending_range(
+            EMAIL_OUTBOX_STREAM, EMAIL_OUTBOX_GROUP, "-", "+", EMAIL_OUTBOX_PENDING_SCAN_SIZE
+        )
+        claimed = []
+        for entry in pending:
+            attempts = entry["times_delivered"]
+            min_idle_ms = int(retry_delay(attempts) * 1000)
+            if entry["time_since_delivered"] < min_idle_ms:
+                continue
+            # XCLAIM checks the idle time again, so of several workers only one claims the entry.
+            for entry_id, fields in await self.redis.xclaim(
+                EMAIL_OUTBOX_STREAM, EMAIL_OUTBOX_GROUP, self.consumer, min_idle_ms, [entry["message_id"]]
+            ):
+                claimed.append((entry_id, fields, attempts + 1))
+            if len(claimed) >= EMAIL_OUTBOX_BATCH_SIZE:
+                break
+        return claimed
+
+    async def _work(self):
+        while True:
+            try:
+                await self.process_batch(EMAIL_OUTBOX_BLOCK_SECONDS)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Email outbox worker failed, retrying: {e}")
+                await asyncio.sleep(EMAIL_OUTBOX_ERROR_RETRY_SECONDS)
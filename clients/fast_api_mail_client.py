@@ -1,35 +1,190 @@
 """
 FastAPI Mail Client Module
 
-This module provides a client for sending emails using FastAPI Mail.
+This module provides a client for sending emails with the FastAPI Mail connection settings over
+a pool of reused SMTP connections.
 """
 
+import asyncio
 import logging
 import os
-from typing import List
+import socket
+import time
+from email.message import Message
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import formataddr, formatdate, make_msgid
+from typing import Iterator, List, Optional, Tuple
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
+import aiosmtplib
+from fastapi_mail import ConnectionConfig
 from pydantic import EmailStr
 
+from schemas.emails import EmailOut
 from services.auth_service import IEmailSender
 
+MAIL_POOL_SIZE = int(os.environ.get("MAIL_POOL_SIZE", 4))
+MAIL_POOL_IDLE_SECONDS = float(os.environ.get("MAIL_POOL_IDLE_SECONDS", 60))
+MAIL_POOL_KEEPALIVE_SECONDS = float(os.environ.get("MAIL_POOL_KEEPALIVE_SECONDS", 15))
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("email_sender")
 
 
+class SMTPConnectionPool:
+    """
+    A pool of logged-in SMTP connections, so that sending an email does not pay for a TCP
+    connection, a TLS handshake and a login every time.
+
+    At most size connections are open at once; further callers wait for one to be released.
+    Connections idle for longer than keepalive_seconds are checked with NOOP before reuse, and
+    connections idle for longer than idle_seconds are closed instead, as servers drop them.
+
+    Attributes:
+        size (int): The maximum number of open connections.
+        opened (int): The number of connections opened so far.
+
+    Methods:
+        acquire(): Takes a connection from the pool, opening one if none is idle.
+        release(smtp): Returns a connection to the pool.
+        reconnect(smtp): Replaces a broken connection with a new one.
+        close(): Closes the idle connections.
+    """
+
+    def __init__(self, config: ConnectionConfig, size: int = MAIL_POOL_SIZE,
+                 idle_seconds: float = MAIL_POOL_IDLE_SECONDS, keepalive_seconds: float = MAIL_POOL_KEEPALIVE_SECONDS):
+        """
+        Initializes the SMTPConnectionPool. Connections are opened on demand.
+
+        Args:
+            config (ConnectionConfig): The mail server settings.
+            size (int, optional): The maximum number of open connections.
+            idle_seconds (float, optional): How long a connection may stay idle before it is closed.
+            keepalive_seconds (float, optional): How long a connection may stay idle before it is checked.
+        """
+        self.config = config
+        self.size = size
+        self.idle_seconds = idle_seconds
+        self.keepalive_seconds = keepalive_seconds
+        self.opened = 0
+        self._idle: List[Tuple[aiosmtplib.SMTP, float]] = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def acquire(self) -> aiosmtplib.SMTP:
+        """
+        Takes a connection from the pool, opening one if none is idle. Every acquired connection
+        must be passed to release(), also when using it failed.
+
+        Returns:
+            aiosmtplib.SMTP: A connected and logged-in SMTP client.
+        """
+        await self._slots.acquire()
+        try:
+            while self._idle:
+                smtp, released_at = self._idle.pop()
+                idle = time.monotonic() - released_at
+                if idle > self.idle_seconds or not smtp.is_connected:
+                    smtp.close()
+                    continue
+                if idle > self.keepalive_seconds:
+                    try:
+                        await smtp.noop()
+                    except aiosmtplib.SMTPException:
+                        smtp.close()
+                        continue
+                return smtp
+            return await self._open()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, smtp: Optional[aiosmtplib.SMTP]):
+        """
+        Returns a connection to the pool, or closes it if it is no longer connected.
+
+        Args:
+            smtp (aiosmtplib.SMTP, optional): The connection, or None if it could not be replaced.
+
+        Returns:
+            None
+        """
+        if smtp is not None:
+            if smtp.is_connected:
+                self._idle.append((smtp, time.monotonic()))
+            else:
+                smtp.close()
+        self._slots.release()
+
+    async def reconnect(self, smtp: aiosmtplib.SMTP) -> aiosmtplib.SMTP:
+        """
+        Replaces a broken connection with a new one, keeping its place in the pool.
+
+        Args:
+            smtp (aiosmtplib.SMTP): The broken connection.
+
+        Returns:
+            aiosmtplib.SMTP: A new connected and logged-in SMTP client.
+        """
+        smtp.close()
+        return await self._open()
+
+    async def close(self):
+        """
+        Closes the idle connections.
+
+        Returns:
+            None
+        """
+        idle, self._idle = self._idle, []
+        for smtp, _ in idle:
+            try:
+                await smtp.quit()
+            except aiosmtplib.SMTPException:
+                smtp.close()
+
+    async def _open(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.config.MAIL_SERVER,
+            port=self.config.MAIL_PORT,
+            timeout=self.config.TIMEOUT,
+            use_tls=self.config.MAIL_SSL_TLS,
+            start_tls=self.config.MAIL_STARTTLS,
+            validate_certs=self.config.VALIDATE_CERTS,
+        )
+        await smtp.connect()
+        try:
+            if self.config.USE_CREDENTIALS:
+                await smtp.login(self.config.MAIL_USERNAME, self.config.MAIL_PASSWORD.get_secret_value())
+        except BaseException:
+            smtp.close()
+            raise
+        self.opened += 1
+        return smtp
+
+
 class FastApiMailClient(IEmailSender):
     """
-    A client for sending emails using FastAPI Mail that implements the IEmailSender interface.
+    A client for sending emails using FastAPI Mail settings that implements the IEmailSender interface.
+
+    Attributes:
+        config (ConnectionConfig): The mail server settings.
+        pool (SMTPConnectionPool): The reused SMTP connections.
 
     Methods:
         send_email(subject, recipients, body): Sends an email with the specified subject, recipients, and body.
+        send_many(emails): Sends several emails over the pooled connections.
+        close(): Closes the pooled connections.
     """
 
-    def __init__(self):
+    def __init__(self, config: Optional[ConnectionConfig] = None, pool_size: int = MAIL_POOL_SIZE):
         """
         Initializes the FastAPI Mail client with configuration from environment variables.
+
+        Args:
+            config (ConnectionConfig, optional): The mail server settings. Defaults to the environment variables.
+            pool_size (int, optional): The maximum number of open SMTP connections.
         """
-        self.config = ConnectionConfig(
+        self.config = config or ConnectionConfig(
             MAIL_USERNAME=os.environ.get("MAIL_USERNAME", ""),
             MAIL_PASSWORD=os.environ.get("MAIL_PASSWORD", ""),
             MAIL_FROM=os.environ.get("MAIL_FROM", "user@example.com"),
@@ -39,31 +194,108 @@ class FastApiMailClient(IEmailSender):
             MAIL_STARTTLS=False,
             MAIL_SSL_TLS=True
         )
-        self.mailer = FastMail(self.config)
+        self.pool = SMTPConnectionPool(self.config, size=pool_size)
+        # Looked up once: make_msgid() would resolve the host name again for every message.
+        self._message_id_domain = socket.getfqdn()
 
-    async def send_email(self, subject: str, recipients: List[EmailStr], body: str):
+    async def send_email(self, subject: str, recipients: List[EmailStr], body: str, html: Optional[str] = None):
         """
         Sends an email with the specified subject, recipients, and body.
 
         Args:
             subject (str): The subject of the email.
             recipients (List[EmailStr]): A list of recipient email addresses.
-            body (str): The body of the email.
+            body (str): The plain text body of the email.
+            html (str, optional): The HTML body of the email.
 
         Returns:
             None
         """
-        message = MessageSchema(
-            subject=subject,
-            recipients=recipients,
-            body=body,
-            subtype=MessageType.plain
+        await self.send_many([EmailOut(subject=subject, recipients=recipients, body=body, html=html)])
+
+    async def send_many(self, emails: List[EmailOut]) -> List[Optional[Exception]]:
+        """
+        Sends several emails, spread over up to pool size connections that are kept open for
+        later calls.
+
+        Args:
+            emails (List[EmailOut]): The emails to send.
+
+        Returns:
+            List[Optional[Exception]]: For each email, None if it was sent, or the error it failed with.
+        """
+        results = await self._send_messages([self._build_message(email) for email in emails])
+        for email, error in zip(emails, results):
+            if error is not None:
+                logger.error(f"Failed to send email to {email.recipients}. Error: {error}")
+        # Only counted at INFO: formatting every message would cost more than building it.
+        logger.info(f"Sent {results.count(None)} of {len(emails)} emails")
+        return results
+
+    async def close(self):
+        """
+        Closes the pooled connections.
+
+        Returns:
+            None
+        """
+        await self.pool.close()
+
+    def _build_message(self, email: EmailOut) -> Message:
+        # The email.mime classes are used over EmailMessage, whose header parsing costs several
+        # times more CPU per email.
+        message: Message = MIMEText(email.body, "plain", "utf-8")
+        if email.html is not None:
+            message = MIMEMultipart("alternative", _subparts=[message, MIMEText(email.html, "html", "utf-8")])
+        message["From"] = (
+            formataddr((self.config.MAIL_FROM_NAME, self.config.MAIL_FROM))
+            if self.config.MAIL_FROM_NAME is not None else self.config.MAIL_FROM
         )
+        message["To"] = ", ".join(email.recipients)
+        message["Subject"] = email.subject
+        message["Date"] = formatdate(localtime=True)
+        message["Message-ID"] = make_msgid(domain=self._message_id_domain)
+        return message
 
-        logger.info(f"Sending email to {recipients}: {message}")
+    async def _send_messages(self, messages: List[Message]) -> List[Optional[Exception]]:
+        results: List[Optional[Exception]] = [None] * len(messages)
+        pending = iter(range(len(messages)))
+        workers = min(self.pool.size, len(messages))
+        await asyncio.gather(*(self._send_from(messages, pending, results) for _ in range(workers)))
+        return results
 
+    async def _send_from(self, messages: List[Message], pending: Iterator[int], results: List[Optional[Exception]]):
+        # Each worker holds one connection and takes the next unsent message until none are left.
         try:
-            await self.mailer.send_message(message)
-            logger.info(f"Email sent successfully to {recipients}")
+            smtp = await self.pool.acquire()
         except Exception as e:
-            logger.error(f"Failed to send email to {recipients}. Error: {e}")
+            self._fail_remaining(pending, results, e)
+            return
+        try:
+            for index in pending:
+                try:
+                    await smtp.send_message(messages[index])
+                except aiosmtplib.SMTPServerDisconnected:
+                    # The server closed a kept-alive connection; the message is sent again once.
+                    try:
+                        smtp = await self.pool.reconnect(smtp)
+                    except Exception as e:
+                        smtp = None
+                        results[index] = e
+                        self._fail_remaining(pending, results, e)
+                        return
+                    try:
+                        await smtp.send_message(messages[index])
+                    except Exception as e:
+                        results[index] = e
+                except Exception as e:
+                    results[index] = e
+        finally:
+            self.pool.release(smtp)
+
+    @staticmethod
+    def _fail_remaining(pending: Iterator[int], results: List[Optional[Exception]], error: Exception):
+        # The server cannot be reached, so the other messages fail right away instead of each
+        # waiting for its own connection timeout.
+        for index in pending:
+            results[index] = error
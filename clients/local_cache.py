@@ -0,0 +1,413 @@
+"""
+Local Cache Module
+
+This module provides a bounded in-process cache with per-entry expiry, and a two-tier cache that
+places it in front of a remote ICache so hot keys are served without network I/O.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from services.auth_service import ICache
+
+LOCAL_CACHE_MAX_SIZE = int(os.environ.get("LOCAL_CACHE_MAX_SIZE", 10000))
+LOCAL_CACHE_TTL = float(os.environ.get("LOCAL_CACHE_TTL", 30))
+CACHE_INVALIDATION_CHANNEL = os.environ.get("CACHE_INVALIDATION_CHANNEL", "cache-invalidation")
+CACHE_INVALIDATION_RETRY_SECONDS = float(os.environ.get("CACHE_INVALIDATION_RETRY_SECONDS", 1))
+
+logger = logging.getLogger("local_cache")
+
+
+class LocalTTLCache:
+    """
+    An in-process LRU cache whose entries also expire after a time-to-live.
+
+    The cache is meant to be used from a single event loop and does no locking.
+
+    Attributes:
+        max_size (int): The maximum number of entries kept; the least recently used entry is evicted beyond it.
+        ttl (float): The longest time in seconds an entry is kept.
+        hits (int): The number of lookups answered from the cache.
+        misses (int): The number of lookups for missing or expired keys.
+        evictions (int): The number of entries dropped to stay within max_size.
+
+    Methods:
+        get(key): Retrieves a value if it is present and not expired.
+        set(key, value, ttl): Stores a value for at most ttl seconds.
+        delete(key): Removes a value.
+        clear(): Removes all values.
+        stats(): Returns the size of the cache and its counters.
+    """
+
+    def __init__(self, max_size: int = LOCAL_CACHE_MAX_SIZE, ttl: float = LOCAL_CACHE_TTL,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initializes the LocalTTLCache.
+
+        Args:
+            max_size (int, optional): The maximum number of entries.
+            ttl (float, optional): The longest time in seconds an entry is kept.
+            clock (Callable[[], float], optional): Returns the current time in seconds.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str):
+        """
+        Retrieves a value if it is present and not expired, marking it as recently used.
+
+        Args:
+            key (str): The key of the cached value.
+
+        Returns:
+            str: The cached value, or None if the key is missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        """
+        Stores a value, evicting the least recently used entries if the cache is full.
+
+        Args:
+            key (str): The key for the cached value.
+            value (str): The value to cache.
+            ttl (float, optional): The time-to-live in seconds, capped at the cache's own ttl.
+
+        Returns:
+            None
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._entries[key] = (self.clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str):
+        """
+        Removes a value from the cache.
+
+        Args:
+            key (str): The key of the value to remove.
+
+        Returns:
+            None
+        """
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Removes all values from the cache.
+
+        Returns:
+            None
+        """
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the size of the cache and its counters.
+
+        Returns:
+            Dict[str, int]: The size, hits, misses and evictions.
+        """
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class TieredCache(ICache):
+    """
+    A cache that checks a LocalTTLCache before a remote ICache.
+
+    Reads fill the local tier from the remote one; writes and deletes go to both. When an
+    invalidation channel is given, every delete is also published on it, and each process
+    evicts published keys from its own local tier. The remote cache must then support
+    ``publish`` and ``subscribe``, as RedisCache does. Because a missed message could leave a
+    stale entry behind, the local tier is only used while the subscription is up.
+
+    Without a channel, a value may be stale in other processes for up to the local ttl after it changes.
+
+    Objects are kept in the local tier already deserialized, so a local hit costs no decoding;
+    callers must not modify the objects they get back.
+
+    Methods:
+        get(key): Retrieves a value from the local tier, falling back to the remote tier.
+        set(key, value, ttl): Stores a value in both tiers.
+        delete(key): Deletes a value from both tiers and tells the other processes to drop it.
+        get_object(key): Retrieves an object from the local tier, falling back to the remote tier.
+        set_object(key, value, ttl): Stores an object in both tiers.
+        get_many(keys): Retrieves several values, asking the remote tier only for local misses.
+        set_many(items, ttl): Stores several values in both tiers.
+        delete_many(keys): Deletes several values from both tiers and tells the other processes to drop them.
+        set_if_absent(key, value, ttl): Stores a value in the remote tier only if the key does not exist there.
+        incr(key, ttl): Increments a counter in the remote tier.
+        start(): Starts listening for invalidations from other processes.
+        stop(): Stops listening for invalidations.
+    """
+
+    def __init__(self, remote: ICache, local: Optional[LocalTTLCache] = None, channel: Optional[str] = None):
+        """
+        Initializes the TieredCache.
+
+        Args:
+            remote (ICache): The shared cache, e.g. RedisCache.
+            local (LocalTTLCache, optional): The in-process tier.
+            channel (str, optional): The pub/sub channel used to broadcast deletes between processes.
+        """
+        self.remote = remote
+        self.local = local if local is not None else LocalTTLCache()
+        self.channel = channel
+        self.listening = False
+        self.invalidations = 0
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def local_enabled(self) -> bool:
+        """
+        bool: Whether the local tier may be used, i.e. no invalidation can have been missed.
+        """
+        return self.channel is None or self.listening
+
+    async def get(self, key: str):
+        """
+        Retrieves a value from the local tier, falling back to the remote tier.
+
+        Args:
+            key (str): The key of the cached value.
+
+        Returns:
+            str: The cached value, or None if the key does not exist.
+        """
+        return await self._get_through(key, self.remote.get)
+
+    async def set(self, key: str, value: str, ttl: int):
+        """
+        Stores a value in both tiers.
+
+        Other processes are not notified; to change a value they may hold, delete it instead.
+
+        Args:
+            key (str): The key for the cached value.
+            value (str): The value to cache.
+            ttl (int): The time-to-live for the cached value in seconds.
+
+        Returns:
+            None
+        """
+        await self.remote.set(key, value, ttl)
+        if self.local_enabled:
+            self.local.set(key, value, ttl)
+
+    async def delete(self, key: str):
+        """
+        Deletes a value from both tiers and tells the other processes to drop their local copy.
+
+        Args:
+            key (str): The key of the value to delete.
+
+        Returns:
+            None
+        """
+        self.invalidations += 1
+        self.local.delete(key)
+        await self.remote.delete(key)
+        if self.channel is not None:
+            await self.remote.publish(self.channel, key)
+
+    async def get_object(self, key: str) -> Any:
+        """
+        Retrieves an object from the local tier, falling back to the remote tier.
+
+        Args:
+            key (str): The key of the cached object.
+
+        Returns:
+            Any: The cached object, or None if the key does not exist.
+        """
+        return await self._get_through(key, self.remote.get_object)
+
+    async def set_object(self, key: str, value: Any, ttl: int):
+        """
+        Stores an object in both tiers.
+
+        Other processes are not notified; to change an object they may hold, delete it instead.
+
+        Args:
+            key (str): The key for the cached object.
+            value (Any): The JSON-compatible object to cache.
+            ttl (int): The time-to-live for the cached object in seconds.
+
+        Returns:
+            None
+        """
+        await self.remote.set_object(key, value, ttl)
+        if self.local_enabled:
+            self.local.set(key, value, ttl)
+
+    async def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        """
+        Retrieves several values, asking the remote tier only for the keys missing locally.
+
+        Args:
+            keys (List[str]): The keys of the cached values.
+
+        Returns:
+            List[Optional[str]]: The values in the order of keys, None for missing keys.
+        """
+        if not self.local_enabled:
+            return await self.remote.get_many(keys)
+
+        values = [self.local.get(key) for key in keys]
+        missing = [index for index, value in enumerate(values) if value is None]
+        if missing:
+            invalidations = self.invalidations
+            fetched = await self.remote.get_many([keys[index] for index in missing])
+            keep = invalidations == self.invalidations and self.local_enabled
+            for index, value in zip(missing, fetched):
+                values[index] = value
+                if keep and value is not None:
+                    self.local.set(keys[index], value)
+        return values
+
+    async def set_many(self, items: Dict[str, str], ttl: int):
+        """
+        Stores several values in both tiers.
+
+        Other processes are not notified; to change values they may hold, delete them instead.
+
+        Args:
+            items (Dict[str, str]): The values to cache by key.
+            ttl (int): The time-to-live for the cached values in seconds.
+
+        Returns:
+            None
+        """
+        await self.remote.set_many(items, ttl)
+        if self.local_enabled:
+            for key, value in items.items():
+                self.local.set(key, value, ttl)
+
+    async def delete_many(self, keys: List[str]):
+        """
+        Deletes several values from both tiers and tells the other processes to drop them
+        with a single message.
+
+        Args:
+            keys (List[str]): The keys of the values to delete.
+
+        Returns:
+            None
+        """
+        if not keys:
+            return
+        self.invalidations += 1
+        for key in keys:
+            self.local.delete(key)
+        await self.remote.delete_many(keys)
+        if self.channel is not None:
+            await self.remote.publish(self.channel, "\n".join(keys))
+
+    async def set_if_absent(self, key: str, value: str, ttl: int) -> bool:
+        """
+        Stores a value in the remote tier only if the key does not exist there.
+
+        The local tier is skipped, so the result is consistent across processes, e.g. for locks.
+
+        Args:
+            key (str): The key for the value.
+            value (str): The value to store.
+            ttl (int): The time-to-live for the value in seconds.
+
+        Returns:
+            bool: True if the value was stored, False if the key already existed.
+        """
+        return await self.remote.set_if_absent(key, value, ttl)
+
+    async def _get_through(self, key: str, fetch: Callable[[str], Awaitable[Any]]) -> Any:
+        if not self.local_enabled:
+            return await fetch(key)
+        value = self.local.get(key)
+        if value is None:
+            # An invalidation that arrives while the remote read is in flight may concern the value
+            # being read, so it is then not kept locally.
+            invalidations = self.invalidations
+            value = await fetch(key)
+            if value is not None and invalidations == self.invalidations and self.local_enabled:
+                self.local.set(key, value)
+        return value
+
+    async def incr(self, key: str, ttl: int) -> int:
+        """
+        Increments a counter in the remote tier, which holds the only copy of counters.
+
+        Args:
+            key (str): The key of the counter.
+            ttl (int): The time-to-live for the counter in seconds.
+
+        Returns:
+            int: The incremented value.
+        """
+        return await self.remote.incr(key, ttl)
+
+    def start(self):
+        """
+        Starts listening for invalidations from other processes in a background task.
+
+        Returns:
+            None
+        """
+        if self.channel is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """
+        Stops listening for invalidations.
+
+        Returns:
+            None
+        """
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self):
+        while True:
+            try:
+                messages = await self.remote.subscribe(self.channel)
+                self.local.clear()
+                self.listening = True
+                async for message in messages:
+                    self.invalidations += 1
+                    for key in message.split("\n"):
+                        self.local.delete(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation subscription lost, local tier disabled: {e}")
+            finally:
+                self.listening = False
+                self.local.clear()
+            await asyncio.sleep(CACHE_INVALIDATION_RETRY_SECONDS)
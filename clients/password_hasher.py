@@ -0,0 +1,206 @@
+"""
+Password Hasher Module
+
+This module provides a password hasher that runs bcrypt in a bounded pool of worker processes,
+so hashing neither blocks the event loop nor holds the GIL of the serving process.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from services.auth_service import IPasswordHasher, pwd_context
+
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get("PASSWORD_HASH_QUEUE_SIZE", 32))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = 1
+
+logger = logging.getLogger("password_hasher")
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _timed(func: Callable, *args) -> Tuple[object, float]:
+    started = time.perf_counter()
+    return func(*args), time.perf_counter() - started
+
+
+def _warm_up():
+    return None
+
+
+class ProcessPoolPasswordHasher(IPasswordHasher):
+    """
+    A password hasher that implements the IPasswordHasher interface with a process pool.
+
+    At most max_workers hashes run at once and at most queue_size more wait for a worker. Calls
+    beyond that are rejected right away with 503 Service Unavailable instead of queueing
+    behind work that would take seconds to drain.
+
+    Attributes:
+        max_workers (int): The number of worker processes.
+        queue_size (int): The number of calls that may wait for a free worker.
+        in_flight (int): The number of calls running or waiting.
+        completed (int): The number of calls that finished.
+        rejected (int): The number of calls rejected because the queue was full.
+
+    Methods:
+        hash(password): Hashes a password.
+        verify(plain_password, hashed_password): Checks a password against a hash.
+        start(): Starts the worker processes.
+        stop(): Stops the worker processes.
+        stats(): Returns the queue depth, counters and latencies.
+    """
+
+    def __init__(self, max_workers: int = PASSWORD_HASH_WORKERS, queue_size: int = PASSWORD_HASH_QUEUE_SIZE):
+        """
+        Initializes the ProcessPoolPasswordHasher. The worker processes are started by start()
+        or by the first call.
+
+        Args:
+            max_workers (int, optional): The number of worker processes.
+            queue_size (int, optional): The number of calls that may wait for a free worker.
+        """
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+        self._max_latency_seconds = 0.0
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        int: The number of calls waiting for a free worker.
+        """
+        return max(0, self.in_flight - self.max_workers)
+
+    async def hash(self, password: str) -> str:
+        """
+        Hashes a password in a worker process.
+
+        Args:
+            password (str): The plain password.
+
+        Returns:
+            str: The bcrypt hash.
+
+        Raises:
+            HTTPException: 503 if the queue is full.
+        """
+        return await self._run(_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Checks a password against a hash in a worker process.
+
+        Args:
+            plain_password (str): The plain password.
+            hashed_password (str): The bcrypt hash.
+
+        Returns:
+            bool: True if the password matches the hash.
+
+        Raises:
+            HTTPException: 503 if the queue is full.
+        """
+        return await self._run(_verify, plain_password, hashed_password)
+
+    def start(self):
+        """
+        Starts the worker processes so the first requests do not wait for them.
+
+        Returns:
+            None
+        """
+        if self._pool is None:
+            # Forking a process that runs an event loop and database connections is unsafe, so the
+            # workers are started fresh.
+            self._pool = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+            for _ in range(self.max_workers):
+                self._pool.submit(_warm_up)
+
+    def stop(self):
+        """
+        Stops the worker processes, dropping calls that have not started.
+
+        Returns:
+            None
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the queue depth, counters and latencies.
+
+        Returns:
+            Dict[str, float]: The workers, in-flight calls, queue depth, completed and rejected
+            calls, average time spent waiting for and running in a worker, and the longest call,
+            in milliseconds.
+        """
+        completed = self.completed or 1
+        return {
+            "workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": self._wait_seconds / completed * 1000,
+            "avg_run_ms": self._run_seconds / completed * 1000,
+            "max_latency_ms": self._max_latency_seconds * 1000,
+        }
+
+    async def _run(self, func: Callable, *args):
+        if self.in_flight >= self.max_workers + self.queue_size:
+            self.rejected += 1
+            logger.warning(f"Password hashing queue is full, rejecting request: {self.stats()}")
+            raise self._busy()
+
+        self.start()
+        pool = self._pool
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            result, run_seconds = await asyncio.get_running_loop().run_in_executor(pool, _timed, func, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); the next call starts a new pool.
+            if self._pool is pool:
+                logger.error("Password hashing worker died, restarting the pool")
+                pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+            raise self._busy()
+        finally:
+            self.in_flight -= 1
+
+        latency = time.perf_counter() - started
+        self.completed += 1
+        self._run_seconds += run_seconds
+        self._wait_seconds += max(0.0, latency - run_seconds)
+        self._max_latency_seconds = max(self._max_latency_seconds, latency)
+        return result
+
+    @staticmethod
+    def _busy() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again later",
+            headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+        )
@@ -5,9 +5,11 @@ This module provides a client for interacting with Redis for caching purposes.
 """
 
 import os
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 import aioredis
 
+from clients.cache_codecs import CacheCodec, get_codec
 from services.auth_service import ICache
 
 REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379")
@@ -17,17 +19,33 @@ class RedisCache(ICache):
     """
     A Redis client for caching that implements the ICache interface.
 
+    Attributes:
+        codec (CacheCodec): Serializes the values stored with set_object.
+
     Methods:
         get(key): Retrieves a value from the cache by its key.
         set(key, value, ttl): Stores a value in the cache with a time-to-live (TTL).
         delete(key): Deletes a value from the cache by its key.
+        get_object(key): Retrieves and deserializes an object from the cache.
+        set_object(key, value, ttl): Serializes and stores an object with a time-to-live (TTL).
+        get_many(keys): Retrieves several values with one MGET.
+        set_many(items, ttl): Stores several values in one pipelined round trip.
+        delete_many(keys): Deletes several values with one DEL.
+        set_if_absent(key, value, ttl): Stores a value only if the key does not exist.
+        incr(key, ttl): Increments a counter and restarts its time-to-live.
+        publish(channel, message): Publishes a message to a pub/sub channel.
+        subscribe(channel): Subscribes to a pub/sub channel.
     """
 
-    def __init__(self):
+    def __init__(self, codec: Optional[CacheCodec] = None):
         """
         Initializes the Redis client with configuration from environment variables.
+
+        Args:
+            codec (CacheCodec, optional): The codec for objects. Defaults to the one named by CACHE_CODEC.
         """
         self.redis = aioredis.from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
+        self.codec = codec if codec is not None else get_codec()
 
     async def get(self, key: str):
         """
@@ -66,3 +84,145 @@ class RedisCache(ICache):
             None
         """
         await self.redis.delete(key)
+
+    async def get_object(self, key: str) -> Any:
+        """
+        Retrieves and deserializes an object from the cache.
+
+        Args:
+            key (str): The key of the cached object.
+
+        Returns:
+            Any: The cached object, or None if the key does not exist.
+        """
+        data = await self.redis.get(key)
+        return None if data is None else self.codec.decode(data)
+
+    async def set_object(self, key: str, value: Any, ttl: int):
+        """
+        Serializes and stores an object in the cache with a time-to-live (TTL).
+
+        Args:
+            key (str): The key for the cached object.
+            value (Any): The JSON-compatible object to cache.
+            ttl (int): The time-to-live for the cached object in seconds.
+
+        Returns:
+            None
+        """
+        await self.redis.setex(key, ttl, self.codec.encode(value))
+
+    async def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        """
+        Retrieves several values from the cache with a single MGET.
+
+        Args:
+            keys (List[str]): The keys of the cached values.
+
+        Returns:
+            List[Optional[str]]: The values in the order of keys, None for missing keys.
+        """
+        if not keys:
+            return []
+        return await self.redis.mget(keys)
+
+    async def set_many(self, items: Dict[str, str], ttl: int):
+        """
+        Stores several values with the same time-to-live in one pipelined round trip.
+
+        Args:
+            items (Dict[str, str]): The values to cache by key.
+            ttl (int): The time-to-live for the cached values in seconds.
+
+        Returns:
+            None
+        """
+        if not items:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.setex(key, ttl, value)
+            await pipe.execute()
+
+    async def delete_many(self, keys: List[str]):
+        """
+        Deletes several values from the cache with a single DEL.
+
+        Args:
+            keys (List[str]): The keys of the values to delete.
+
+        Returns:
+            None
+        """
+        if keys:
+            await self.redis.delete(*keys)
+
+    async def set_if_absent(self, key: str, value: str, ttl: int) -> bool:
+        """
+        Stores a value with a time-to-live only if the key does not exist, using SET NX EX.
+
+        Args:
+            key (str): The key for the value.
+            value (str): The value to store.
+            ttl (int): The time-to-live for the value in seconds.
+
+        Returns:
+            bool: True if the value was stored, False if the key already existed.
+        """
+        return bool(await self.redis.set(key, value, ex=ttl, nx=True))
+
+    async def incr(self, key: str, ttl: int) -> int:
+        """
+        Increments a counter and restarts its time-to-live, in one round trip.
+
+        Args:
+            key (str): The key of the counter; a missing counter starts at 0.
+            ttl (int): The time-to-live for the counter in seconds.
+
+        Returns:
+            int: The incremented value.
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.incr(key)
+            pipe.expire(key, ttl)
+            value, _ = await pipe.execute()
+        return value
+
+    async def publish(self, channel: str, message: str):
+        """
+        Publishes a message to a pub/sub channel.
+
+        Args:
+            channel (str): The channel to publish to.
+            message (str): The message.
+
+        Returns:
+            None
+        """
+        await self.redis.publish(channel, message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[str]:
+        """
+        Subscribes to a pub/sub channel.
+
+        The subscription is active once this coroutine returns. Iterating the result yields the
+        messages published afterwards, and raises if the connection to Redis is lost.
+
+        Args:
+            channel (str): The channel to subscribe to.
+
+        Returns:
+            AsyncIterator[str]: The messages published to the channel.
+        """
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(channel)
+        return self._messages(pubsub)
+
+    @staticmethod
+    async def _messages(pubsub) -> AsyncIterator[str]:
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield message["data"]
+        finally:
+            await pubsub.close()
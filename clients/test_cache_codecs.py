@@ -0,0 +1,26 @@
+import pytest
+
+from clients.cache_codecs import JsonCodec, OrjsonCodec, get_codec
+
+VALUE = {"user": {"id": 1, "username": "alice", "avatar_url": None}, "delta": 0.004, "expires_at": 1760000000.5}
+
+
+@pytest.mark.parametrize("codec", [JsonCodec(), OrjsonCodec()])
+def test_round_trip(codec):
+    data = codec.encode(VALUE)
+
+    assert isinstance(data, bytes)
+    assert codec.decode(data) == VALUE
+    assert codec.decode(data.decode()) == VALUE
+
+
+def test_codecs_read_each_other():
+    assert OrjsonCodec().decode(JsonCodec().encode(VALUE)) == VALUE
+    assert JsonCodec().decode(OrjsonCodec().encode(VALUE)) == VALUE
+
+
+def test_get_codec():
+    assert isinstance(get_codec("json"), JsonCodec)
+    assert isinstance(get_codec("orjson"), OrjsonCodec)
+    with pytest.raises(ValueError):
+        get_codec("pickle")
@@ -0,0 +1,114 @@
+import pytest
+
+from clients.email_outbox import (
+    EMAIL_OUTBOX_DEAD_LETTER_STREAM,
+    EMAIL_OUTBOX_MAX_ATTEMPTS,
+    EMAIL_OUTBOX_STREAM,
+    RedisEmailOutbox,
+    retry_delay,
+)
+from schemas.emails import EmailOut
+
+
+class FakeSender:
+    def __init__(self):
+        self.batches = []
+        self.failures = set()
+
+    async def send_many(self, emails):
+        self.batches.append(emails)
+        return [ConnectionError("refused") if email.subject in self.failures else None for email in emails]
+
+
+@pytest.fixture
+def sender():
+    return FakeSender()
+
+
+@pytest.fixture
+def outbox(fake_redis, sender):
+    return RedisEmailOutbox(sender, redis=fake_redis, consumer="worker-1")
+
+
+@pytest.mark.asyncio
+async def test_send_email_only_queues(outbox, fake_redis, sender):
+    await outbox.send_email("Hello", ["user1@test.com"], "Body")
+
+    assert sender.batches == []
+    (fields,) = fake_redis.streams[EMAIL_OUTBOX_STREAM].values()
+    assert EmailOut.model_validate_json(fields["email"]) == EmailOut(
+        subject="Hello", recipients=["user1@test.com"], body="Body"
+    )
+
+
+@pytest.mark.asyncio
+async def test_process_batch_sends_queued_emails_together(outbox, fake_redis, sender):
+    await outbox.send_many([
+        EmailOut(subject=f"Email {i}", recipients=[f"user{i}@test.com"], body="Body") for i in range(3)
+    ])
+
+    assert await outbox.process_batch() == 3
+
+    assert [[email.subject for email in batch] for batch in sender.batches] == [["Email 0", "Email 1", "Email 2"]]
+    assert fake_redis.streams[EMAIL_OUTBOX_STREAM] == {}
+    assert fake_redis.pending == {}
+    assert await outbox.process_batch() == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_email_is_retried_after_backoff(outbox, fake_redis, sender):
+    sender.failures.add("Flaky")
+    await outbox.send_email("Flaky", ["user1@test.com"], "Body")
+    await outbox.process_batch()
+
+    assert len(fake_redis.pending) == 1
+    fake_redis.now_ms += int(retry_delay(1) * 1000) - 1
+    assert await outbox.process_batch() == 0
+
+    sender.failures.clear()
+    fake_redis.now_ms += 1
+    assert await outbox.process_batch() == 1
+
+    assert len(sender.batches) == 2
+    assert fake_redis.pending == {}
+    assert fake_redis.streams[EMAIL_OUTBOX_STREAM] == {}
+
+
+@pytest.mark.asyncio
+async def test_email_of_dead_worker_is_claimed_by_another(fake_redis, sender):
+    crashed = RedisEmailOutbox(FakeSender(), redis=fake_redis, consumer="worker-1")
+    crashed.sender.send_many = None
+    await crashed.send_email("Hello", ["user1@test.com"], "Body")
+    with pytest.raises(TypeError):
+        await crashed.process_batch()
+
+    fake_redis.now_ms += int(retry_delay(1) * 1000)
+    survivor = RedisEmailOutbox(sender, redis=fake_redis, consumer="worker-2")
+    assert await survivor.process_batch() == 1
+
+    assert [email.subject for email in sender.batches[0]] == ["Hello"]
+    assert fake_redis.pending == {}
+
+
+@pytest.mark.asyncio
+async def test_email_moves_to_dead_letters_after_max_attempts(outbox, fake_redis, sender):
+    sender.failures.add("Bounce")
+    await outbox.send_email("Bounce", ["user1@test.com"], "Body")
+
+    for attempt in range(1, EMAIL_OUTBOX_MAX_ATTEMPTS + 1):
+        await outbox.process_batch()
+        fake_redis.now_ms += int(retry_delay(attempt) * 1000)
+
+    assert len(sender.batches) == EMAIL_OUTBOX_MAX_ATTEMPTS
+    assert fake_redis.pending == {}
+    assert fake_redis.streams[EMAIL_OUTBOX_STREAM] == {}
+    (dead,) = fake_redis.streams[EMAIL_OUTBOX_DEAD_LETTER_STREAM].values()
+    assert dead["attempts"] == str(EMAIL_OUTBOX_MAX_ATTEMPTS)
+    assert dead["error"] == "refused"
+
+
+def test_retry_delay_doubles_up_to_the_maximum(monkeypatch):
+    monkeypatch.setattr("clients.email_outbox.EMAIL_OUTBOX_RETRY_BASE_SECONDS", 10)
+    monkeypatch.setattr("clients.email_outbox.EMAIL_OUTBOX_RETRY_MAX_SECONDS", 60)
+
+    assert [retry_delay(attempts) for attempts in range(1, 6)] == [10, 20, 40, 60, 60]
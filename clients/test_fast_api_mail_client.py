@@ -0,0 +1,139 @@
+import aiosmtplib
+import pytest
+from fastapi_mail import ConnectionConfig
+
+from clients.fast_api_mail_client import FastApiMailClient
+from schemas.emails import EmailOut
+
+
+class FakeSMTP:
+    instances = []
+    refuse_connections = False
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self.is_connected = False
+        self.sent = []
+        self.disconnect_next_send = False
+        FakeSMTP.instances.append(self)
+
+    async def connect(self):
+        if FakeSMTP.refuse_connections:
+            raise aiosmtplib.SMTPConnectError("refused")
+        self.is_connected = True
+
+    async def login(self, username, password):
+        pass
+
+    async def send_message(self, message):
+        if self.disconnect_next_send:
+            self.disconnect_next_send = False
+            self.is_connected = False
+            raise aiosmtplib.SMTPServerDisconnected("closed by server")
+        if message["To"] == "refused@test.com":
+            raise aiosmtplib.SMTPRecipientsRefused([])
+        self.sent.append(message)
+
+    async def noop(self):
+        pass
+
+    async def quit(self):
+        self.is_connected = False
+
+    def close(self):
+        self.is_connected = False
+
+
+@pytest.fixture(autouse=True)
+def fake_smtp(monkeypatch):
+    FakeSMTP.instances = []
+    FakeSMTP.refuse_connections = False
+    monkeypatch.setattr("clients.fast_api_mail_client.aiosmtplib.SMTP", FakeSMTP)
+
+
+@pytest.fixture
+def mail_client():
+    config = ConnectionConfig(
+        MAIL_USERNAME="user", MAIL_PASSWORD="password", MAIL_FROM="sender@test.com", MAIL_SERVER="smtp.test.com",
+        MAIL_PORT=465, MAIL_STARTTLS=False, MAIL_SSL_TLS=True,
+    )
+    return FastApiMailClient(config, pool_size=2)
+
+
+def _emails(*recipients):
+    return [EmailOut(subject="Subject", recipients=[recipient], body="Body") for recipient in recipients]
+
+
+@pytest.mark.asyncio
+async def test_send_many_reuses_pooled_connections(mail_client):
+    assert await mail_client.send_many(_emails(*(f"user{i}@test.com" for i in range(5)))) == [None] * 5
+    opened = len(FakeSMTP.instances)
+    assert await mail_client.send_many(_emails("user5@test.com")) == [None]
+
+    assert opened <= 2
+    assert len(FakeSMTP.instances) == opened
+    assert sum(len(smtp.sent) for smtp in FakeSMTP.instances) == 6
+    message = FakeSMTP.instances[0].sent[0]
+    assert message["From"] == "sender@test.com"
+    assert message["Date"]
+    assert message["Message-ID"].startswith("<") and message["Message-ID"].endswith(">")
+    assert message.get_payload(decode=True) == b"Body"
+    assert len({smtp_message["Message-ID"] for smtp in FakeSMTP.instances for smtp_message in smtp.sent}) == 6
+
+
+@pytest.mark.asyncio
+async def test_send_many_reports_each_failed_email(mail_client):
+    results = await mail_client.send_many(_emails("user1@test.com", "refused@test.com", "user2@test.com"))
+
+    assert results[0] is None
+    assert isinstance(results[1], aiosmtplib.SMTPRecipientsRefused)
+    assert results[2] is None
+
+
+@pytest.mark.asyncio
+async def test_send_many_reconnects_when_server_closed_connection(mail_client):
+    await mail_client.send_email("Subject", ["user1@test.com"], "Body")
+    FakeSMTP.instances[0].disconnect_next_send = True
+
+    assert await mail_client.send_many(_emails("user2@test.com")) == [None]
+
+    assert len(FakeSMTP.instances) == 2
+    assert [message["To"] for message in FakeSMTP.instances[1].sent] == ["user2@test.com"]
+
+
+@pytest.mark.asyncio
+async def test_send_many_fails_all_emails_when_server_is_unreachable(mail_client):
+    FakeSMTP.refuse_connections = True
+
+    results = await mail_client.send_many(_emails("user1@test.com", "user2@test.com", "user3@test.com"))
+
+    assert all(isinstance(result, aiosmtplib.SMTPConnectError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_idle_connections_are_replaced(mail_client):
+    await mail_client.send_email("Subject", ["user1@test.com"], "Body")
+    mail_client.pool.idle_seconds = -1
+
+    await mail_client.send_email("Subject", ["user2@test.com"], "Body")
+
+    assert len(FakeSMTP.instances) == 2
+    assert not FakeSMTP.instances[0].is_connected
+
+
+@pytest.mark.asyncio
+async def test_close_quits_idle_connections(mail_client):
+    await mail_client.send_email("Subject", ["user1@test.com"], "Body")
+
+    await mail_client.close()
+
+    assert not FakeSMTP.instances[0].is_connected
+
+
+@pytest.mark.asyncio
+async def test_send_email_with_html_sends_both_parts(mail_client):
+    await mail_client.send_email("Subject", ["user1@test.com"], "Body", "<p>Body</p>")
+
+    message = FakeSMTP.instances[0].sent[0]
+    assert message.get_content_type() == "multipart/alternative"
+    assert [part.get_content_type() for part in message.get_payload()] == ["text/plain", "text/html"]
@@ -0,0 +1,263 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from clients.local_cache import LocalTTLCache, TieredCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def local_cache(clock):
+    return LocalTTLCache(max_size=2, ttl=30, clock=clock)
+
+
+def test_get_hit_and_miss(local_cache):
+    local_cache.set("a", "1")
+
+    assert local_cache.get("a") == "1"
+    assert local_cache.get("b") is None
+    assert local_cache.stats() == {"size": 1, "hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_entries_expire(local_cache, clock):
+    local_cache.set("a", "1")
+    local_cache.set("b", "2", ttl=5)
+
+    clock.now = 5
+    assert local_cache.get("b") is None
+    assert local_cache.get("a") == "1"
+
+    clock.now = 30
+    assert local_cache.get("a") is None
+    assert local_cache.stats()["size"] == 0
+
+
+def test_ttl_is_capped_by_cache_ttl(local_cache, clock):
+    local_cache.set("a", "1", ttl=3600)
+
+    clock.now = 30
+    assert local_cache.get("a") is None
+
+
+def test_least_recently_used_entry_is_evicted(local_cache):
+    local_cache.set("a", "1")
+    local_cache.set("b", "2")
+    local_cache.get("a")
+    local_cache.set("c", "3")
+
+    assert local_cache.get("b") is None
+    assert local_cache.get("a") == "1"
+    assert local_cache.get("c") == "3"
+    assert local_cache.evictions == 1
+
+
+def test_delete_and_clear(local_cache):
+    local_cache.set("a", "1")
+    local_cache.set("b", "2")
+
+    local_cache.delete("a")
+    local_cache.delete("missing")
+    assert local_cache.get("a") is None
+
+    local_cache.clear()
+    assert local_cache.get("b") is None
+
+
+@pytest.mark.asyncio
+async def test_tiered_get_fills_local_tier(local_cache):
+    remote = AsyncMock()
+    remote.get.return_value = "user-json"
+    cache = TieredCache(remote, local_cache)
+
+    assert await cache.get("user:alice") == "user-json"
+    assert await cache.get("user:alice") == "user-json"
+
+    remote.get.assert_awaited_once_with("user:alice")
+    assert local_cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_tiered_get_does_not_cache_remote_miss(local_cache):
+    remote = AsyncMock()
+    remote.get.return_value = None
+    cache = TieredCache(remote, local_cache)
+
+    assert await cache.get("user:ghost") is None
+    assert await cache.get("user:ghost") is None
+    assert remote.get.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_tiered_set_and_delete_write_both_tiers(local_cache):
+    remote = AsyncMock()
+    cache = TieredCache(remote, local_cache)
+
+    await cache.set("user:alice", "user-json", 1800)
+    remote.set.assert_awaited_once_with("user:alice", "user-json", 1800)
+    assert local_cache.get("user:alice") == "user-json"
+
+    await cache.delete("user:alice")
+    remote.delete.assert_awaited_once_with("user:alice")
+    assert local_cache.get("user:alice") is None
+
+
+@pytest.mark.asyncio
+async def test_delete_invalidates_local_tier_of_other_processes(fake_remote_cache, settle):
+    worker_a = TieredCache(fake_remote_cache, LocalTTLCache(), channel="invalidate")
+    worker_b = TieredCache(fake_remote_cache, LocalTTLCache(), channel="invalidate")
+    worker_a.start()
+    worker_b.start()
+    await settle()
+
+    await worker_a.set("user:alice", "v1", 1800)
+    assert await worker_b.get("user:alice") == "v1"
+    assert worker_b.local.get("user:alice") == "v1"
+
+    await worker_a.delete("user:alice")
+    await settle()
+    assert worker_b.local.get("user:alice") is None
+    assert await worker_b.get("user:alice") is None
+
+    await worker_a.stop()
+    await worker_b.stop()
+
+
+@pytest.mark.asyncio
+async def test_local_tier_bypassed_until_subscribed(monkeypatch, fake_remote_cache, settle):
+    monkeypatch.setattr("clients.local_cache.CACHE_INVALIDATION_RETRY_SECONDS", 0)
+    fake_remote_cache.values["user:alice"] = "v1"
+    cache = TieredCache(fake_remote_cache, LocalTTLCache(), channel="invalidate")
+
+    assert await cache.get("user:alice") == "v1"
+    assert cache.local.stats()["size"] == 0
+
+    cache.start()
+    await settle()
+    assert await cache.get("user:alice") == "v1"
+    assert cache.local.stats()["size"] == 1
+
+    fake_remote_cache.subscribers[0].put_nowait(ConnectionError("lost"))
+    await asyncio.sleep(0)
+    assert cache.local.stats()["size"] == 0
+    await settle()
+    assert cache.listening
+    assert len(fake_remote_cache.subscribers) == 2
+
+    await cache.stop()
+    assert not cache.listening
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_remote_read_is_not_cached_locally(fake_remote_cache, settle):
+    fake_remote_cache.values["user:alice"] = "stale"
+    cache = TieredCache(fake_remote_cache, LocalTTLCache(), channel="invalidate")
+    cache.start()
+    await settle()
+
+    original_get = fake_remote_cache.get
+
+    async def slow_get(key):
+        value = await original_get(key)
+        await fake_remote_cache.publish("invalidate", key)
+        await settle()
+        return value
+    fake_remote_cache.get = slow_get
+
+    assert await cache.get("user:alice") == "stale"
+    assert cache.local.get("user:alice") is None
+    await cache.stop()
+
+
+@pytest.mark.asyncio
+async def test_tiered_get_many_asks_remote_only_for_local_misses(local_cache):
+    remote = AsyncMock()
+    remote.get_many.return_value = ["2", None]
+    cache = TieredCache(remote, local_cache)
+    local_cache.set("a", "1")
+
+    assert await cache.get_many(["a", "b", "c"]) == ["1", "2", None]
+    remote.get_many.assert_awaited_once_with(["b", "c"])
+    assert local_cache.get("b") == "2"
+
+
+@pytest.mark.asyncio
+async def test_tiered_set_many_writes_both_tiers(local_cache):
+    remote = AsyncMock()
+    cache = TieredCache(remote, local_cache)
+
+    await cache.set_many({"a": "1", "b": "2"}, 60)
+
+    remote.set_many.assert_awaited_once_with({"a": "1", "b": "2"}, 60)
+    assert local_cache.get("a") == "1"
+    assert local_cache.get("b") == "2"
+
+
+@pytest.mark.asyncio
+async def test_delete_many_invalidates_other_processes_with_one_message(fake_remote_cache, settle):
+    worker_a = TieredCache(fake_remote_cache, LocalTTLCache(), channel="invalidate")
+    worker_b = TieredCache(fake_remote_cache, LocalTTLCache(), channel="invalidate")
+    worker_a.start()
+    worker_b.start()
+    await settle()
+    await worker_a.set_many({"a": "1", "b": "2", "c": "3"}, 60)
+    assert await worker_b.get_many(["a", "b", "c"]) == ["1", "2", "3"]
+
+    published = []
+    original_publish = fake_remote_cache.publish
+
+    async def recording_publish(channel, message):
+        published.append(message)
+        await original_publish(channel, message)
+    fake_remote_cache.publish = recording_publish
+
+    await worker_a.delete_many(["a", "b"])
+    await settle()
+
+    assert len(published) == 1
+    assert worker_b.local.get("a") is None
+    assert worker_b.local.get("b") is None
+    assert worker_b.local.get("c") == "3"
+    await worker_a.stop()
+    await worker_b.stop()
+
+
+@pytest.mark.asyncio
+async def test_tiered_set_if_absent_uses_remote_tier_only(local_cache):
+    remote = AsyncMock()
+    remote.set_if_absent.return_value = True
+    cache = TieredCache(remote, local_cache)
+
+    assert await cache.set_if_absent("lock:user:alice", "1", 5)
+    remote.set_if_absent.assert_awaited_once_with("lock:user:alice", "1", 5)
+    assert local_cache.get("lock:user:alice") is None
+
+
+@pytest.mark.asyncio
+async def test_tiered_objects_are_kept_decoded_locally(local_cache):
+    remote = AsyncMock()
+    remote.get_object.return_value = {"id": 1}
+    cache = TieredCache(remote, local_cache)
+
+    first = await cache.get_object("user:alice")
+    second = await cache.get_object("user:alice")
+
+    assert first == {"id": 1}
+    assert second is first
+    remote.get_object.assert_awaited_once_with("user:alice")
+
+    await cache.set_object("user:bob", {"id": 2}, 1800)
+    remote.set_object.assert_awaited_once_with("user:bob", {"id": 2}, 1800)
+    assert local_cache.get("user:bob") == {"id": 2}
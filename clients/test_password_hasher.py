@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from clients.password_hasher import ProcessPoolPasswordHasher
+
+
+@pytest.fixture
+def hasher():
+    hasher = ProcessPoolPasswordHasher(max_workers=1, queue_size=1)
+    yield hasher
+    hasher.stop()
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify(hasher):
+    hashed = await hasher.hash("testpass")
+
+    assert hashed != "testpass"
+    assert await hasher.verify("testpass", hashed) is True
+    assert await hasher.verify("wrongpass", hashed) is False
+    stats = hasher.stats()
+    assert stats["completed"] == 3
+    assert stats["in_flight"] == 0
+    assert stats["avg_run_ms"] > 0
+
+
+@pytest.mark.asyncio
+async def test_rejects_calls_beyond_queue_size(hasher):
+    results = await asyncio.gather(*(hasher.hash("testpass") for _ in range(3)), return_exceptions=True)
+
+    rejected = [result for result in results if isinstance(result, HTTPException)]
+    assert len(rejected) == 1
+    assert rejected[0].status_code == 503
+    assert rejected[0].headers == {"Retry-After": "1"}
+    assert hasher.rejected == 1
+    assert hasher.completed == 2
+
+
+@pytest.mark.asyncio
+async def test_event_loop_keeps_running_while_hashing(hasher):
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    await hasher.hash("warm up")
+    task = asyncio.create_task(ticker())
+    await hasher.hash("testpass")
+    task.cancel()
+
+    assert ticks > 0
@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import pytest
+
+from clients.token_revocations import BloomFilter, RedisTokenRevocations
+
+
+def test_bloom_filter_never_misses_added_items():
+    bloom = BloomFilter(1000, 0.01)
+    items = [f"jti-{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(bloom.might_contain(item) for item in items)
+    false_positives = sum(bloom.might_contain(f"other-{i}") for i in range(10000))
+    assert false_positives < 300
+
+
+@pytest.mark.asyncio
+async def test_checks_redis_until_synced(fake_redis):
+    fake_redis.zset["revoked"] = time.time() + 60
+    fake_redis.zset["expired"] = time.time() - 60
+    revocations = RedisTokenRevocations(fake_redis)
+
+    assert await revocations.is_revoked("revoked")
+    assert not await revocations.is_revoked("expired")
+    assert not await revocations.is_revoked("unknown")
+    assert fake_redis.reads == 3
+
+
+@pytest.mark.asyncio
+async def test_synced_filter_skips_redis_for_unrevoked_tokens(fake_redis, settle):
+    fake_redis.zset["revoked-before-start"] = time.time() + 60
+    worker_a = RedisTokenRevocations(fake_redis)
+    worker_b = RedisTokenRevocations(fake_redis)
+    worker_a.start()
+    worker_b.start()
+    await settle()
+
+    assert worker_b.synced
+    assert await worker_b.is_revoked("revoked-before-start")
+    reads = fake_redis.reads
+    assert not await worker_b.is_revoked("unknown")
+    assert fake_redis.reads == reads
+
+    await worker_a.revoke("logged-out", time.time() + 60)
+    await settle()
+    assert await worker_b.is_revoked("logged-out")
+
+    await worker_a.stop()
+    await worker_b.stop()
+
+
+@pytest.mark.asyncio
+async def test_revoke_drops_expired_entries(fake_redis):
+    fake_redis.zset["expired"] = time.time() - 60
+    revocations = RedisTokenRevocations(fake_redis)
+
+    await revocations.revoke("logged-out", time.time() + 60)
+
+    assert set(fake_redis.zset) == {"logged-out"}
+
+
+@pytest.mark.asyncio
+async def test_lost_subscription_falls_back_to_redis(monkeypatch, fake_redis, settle):
+    monkeypatch.setattr("clients.token_revocations.TOKEN_REVOCATIONS_RETRY_SECONDS", 0.05)
+    revocations = RedisTokenRevocations(fake_redis)
+    revocations.start()
+    await settle()
+
+    fake_redis.subscribers[0].put_nowait(ConnectionError("lost"))
+    await settle()
+    assert not revocations.synced
+    assert await revocations.is_revoked("unknown") is False
+    assert fake_redis.reads == 1
+    await asyncio.sleep(0.1)
+    await settle()
+    assert revocations.synced
+
+    await revocations.stop()
+    assert not revocations.synced
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from clients.token_versions import RedisTokenVersions
+
+
+@pytest.mark.asyncio
+async def test_reads_redis_until_synced(fake_redis):
+    fake_redis.hash["1"] = "2"
+    versions = RedisTokenVersions(fake_redis)
+
+    assert await versions.get_version(1) == 2
+    assert await versions.get_version(2) == 0
+    assert fake_redis.reads == 2
+
+
+@pytest.mark.asyncio
+async def test_synced_versions_need_no_redis_reads(fake_redis, settle):
+    fake_redis.hash["1"] = "2"
+    worker_a = RedisTokenVersions(fake_redis)
+    worker_b = RedisTokenVersions(fake_redis)
+    worker_a.start()
+    worker_b.start()
+    await settle()
+
+    assert worker_b.synced
+    assert await worker_b.get_version(1) == 2
+
+    assert await worker_a.bump(1) == 3
+    await settle()
+    assert await worker_b.get_version(1) == 3
+    assert await worker_b.get_version(5) == 0
+    assert fake_redis.reads == 0
+
+    await worker_a.stop()
+    await worker_b.stop()
+
+
+@pytest.mark.asyncio
+async def test_lost_subscription_falls_back_to_redis(monkeypatch, fake_redis, settle):
+    monkeypatch.setattr("clients.token_versions.TOKEN_VERSIONS_RETRY_SECONDS", 0)
+    versions = RedisTokenVersions(fake_redis)
+    versions.start()
+    await settle()
+
+    fake_redis.subscribers[0].put_nowait(ConnectionError("lost"))
+    await asyncio.sleep(0)
+    assert not versions.synced
+    await settle()
+    assert versions.synced
+
+    await versions.stop()
+    assert not versions.synced
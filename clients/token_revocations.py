@@ -0,0 +1,219 @@
+"""
+Token Revocations Module
+
+This module provides a list of revoked access tokens kept in Redis, with an in-memory Bloom
+filter in every process so that checking a token that was not revoked needs no network I/O.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import time
+from typing import Iterable, Optional
+
+import aioredis
+
+from services.auth_service import ITokenRevocations
+
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379")
+TOKEN_REVOCATIONS_KEY = os.environ.get("TOKEN_REVOCATIONS_KEY", "revoked-tokens")
+TOKEN_REVOCATIONS_CHANNEL = os.environ.get("TOKEN_REVOCATIONS_CHANNEL", "revoked-tokens")
+TOKEN_REVOCATIONS_CAPACITY = int(os.environ.get("TOKEN_REVOCATIONS_CAPACITY", 100000))
+TOKEN_REVOCATIONS_FALSE_POSITIVE_RATE = float(os.environ.get("TOKEN_REVOCATIONS_FALSE_POSITIVE_RATE", 0.01))
+TOKEN_REVOCATIONS_REBUILD_SECONDS = float(os.environ.get("TOKEN_REVOCATIONS_REBUILD_SECONDS", 300))
+TOKEN_REVOCATIONS_RETRY_SECONDS = float(os.environ.get("TOKEN_REVOCATIONS_RETRY_SECONDS", 1))
+
+logger = logging.getLogger("token_revocations")
+
+
+class BloomFilter:
+    """
+    A Bloom filter of strings: it may report an item that was never added, but never misses one
+    that was.
+
+    Attributes:
+        size (int): The number of bits.
+        hash_count (int): The number of bits set per item.
+        count (int): The number of items added.
+
+    Methods:
+        add(item): Adds an item.
+        might_contain(item): Checks whether an item may have been added.
+    """
+
+    def __init__(self, capacity: int, false_positive_rate: float):
+        """
+        Initializes a BloomFilter sized for a number of items and a false positive rate.
+
+        Args:
+            capacity (int): The number of items the rate is guaranteed for.
+            false_positive_rate (float): The rate of items wrongly reported once capacity is reached.
+        """
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, item: str):
+        """
+        Adds an item.
+
+        Args:
+            item (str): The item.
+
+        Returns:
+            None
+        """
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def might_contain(self, item: str) -> bool:
+        """
+        Checks whether an item may have been added.
+
+        Args:
+            item (str): The item.
+
+        Returns:
+            bool: False if the item was certainly not added.
+        """
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # Double hashing: k positions from two halves of one digest.
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + index * second) % self.size for index in range(self.hash_count))
+
+
+class RedisTokenRevocations(ITokenRevocations):
+    """
+    A revocation list that implements the ITokenRevocations interface with Redis.
+
+    Revoked token IDs are kept in a sorted set scored by the token's expiry and announced on a
+    channel. Each process loads the unexpired IDs into a Bloom filter once it has subscribed,
+    adds announced IDs to it, and rebuilds it periodically to forget expired ones. A token
+    the filter does not contain is not revoked. Only the rare filter hits, and every check
+    while the subscription is down, are confirmed in Redis.
+
+    Attributes:
+        synced (bool): Whether the filter is complete and kept current.
+
+    Methods:
+        revoke(jti, expires_at): Revokes a token until it expires.
+        is_revoked(jti): Checks whether a token was revoked.
+        start(): Starts keeping the filter current in a background task.
+        stop(): Stops keeping the filter current.
+    """
+
+    def __init__(self, redis: Optional[aioredis.Redis] = None, clock=time.time):
+        """
+        Initializes the RedisTokenRevocations.
+
+        Args:
+            redis (aioredis.Redis, optional): The Redis client. Defaults to one for REDIS_URL.
+            clock (Callable[[], float], optional): Returns the current UNIX time.
+        """
+        self.redis = redis if redis is not None else aioredis.from_url(
+            REDIS_URL, encoding="utf-8", decode_responses=True
+        )
+        self.clock = clock
+        self.synced = False
+        self.filter = BloomFilter(TOKEN_REVOCATIONS_CAPACITY, TOKEN_REVOCATIONS_FALSE_POSITIVE_RATE)
+        self._listener: Optional[asyncio.Task] = None
+
+    async def revoke(self, jti: str, expires_at: float):
+        """
+        Revokes a token until it expires and tells the other processes about it.
+
+        Args:
+            jti (str): The ID of the token.
+            expires_at (float): The UNIX time the token expires at.
+
+        Returns:
+            None
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(TOKEN_REVOCATIONS_KEY, {jti: expires_at})
+            pipe.zremrangebyscore(TOKEN_REVOCATIONS_KEY, "-inf", self.clock())
+            await pipe.execute()
+        self.filter.add(jti)
+        await self.redis.publish(TOKEN_REVOCATIONS_CHANNEL, jti)
+
+    async def is_revoked(self, jti: str) -> bool:
+        """
+        Checks whether a token was revoked.
+
+        Args:
+            jti (str): The ID of the token.
+
+        Returns:
+            bool: True if the token was revoked.
+        """
+        if self.synced and not self.filter.might_contain(jti):
+            return False
+        expires_at = await self.redis.zscore(TOKEN_REVOCATIONS_KEY, jti)
+        return expires_at is not None and expires_at > self.clock()
+
+    def start(self):
+        """
+        Starts keeping the filter current in a background task.
+
+        Returns:
+            None
+        """
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """
+        Stops keeping the filter current.
+
+        Returns:
+            None
+        """
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _rebuild(self):
+        revoked = await self.redis.zrangebyscore(TOKEN_REVOCATIONS_KEY, self.clock(), "+inf")
+        bloom = BloomFilter(max(TOKEN_REVOCATIONS_CAPACITY, 2 * len(revoked)), TOKEN_REVOCATIONS_FALSE_POSITIVE_RATE)
+        for jti in revoked:
+            bloom.add(jti)
+        self.filter = bloom
+
+    async def _listen(self):
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(TOKEN_REVOCATIONS_CHANNEL)
+                # Loaded after subscribing, so a revocation is either loaded or still to be received.
+                # Messages are only read between rebuilds, so none can be lost by swapping the filter.
+                await self._rebuild()
+                rebuilt_at = time.monotonic()
+                self.synced = True
+                while True:
+                    if time.monotonic() - rebuilt_at >= TOKEN_REVOCATIONS_REBUILD_SECONDS:
+                        await self._rebuild()
+                        rebuilt_at = time.monotonic()
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None and message["type"] == "message":
+                        self.filter.add(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Token revocation subscription lost, checking revocations in Redis: {e}")
+            finally:
+                self.synced = False
+                await pubsub.close()
+            await asyncio.sleep(TOKEN_REVOCATIONS_RETRY_SECONDS)
@@ -0,0 +1,137 @@
+"""
+Token Versions Module
+
+This module provides a registry of per-user access token versions. The versions are kept in a
+Redis hash and mirrored in every process, so checking a token's version needs no network I/O.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, Optional
+
+import aioredis
+
+from services.auth_service import ITokenVersions
+
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379")
+TOKEN_VERSIONS_KEY = os.environ.get("TOKEN_VERSIONS_KEY", "token-versions")
+TOKEN_VERSIONS_CHANNEL = os.environ.get("TOKEN_VERSIONS_CHANNEL", "token-versions")
+TOKEN_VERSIONS_RETRY_SECONDS = float(os.environ.get("TOKEN_VERSIONS_RETRY_SECONDS", 1))
+
+logger = logging.getLogger("token_versions")
+
+
+class RedisTokenVersions(ITokenVersions):
+    """
+    A token version registry that implements the ITokenVersions interface with Redis.
+
+    Only users whose version was ever bumped have an entry, so the structure stays small. Each
+    process loads the whole hash once it has subscribed to the bump channel and then applies the
+    published bumps. Until that subscription is up, versions are read from Redis instead.
+
+    Attributes:
+        synced (bool): Whether the local copy is complete and kept current.
+
+    Methods:
+        get_version(user_id): Returns the current token version of a user.
+        bump(user_id): Increments a user's version, revoking the tokens issued before.
+        start(): Starts mirroring the versions in a background task.
+        stop(): Stops mirroring the versions.
+    """
+
+    def __init__(self, redis: Optional[aioredis.Redis] = None):
+        """
+        Initializes the RedisTokenVersions.
+
+        Args:
+            redis (aioredis.Redis, optional): The Redis client. Defaults to one for REDIS_URL.
+        """
+        self.redis = redis if redis is not None else aioredis.from_url(
+            REDIS_URL, encoding="utf-8", decode_responses=True
+        )
+        self.synced = False
+        self._versions: Dict[int, int] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    async def get_version(self, user_id: int) -> int:
+        """
+        Returns the current token version of a user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            int: The version; 0 for users whose version was never bumped.
+        """
+        if self.synced:
+            return self._versions.get(user_id, 0)
+        version = await self.redis.hget(TOKEN_VERSIONS_KEY, str(user_id))
+        return int(version) if version is not None else 0
+
+    async def bump(self, user_id: int) -> int:
+        """
+        Increments a user's version and tells the other processes about it.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            int: The new version.
+        """
+        version = await self.redis.hincrby(TOKEN_VERSIONS_KEY, str(user_id), 1)
+        self._apply(user_id, version)
+        await self.redis.publish(TOKEN_VERSIONS_CHANNEL, f"{user_id}:{version}")
+        return version
+
+    def start(self):
+        """
+        Starts mirroring the versions in a background task.
+
+        Returns:
+            None
+        """
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """
+        Stops mirroring the versions.
+
+        Returns:
+            None
+        """
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def _apply(self, user_id: int, version: int):
+        # Versions only grow, so a bump that arrives late cannot undo a newer one.
+        if version > self._versions.get(user_id, 0):
+            self._versions[user_id] = version
+
+    async def _listen(self):
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(TOKEN_VERSIONS_CHANNEL)
+                # Loaded after subscribing, so a bump is either in the hash or still to be received.
+                versions = await self.redis.hgetall(TOKEN_VERSIONS_KEY)
+                self._versions = {int(user_id): int(version) for user_id, version in versions.items()}
+                self.synced = True
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        user_id, version = message["data"].split(":")
+                        self._apply(int(user_id), int(version))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Token version subscription lost, reading versions from Redis: {e}")
+            finally:
+                self.synced = False
+                await pubsub.close()
+            await asyncio.sleep(TOKEN_VERSIONS_RETRY_SECONDS)
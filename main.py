@@ -1,22 +1,39 @@
 import os
 
 import aioredis
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from slowapi.errors import RateLimitExceeded
 
 from api import contacts, auth, users
+from api.instances import cache_client, email_outbox, mail_client, password_hasher, token_revocations, token_versions
+from repositories.database import get_db_session
 
 REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379")
 
-app = FastAPI()
+app = FastAPI(dependencies=[Depends(get_db_session)])
 
 
 @app.on_event("startup")
 async def startup():
     redis = aioredis.from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
+    cache_client.start()
+    token_versions.start()
+    token_revocations.start()
+    password_hasher.start()
+    email_outbox.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await email_outbox.stop()
+    await mail_client.close()
+    await cache_client.stop()
+    await token_versions.stop()
+    await token_revocations.stop()
+    password_hasher.stop()
 
 
 app.add_middleware(
@@ -25,6 +42,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 
@@ -2,6 +2,8 @@ from datetime import date, datetime, timedelta
 from unittest.mock import MagicMock
 
 import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from repositories.contact_repository import ContactRepository, Contact
 from schemas.contacts import ContactCreate, ContactUpdate
@@ -9,18 +11,19 @@ from schemas.contacts import ContactCreate, ContactUpdate
 
 @pytest.fixture
 def mock_db_session(mocker):
-    return mocker.MagicMock()
+    session = mocker.MagicMock(spec=AsyncSession)
+    session.execute.return_value = MagicMock()
+    return session
 
 
 @pytest.fixture
 def contact_repository(mock_db_session):
-    repo = ContactRepository()
-    repo.db = mock_db_session
-    return repo
+    return ContactRepository(session_provider=lambda: mock_db_session)
 
 
-def test_get_all_by_user(contact_repository, mock_db_session):
-    mock_db_session.query.return_value.filter.return_value.all.return_value = [
+@pytest.mark.asyncio
+async def test_get_page_by_user(contact_repository, mock_db_session):
+    mock_db_session.execute.return_value.scalars.return_value.all.return_value = [
         Contact(
             id=1,
             user_id=1,
@@ -42,37 +45,80 @@ def test_get_all_by_user(contact_repository, mock_db_session):
             additional_data="More data"
         )
     ]
-    contact_repository.db = mock_db_session
 
-    contacts = contact_repository.get_all_by_user(1)
+    contacts = await contact_repository.get_page_by_user(1, 2)
     assert len(contacts) == 2
     assert contacts[0].first_name == "John"
     assert contacts[1].email == "jane.doe@example.com"
+    mock_db_session.execute.assert_awaited_once()
 
+    query = str(mock_db_session.execute.call_args[0][0])
+    assert "ORDER BY contacts.id" in query
+    assert "LIMIT :param_1" in query
 
-def test_get_by_id_and_user(contact_repository, mock_db_session):
-    mock_db_session.query.return_value.filter.return_value.first.return_value = Contact(
+
+@pytest.mark.asyncio
+async def test_get_page_by_user_after_cursor(contact_repository, mock_db_session):
+    mock_db_session.execute.return_value.scalars.return_value.all.return_value = []
+
+    contacts = await contact_repository.get_page_by_user(1, 10, "last_name", ("Doe", 7))
+    assert contacts == []
+
+    keyed_query, null_query = [str(call[0][0]) for call in mock_db_session.execute.call_args_list]
+    assert "(contacts.last_name, contacts.id) > (:param_1, :param_2)" in keyed_query
+    assert "contacts.last_name IS NOT NULL" in keyed_query
+    assert "ORDER BY contacts.last_name, contacts.id" in keyed_query
+    assert "contacts.last_name IS NULL" in null_query
+    assert "ORDER BY contacts.id" in null_query
+
+
+@pytest.mark.asyncio
+async def test_get_page_by_user_full_page_skips_null_keys(contact_repository, mock_db_session):
+    mock_db_session.execute.return_value.scalars.return_value.all.return_value = [
+        Contact(id=8, user_id=1, last_name="Doe"),
+        Contact(id=9, user_id=1, last_name="Smith"),
+    ]
+
+    contacts = await contact_repository.get_page_by_user(1, 2, "last_name", ("Doe", 7))
+    assert [contact.id for contact in contacts] == [8, 9]
+    mock_db_session.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_get_page_by_user_after_null_sort_value(contact_repository, mock_db_session):
+    mock_db_session.execute.return_value.scalars.return_value.all.return_value = []
+
+    await contact_repository.get_page_by_user(1, 10, "birthday", (None, 7))
+
+    mock_db_session.execute.assert_awaited_once()
+    query = str(mock_db_session.execute.call_args[0][0])
+    assert "contacts.birthday IS NULL AND contacts.id > :id_1" in query
+
+
+@pytest.mark.asyncio
+async def test_get_by_id_and_user(contact_repository, mock_db_session):
+    mock_db_session.execute.return_value.scalars.return_value.first.return_value = Contact(
         id=1,
         user_id=1,
         first_name="John",
         last_name="Doe"
     )
-    contact_repository.db = mock_db_session
 
-    contact = contact_repository.get_by_id_and_user(1, 1)
+    contact = await contact_repository.get_by_id_and_user(1, 1)
     assert contact.first_name == "John"
     assert contact.user_id == 1
 
 
-def test_get_by_id_and_user_not_found(contact_repository, mock_db_session):
-    mock_db_session.query.return_value.filter.return_value.first.return_value = None
-    contact_repository.db = mock_db_session
+@pytest.mark.asyncio
+async def test_get_by_id_and_user_not_found(contact_repository, mock_db_session):
+    mock_db_session.execute.return_value.scalars.return_value.first.return_value = None
 
-    contact = contact_repository.get_by_id_and_user(999, 1)
+    contact = await contact_repository.get_by_id_and_user(999, 1)
     assert contact is None
 
 
-def test_create_for_user(contact_repository, mock_db_session):
+@pytest.mark.asyncio
+async def test_create_for_user(contact_repository, mock_db_session):
     contact_data = ContactCreate(
         first_name="John",
         last_name="Doe",
@@ -81,117 +127,127 @@ def test_create_for_user(contact_repository, mock_db_session):
         birthday=date.today(),
         additional_data="Test data"
     )
-    mock_db_session.add = MagicMock()
-    mock_db_session.commit = MagicMock()
-    mock_db_session.refresh = MagicMock()
-    contact_repository.db = mock_db_session
+    created = Contact(id=1, user_id=1, **contact_data.model_dump())
+    mock_db_session.execute.return_value.scalars.return_value.one.return_value = created
 
-    contact = contact_repository.create_for_user(contact_data, 1)
-    mock_db_session.add.assert_called_once()
-    mock_db_session.commit.assert_called_once()
-    mock_db_session.refresh.assert_called_once()
+    contact = await contact_repository.create_for_user(contact_data, 1)
 
-    assert contact.first_name == "John"
-    assert contact.user_id == 1
+    mock_db_session.execute.assert_awaited_once()
+    query = mock_db_session.execute.call_args[0][0]
+    assert str(query).startswith("INSERT INTO contacts")
+    assert "RETURNING contacts.id" in str(query)
+    assert query.compile().params["user_id"] == 1
+    assert query.compile().params["first_name"] == "John"
+    mock_db_session.commit.assert_awaited_once()
+    mock_db_session.refresh.assert_not_awaited()
+    mock_db_session.add.assert_not_called()
+    assert contact is created
 
 
-def test_update_for_user(contact_repository, mock_db_session):
+@pytest.mark.asyncio
+async def test_update_for_user(contact_repository, mock_db_session):
     contact_data = ContactUpdate(
         first_name="John Updated",
         additional_data="Updated additional notes"
     )
+    updated = Contact(id=1, user_id=1, first_name="John Updated", additional_data="Updated additional notes")
+    mock_db_session.execute.return_value.scalars.return_value.first.return_value = updated
 
-    mock_contact = MagicMock(
-        first_name="John",
-        last_name="Doe",
-        email="john.doe@example.com",
-        phone_number="1234567890",
-        birthday=date(1990, 1, 1),
-        additional_data="Old notes"
-    )
-    mock_db_session.query.return_value.filter.return_value.first.return_value = mock_contact
-    contact_repository.db = mock_db_session
+    updated_contact = await contact_repository.update_for_user(1, contact_data, 1)
 
-    updated_contact = contact_repository.update_for_user(1, contact_data, 1)
+    mock_db_session.execute.assert_awaited_once()
+    query = mock_db_session.execute.call_args[0][0]
+    sql = str(query)
+    assert sql.startswith("UPDATE contacts SET first_name=:first_name, additional_data=:additional_data")
+    assert "WHERE contacts.id = :id_1 AND contacts.user_id = :user_id_1" in sql
+    assert "RETURNING contacts.id" in sql
+    assert "last_name" not in sql.split("WHERE")[0]
+    assert updated_contact is updated
+    mock_db_session.commit.assert_awaited_once()
+    mock_db_session.refresh.assert_not_awaited()
 
-    assert mock_contact.first_name == "John Updated"
-    assert mock_contact.additional_data == "Updated additional notes"
 
-    assert mock_contact.last_name == "Doe"
-    assert mock_contact.email == "john.doe@example.com"
-    assert mock_contact.phone_number == "1234567890"
-    assert mock_contact.birthday == date(1990, 1, 1)
+@pytest.mark.asyncio
+async def test_update_for_user_not_found(contact_repository, mock_db_session):
+    mock_db_session.execute.return_value.scalars.return_value.first.return_value = None
 
-    assert updated_contact == mock_contact
+    contact_data = ContactUpdate(first_name="Non Existent")
+    updated_contact = await contact_repository.update_for_user(999, contact_data, 1)
+    assert updated_contact is None
+    mock_db_session.commit.assert_not_awaited()
 
 
-def test_update_for_user_not_found(contact_repository, mock_db_session):
-    mock_db_session.query.return_value.filter.return_value.first.return_value = None
-    contact_repository.db = mock_db_session
+@pytest.mark.asyncio
+async def test_update_for_user_no_changes(contact_repository, mock_db_session):
+    existing = Contact(id=1, user_id=1, first_name="John")
+    mock_db_session.execute.return_value.scalars.return_value.first.return_value = existing
 
-    contact_data = ContactUpdate(first_name="Non Existent")
-    updated_contact = contact_repository.update_for_user(999, contact_data, 1)
-    assert updated_contact is None
+    updated_contact = await contact_repository.update_for_user(1, ContactUpdate(), 1)
 
+    assert updated_contact is existing
+    assert str(mock_db_session.execute.call_args[0][0]).startswith("SELECT")
+    mock_db_session.commit.assert_not_awaited()
 
-def test_delete_for_user(contact_repository, mock_db_session):
-    mock_contact = MagicMock()
-    mock_db_session.query.return_value.filter.return_value.first.return_value = mock_contact
-    mock_db_session.delete = MagicMock()
-    mock_db_session.commit = MagicMock()
-    contact_repository.db = mock_db_session
 
-    deleted_contact = contact_repository.delete_for_user(1, 1)
-    mock_db_session.delete.assert_called_once_with(mock_contact)
-    mock_db_session.commit.assert_called_once()
-    assert deleted_contact == mock_contact
+@pytest.mark.asyncio
+async def test_delete_for_user(contact_repository, mock_db_session):
+    deleted = Contact(id=1, user_id=1, first_name="John")
+    mock_db_session.execute.return_value.scalars.return_value.first.return_value = deleted
 
+    deleted_contact = await contact_repository.delete_for_user(1, 1)
 
-def test_delete_for_user_not_found(contact_repository, mock_db_session):
-    mock_db_session.query.return_value.filter.return_value.first.return_value = None
-    contact_repository.db = mock_db_session
+    mock_db_session.execute.assert_awaited_once()
+    sql = str(mock_db_session.execute.call_args[0][0])
+    assert sql.startswith("DELETE FROM contacts WHERE contacts.id = :id_1 AND contacts.user_id = :user_id_1")
+    assert "RETURNING contacts.id" in sql
+    mock_db_session.delete.assert_not_awaited()
+    mock_db_session.commit.assert_awaited_once()
+    assert deleted_contact is deleted
 
-    deleted_contact = contact_repository.delete_for_user(999, 1)
+
+@pytest.mark.asyncio
+async def test_delete_for_user_not_found(contact_repository, mock_db_session):
+    mock_db_session.execute.return_value.scalars.return_value.first.return_value = None
+
+    deleted_contact = await contact_repository.delete_for_user(999, 1)
     assert deleted_contact is None
-    mock_db_session.delete.assert_not_called()
-    mock_db_session.commit.assert_not_called()
+    mock_db_session.commit.assert_not_awaited()
 
 
-def test_search_by_user(contact_repository, mock_db_session):
-    mock_db_session.query.return_value.filter.return_value.filter.return_value.all.return_value = [
+@pytest.mark.asyncio
+async def test_search_by_user(contact_repository, mock_db_session):
+    mock_db_session.execute.return_value.scalars.return_value.all.return_value = [
         Contact(id=1, user_id=1, first_name="John", last_name="Doe")
     ]
-    contact_repository.db = mock_db_session
 
-    results = contact_repository.search_by_user(1, first_name="John")
+    results = await contact_repository.search_by_user(1, first_name="John")
     assert len(results) == 1
     assert results[0].first_name == "John"
 
+    query = mock_db_session.execute.call_args[0][0]
+    assert "lower(contacts.first_name) LIKE lower(:first_name_1)" in str(query)
 
-def test_search_by_user_no_filters(contact_repository, mock_db_session):
-    mock_db_session.query.return_value.filter.return_value.all.return_value = [
+
+@pytest.mark.asyncio
+async def test_search_by_user_no_filters(contact_repository, mock_db_session):
+    mock_db_session.execute.return_value.scalars.return_value.all.return_value = [
         Contact(id=2, user_id=1, first_name="Jake", last_name="Smith"),
         Contact(id=3, user_id=1, first_name="Alice", last_name="Johnson"),
     ]
-    contact_repository.db = mock_db_session
 
-    results = contact_repository.search_by_user(1)
+    results = await contact_repository.search_by_user(1)
     assert len(results) == 2
     assert results[0].first_name == "Jake"
     assert results[1].last_name == "Johnson"
 
 
-def test_search_by_user_multiple_filters(contact_repository, mock_db_session):
-    mock_query = mock_db_session.query.return_value
-
-    mock_query.filter.side_effect = lambda *args, **kwargs: mock_query
-    mock_query.all.return_value = [
+@pytest.mark.asyncio
+async def test_search_by_user_multiple_filters(contact_repository, mock_db_session):
+    mock_db_session.execute.return_value.scalars.return_value.all.return_value = [
         Contact(id=4, user_id=1, first_name="John", last_name="Doe", email="john.doe@example.com")
     ]
 
-    contact_repository.db = mock_db_session
-
-    results = contact_repository.search_by_user(
+    results = await contact_repository.search_by_user(
         1,
         first_name="John",
         last_name="Doe",
@@ -202,16 +258,52 @@ def test_search_by_user_multiple_filters(contact_repository, mock_db_session):
     assert results[0].last_name == "Doe"
     assert results[0].email == "john.doe@example.com"
 
+    query = str(mock_db_session.execute.call_args[0][0])
+    assert "contacts.first_name" in query
+    assert "contacts.last_name" in query
+    assert "contacts.email" in query
+
+
+@pytest.mark.asyncio
+async def test_search_by_user_with_limit(contact_repository, mock_db_session):
+    mock_db_session.execute.return_value.scalars.return_value.all.return_value = []
 
-def test_search_by_user_no_matches(contact_repository, mock_db_session):
-    mock_db_session.query.return_value.filter.return_value.filter.return_value.filter.return_value.all.return_value = []
-    contact_repository.db = mock_db_session
+    await contact_repository.search_by_user(1, last_name="Doe", limit=20)
 
-    results = contact_repository.search_by_user(1, first_name="Ghost")
+    query = mock_db_session.execute.call_args[0][0]
+    compiled = query.compile(dialect=postgresql.dialect())
+    assert "ORDER BY contacts.id" in str(compiled)
+    assert compiled.params["param_1"] == 20
+
+
+@pytest.mark.asyncio
+async def test_search_by_user_no_matches(contact_repository, mock_db_session):
+    mock_db_session.execute.return_value.scalars.return_value.all.return_value = []
+
+    results = await contact_repository.search_by_user(1, first_name="Ghost")
     assert len(results) == 0
 
 
-def test_get_upcoming_birthdays_by_user(contact_repository, mock_db_session):
+@pytest.mark.asyncio
+async def test_search_ranked_by_user(contact_repository, mock_db_session):
+    mock_db_session.execute.return_value.scalars.return_value.all.return_value = [
+        Contact(id=1, user_id=1, first_name="John", last_name="Doe")
+    ]
+
+    results = await contact_repository.search_ranked_by_user(1, "jo_n", 5)
+    assert [contact.id for contact in results] == [1]
+
+    query = mock_db_session.execute.call_args[0][0]
+    sql = str(query.compile(dialect=postgresql.dialect()))
+    assert "contacts.first_name ILIKE '%%' || %(first_name_1)s || '%%' ESCAPE '/'" in sql
+    assert "contacts.email %%> %(email_2)s" in sql
+    assert "ORDER BY greatest(word_similarity(" in sql
+    assert "LIMIT" in sql
+    assert query.compile().params["first_name_1"] == "jo/_n"
+
+
+@pytest.mark.asyncio
+async def test_get_upcoming_birthdays_by_user(contact_repository, mock_db_session):
     today = datetime.today()
     upcoming_contact = Contact(
         id=1,
@@ -220,17 +312,124 @@ def test_get_upcoming_birthdays_by_user(contact_repository, mock_db_session):
         last_name="Doe",
         birthday=(today + timedelta(days=3)).date(),
     )
-    mock_db_session.query.return_value.filter.return_value.all.return_value = [upcoming_contact]
-    contact_repository.db = mock_db_session
+    mock_db_session.execute.return_value.scalars.return_value.all.return_value = [upcoming_contact]
 
-    results = contact_repository.get_upcoming_birthdays_by_user(1)
+    results = await contact_repository.get_upcoming_birthdays_by_user(1)
     assert len(results) == 1
     assert results[0].birthday == (today + timedelta(days=3)).date()
 
 
-def test_get_upcoming_birthdays_by_user_no_matches(contact_repository, mock_db_session):
-    mock_db_session.query.return_value.filter.return_value.all.return_value = []
-    contact_repository.db = mock_db_session
+def _birthday_window(mock_db_session):
+    query = mock_db_session.execute.call_args[0][0]
+    return str(query), query.compile().params
+
+
+@pytest.mark.asyncio
+async def test_get_upcoming_birthdays_by_user_window(contact_repository, mock_db_session):
+    mock_db_session.execute.return_value.scalars.return_value.all.return_value = []
+
+    await contact_repository.get_upcoming_birthdays_by_user(1, days=30, today=date(2026, 3, 10))
+
+    sql, params = _birthday_window(mock_db_session)
+    assert "contacts.birthday_key BETWEEN :birthday_key_1 AND :birthday_key_2" in sql
+    assert (params["birthday_key_1"], params["birthday_key_2"]) == (310, 408)
+    assert "ORDER BY contacts.birthday_key < :birthday_key_3, contacts.birthday_key, contacts.id" in sql
+
+
+@pytest.mark.asyncio
+async def test_get_upcoming_birthdays_by_user_wraps_new_year(contact_repository, mock_db_session):
+    mock_db_session.execute.return_value.scalars.return_value.all.return_value = []
+
+    await contact_repository.get_upcoming_birthdays_by_user(1, days=7, today=date(2026, 12, 28))
 
-    results = contact_repository.get_upcoming_birthdays_by_user(1)
+    sql, params = _birthday_window(mock_db_session)
+    assert "contacts.birthday_key >= :birthday_key_1 OR contacts.birthday_key <= :birthday_key_2" in sql
+    assert (params["birthday_key_1"], params["birthday_key_2"]) == (1228, 103)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("today, days, end_key", [
+    (date(2027, 2, 22), 7, 229),
+    (date(2028, 2, 22), 7, 228),
+])
+async def test_get_upcoming_birthdays_by_user_feb_29(contact_repository, mock_db_session, today, days, end_key):
+    mock_db_session.execute.return_value.scalars.return_value.all.return_value = []
+
+    await contact_repository.get_upcoming_birthdays_by_user(1, days=days, today=today)
+
+    _, params = _birthday_window(mock_db_session)
+    assert params["birthday_key_2"] == end_key
+
+
+@pytest.mark.asyncio
+async def test_get_upcoming_birthdays_by_user_no_matches(contact_repository, mock_db_session):
+    mock_db_session.execute.return_value.scalars.return_value.all.return_value = []
+
+    results = await contact_repository.get_upcoming_birthdays_by_user(1)
     assert len(results) == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_by_user(mocker):
+    batches = [
+        [Contact(id=1, user_id=1, first_name="John"), Contact(id=2, user_id=1, first_name="Jane")],
+        [Contact(id=3, user_id=1, first_name="Jake")],
+    ]
+
+    async def partitions():
+        for batch in batches:
+            yield batch
+
+    stream_session = mocker.MagicMock(spec=AsyncSession)
+    stream_session.stream_scalars.return_value.partitions = partitions
+    session_factory = mocker.MagicMock()
+    session_factory.return_value.__aenter__.return_value = stream_session
+    repo = ContactRepository(session_provider=mocker.MagicMock(), session_factory=session_factory)
+
+    streamed = [batch async for batch in repo.stream_by_user(1, batch_size=2)]
+
+    assert streamed == batches
+    query = stream_session.stream_scalars.call_args[0][0]
+    assert query.get_execution_options()["yield_per"] == 2
+    assert "ORDER BY contacts.id" in str(query)
+    session_factory.return_value.__aexit__.assert_awaited_once()
+    repo.session_provider.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_create_many_for_user(contact_repository, mock_db_session):
+    contacts = [
+        ContactCreate(first_name="John", last_name="Doe", email="john@doe.com",
+                      phone_number="1", birthday=date(1990, 1, 1)),
+        ContactCreate(first_name="Jane", last_name="Doe", email="jane@doe.com",
+                      phone_number="2", birthday=date(1990, 1, 1)),
+        ContactCreate(first_name="Jake", last_name="Doe", email="jake@doe.com",
+                      phone_number="1", birthday=date(1990, 1, 1)),
+    ]
+    inserted = MagicMock()
+    inserted.all.return_value = [("john@doe.com", "1")]
+    taken = MagicMock()
+    taken.scalars.return_value.all.return_value = ["jane@doe.com"]
+    mock_db_session.execute.side_effect = [inserted, taken]
+
+    conflicts = await contact_repository.create_many_for_user(contacts, 1)
+
+    assert conflicts == [None, "email", "phone_number"]
+    insert_query = mock_db_session.execute.call_args_list[0][0][0]
+    assert "ON CONFLICT DO NOTHING" in str(insert_query.compile(dialect=postgresql.dialect()))
+    assert "RETURNING" in str(insert_query.compile(dialect=postgresql.dialect()))
+    mock_db_session.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_create_many_for_user_no_conflicts(contact_repository, mock_db_session):
+    contacts = [
+        ContactCreate(first_name="John", last_name="Doe", email="john@doe.com",
+                      phone_number="1", birthday=date(1990, 1, 1)),
+    ]
+    mock_db_session.execute.return_value.all.return_value = [("john@doe.com", "1")]
+
+    conflicts = await contact_repository.create_many_for_user(contacts, 1)
+
+    assert conflicts == [None]
+    mock_db_session.execute.assert_awaited_once()
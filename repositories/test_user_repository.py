@@ -1,24 +1,37 @@
+import asyncio
 import pytest
+import pytest_asyncio
 from unittest.mock import MagicMock
 from datetime import datetime
 
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from repositories.database import DATABASE_URL
 from repositories.user_repository import UserRepository, User
 from schemas.users import UserInDB
 
 
 @pytest.fixture
 def mock_db_session(mocker):
-    return mocker.MagicMock()
+    session = mocker.MagicMock(spec=AsyncSession)
+    session.execute.return_value = MagicMock()
+    return session
 
 
 @pytest.fixture
 def user_repository(mock_db_session):
-    repo = UserRepository()
-    repo.db = mock_db_session
-    return repo
+    return UserRepository(session_provider=lambda: mock_db_session)
+
+
+def _executed_query(mock_db_session):
+    return mock_db_session.execute.call_args[0][0]
 
 
-def test_get_by_username(user_repository, mock_db_session):
+@pytest.mark.asyncio
+async def test_get_by_username(user_repository, mock_db_session):
     mock_user = MagicMock(
         id=1,
         username="testuser",
@@ -29,17 +42,20 @@ def test_get_by_username(user_repository, mock_db_session):
         avatar_url=None,
         role="user",
     )
-    mock_db_session.query.return_value.filter.return_value.first.return_value = (
+    mock_db_session.execute.return_value.scalars.return_value.first.return_value = (
         mock_user
     )
 
-    user = user_repository.get_by_username("testuser")
+    user = await user_repository.get_by_username("testuser")
     assert user == mock_user
-    mock_db_session.query.assert_called_once_with(User)
-    mock_db_session.query.return_value.filter.assert_called_once()
+    mock_db_session.execute.assert_awaited_once()
+    query = _executed_query(mock_db_session)
+    assert query.column_descriptions[0]["entity"] is User
+    assert "users.username = :username_1" in str(query)
 
 
-def test_get_by_email(user_repository, mock_db_session):
+@pytest.mark.asyncio
+async def test_get_by_email(user_repository, mock_db_session):
     mock_user = MagicMock(
         id=2,
         username="anotheruser",
@@ -50,120 +66,220 @@ def test_get_by_email(user_repository, mock_db_session):
         avatar_url=None,
         role="user",
     )
-    mock_db_session.query.return_value.filter.return_value.first.return_value = (
+    mock_db_session.execute.return_value.scalars.return_value.first.return_value = (
         mock_user
     )
 
-    user = user_repository.get_by_email("another@example.com")
+    user = await user_repository.get_by_email("another@example.com")
     assert user == mock_user
-    mock_db_session.query.assert_called_once_with(User)
-    mock_db_session.query.return_value.filter.assert_called_once()
+    mock_db_session.execute.assert_awaited_once()
+    query = _executed_query(mock_db_session)
+    assert query.column_descriptions[0]["entity"] is User
+    assert "users.email = :email_1" in str(query)
 
 
-def test_create(user_repository, mock_db_session):
+@pytest.mark.asyncio
+async def test_create(user_repository, mock_db_session):
     user_data = UserInDB(
         username="newuser",
         email="newuser@example.com",
         password="plaintext_pass",
         hashed_password="hashed_pass",
     )
+    created_user = MagicMock(username="newuser", email="newuser@example.com", role="user", email_confirmed=False)
+    mock_db_session.execute.return_value.scalars.return_value.first.return_value = created_user
+
+    new_user = await user_repository.create(user_data)
+
+    mock_db_session.execute.assert_awaited_once()
+    sql = str(_executed_query(mock_db_session).compile(dialect=postgresql.dialect()))
+    assert sql.startswith("INSERT INTO users")
+    assert "ON CONFLICT DO NOTHING RETURNING" in sql
+    params = _executed_query(mock_db_session).compile(dialect=postgresql.dialect()).params
+    assert params["username"] == "newuser"
+    assert params["email"] == "newuser@example.com"
+    assert params["hashed_password"] == "hashed_pass"
+    assert params["role"] == "user"
+    assert params["email_confirmed"] is False
+
+    mock_db_session.commit.assert_awaited_once()
+    mock_db_session.add.assert_not_called()
+    mock_db_session.refresh.assert_not_called()
+    assert new_user is created_user
 
-    mock_db_session.add.return_value = None
-    mock_db_session.commit.return_value = None
-    mock_db_session.refresh.return_value = None
-
-    new_user = user_repository.create(user_data)
-
-    mock_db_session.add.assert_called_once()
-    added_user = mock_db_session.add.call_args[0][0]
-    assert added_user.username == "newuser"
-    assert added_user.email == "newuser@example.com"
-    assert added_user.hashed_password == "hashed_pass"
 
-    mock_db_session.commit.assert_called_once()
+@pytest.mark.asyncio
+@pytest.mark.parametrize("taken_emails, detail", [
+    (["newuser@example.com"], "Email already registered"),
+    (["other@example.com"], "Username already taken"),
+])
+async def test_create_conflict(user_repository, mock_db_session, taken_emails, detail):
+    user_data = UserInDB(
+        username="newuser",
+        email="newuser@example.com",
+        password="plaintext_pass",
+        hashed_password="hashed_pass",
+    )
+    skipped_insert = MagicMock()
+    skipped_insert.scalars.return_value.first.return_value = None
+    conflicts = MagicMock()
+    conflicts.scalars.return_value.all.return_value = taken_emails
+    mock_db_session.execute.side_effect = [skipped_insert, conflicts]
 
-    mock_db_session.refresh.assert_called_once_with(added_user)
+    with pytest.raises(HTTPException) as exc_info:
+        await user_repository.create(user_data)
 
-    assert new_user is added_user
-    assert new_user.role == "user"
-    assert new_user.email_confirmed is False
+    assert exc_info.value.status_code == 409
+    assert exc_info.value.detail == detail
+    assert mock_db_session.execute.await_count == 2
 
 
-def test_mark_email_confirmed(user_repository, mock_db_session):
+@pytest.mark.asyncio
+async def test_mark_email_confirmed(user_repository, mock_db_session):
     mock_user = MagicMock(email_confirmed=False)
-    mock_db_session.query.return_value.filter.return_value.first.return_value = (
+    mock_db_session.execute.return_value.scalars.return_value.first.return_value = (
         mock_user
     )
 
-    user_repository.mark_email_confirmed(123)
+    await user_repository.mark_email_confirmed(123)
 
     assert mock_user.email_confirmed is True
-    mock_db_session.commit.assert_called_once()
+    mock_db_session.commit.assert_awaited_once()
+
 
+@pytest.mark.asyncio
+async def test_end_transaction(user_repository, mock_db_session):
+    await user_repository.end_transaction()
 
-def test_get_by_id(user_repository, mock_db_session):
+    mock_db_session.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_get_by_id(user_repository, mock_db_session):
     mock_user = MagicMock(id=10)
-    mock_db_session.query.return_value.filter.return_value.first.return_value = (
+    mock_db_session.execute.return_value.scalars.return_value.first.return_value = (
         mock_user
     )
 
-    user = user_repository.get_by_id(10)
+    user = await user_repository.get_by_id(10)
     assert user == mock_user
-    mock_db_session.query.assert_called_once_with(User)
-    mock_db_session.query.return_value.filter.assert_called_once()
+    mock_db_session.execute.assert_awaited_once()
+    query = _executed_query(mock_db_session)
+    assert query.column_descriptions[0]["entity"] is User
+    assert "users.id = :id_1" in str(query)
 
 
-def test_update_avatar(user_repository, mock_db_session):
+@pytest.mark.asyncio
+async def test_update_avatar(user_repository, mock_db_session):
     mock_user = MagicMock(id=5, avatar_url=None)
-    mock_db_session.query.return_value.filter.return_value.first.return_value = (
+    mock_db_session.execute.return_value.scalars.return_value.first.return_value = (
         mock_user
     )
 
-    updated_user = user_repository.update_avatar(
+    updated_user = await user_repository.update_avatar(
         user_id=5, avatar_url="https://example.com/avatar.png"
     )
 
     assert updated_user is mock_user
     assert mock_user.avatar_url == "https://example.com/avatar.png"
-    mock_db_session.commit.assert_called_once()
-    mock_db_session.refresh.assert_called_once_with(mock_user)
+    mock_db_session.commit.assert_awaited_once()
+    mock_db_session.refresh.assert_awaited_once_with(mock_user)
 
 
-def test_update_avatar_user_not_found(user_repository, mock_db_session):
-    mock_db_session.query.return_value.filter.return_value.first.return_value = None
+@pytest.mark.asyncio
+async def test_update_avatar_user_not_found(user_repository, mock_db_session):
+    mock_db_session.execute.return_value.scalars.return_value.first.return_value = None
 
-    updated_user = user_repository.update_avatar(
+    updated_user = await user_repository.update_avatar(
         user_id=999, avatar_url="https://example.com/avatar.png"
     )
     assert updated_user is None
-    mock_db_session.commit.assert_not_called()
-    mock_db_session.refresh.assert_not_called()
+    mock_db_session.commit.assert_not_awaited()
+    mock_db_session.refresh.assert_not_awaited()
 
 
-def test_update_password(user_repository, mock_db_session):
+@pytest.mark.asyncio
+async def test_update_password(user_repository, mock_db_session):
     mock_user = MagicMock(id=10, hashed_password="old_hashed_password")
-    mock_db_session.query.return_value.filter.return_value.first.return_value = (
+    mock_db_session.execute.return_value.scalars.return_value.first.return_value = (
         mock_user
     )
 
-    user_repository.update_password(user_id=10, hashed_password="new_hashed_password")
+    await user_repository.update_password(user_id=10, hashed_password="new_hashed_password")
 
     assert mock_user.hashed_password == "new_hashed_password"
-    mock_db_session.commit.assert_called_once()
-    mock_db_session.refresh.assert_called_once_with(mock_user)
+    mock_db_session.commit.assert_awaited_once()
+    mock_db_session.refresh.assert_awaited_once_with(mock_user)
 
 
-def test_update_password_user_not_found(user_repository, mock_db_session):
-    mock_db_session.query.return_value.filter.return_value.first.return_value = None
+@pytest.mark.asyncio
+async def test_update_password_user_not_found(user_repository, mock_db_session):
+    mock_db_session.execute.return_value.scalars.return_value.first.return_value = None
 
     from fastapi import HTTPException
 
     with pytest.raises(HTTPException) as exc_info:
-        user_repository.update_password(
+        await user_repository.update_password(
             user_id=999, hashed_password="new_hashed_password"
         )
 
     assert exc_info.value.status_code == 404
     assert exc_info.value.detail == "User not found"
-    mock_db_session.commit.assert_not_called()
-    mock_db_session.refresh.assert_not_called()
+    mock_db_session.commit.assert_not_awaited()
+    mock_db_session.refresh.assert_not_awaited()
+
+
+@pytest_asyncio.fixture
+async def live_sessionmaker():
+    engine = create_async_engine(DATABASE_URL, pool_size=20, max_overflow=0)
+    try:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1 FROM users LIMIT 1"))
+    except Exception as e:
+        await engine.dispose()
+        pytest.skip(f"Database is not reachable: {e}")
+
+    sessionmaker = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def cleanup():
+        async with sessionmaker() as session:
+            await session.execute(delete(User).where(User.username.like("storm-%")))
+            await session.commit()
+
+    await cleanup()
+    yield sessionmaker
+    await cleanup()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_create_registration_storm(live_sessionmaker):
+    users, attempts_per_user = 10, 10
+
+    async def register(username: str, email: str):
+        async with live_sessionmaker() as session:
+            try:
+                await UserRepository(session_provider=lambda: session).create(
+                    UserInDB(username=username, email=email, password="pass", hashed_password="hashed")
+                )
+                return "created"
+            except HTTPException as e:
+                assert e.status_code == 409
+                return e.detail
+
+    # Half of the attempts reuse the same email and username, the other half only the username.
+    attempts = [
+        (i, register(f"storm-{i}", f"storm-{i}@example.com" if attempt % 2 else f"storm-{i}-{attempt}@example.com"))
+        for attempt in range(attempts_per_user)
+        for i in range(users)
+    ]
+    outcomes = await asyncio.gather(*(attempt for _, attempt in attempts))
+
+    for i in range(users):
+        user_outcomes = [outcome for (user, _), outcome in zip(attempts, outcomes) if user == i]
+        assert user_outcomes.count("created") == 1
+        assert set(user_outcomes) <= {"created", "Email already registered", "Username already taken"}
+
+    async with live_sessionmaker() as session:
+        count = await session.scalar(select(func.count()).select_from(User).where(User.username.like("storm-%")))
+    assert count == users
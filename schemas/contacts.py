@@ -5,7 +5,8 @@ This module defines the Pydantic models for managing contact-related data.
 """
 
 from datetime import date
-from typing import Optional
+from enum import Enum
+from typing import List, Optional
 
 from pydantic import BaseModel, EmailStr
 
@@ -72,3 +73,54 @@ class ContactOut(ContactBase):
 
     class Config:
         from_attributes = True
+
+
+class ContactSortKey(str, Enum):
+    """
+    Sort keys supported by the paginated contact listing.
+
+    Each key is backed by a ``(user_id, <key>, id)`` index.
+    """
+    id = "id"
+    last_name = "last_name"
+    birthday = "birthday"
+
+
+class ContactExportFormat(str, Enum):
+    """
+    Formats supported by the streaming contact export.
+    """
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class ContactImportFormat(str, Enum):
+    """
+    Formats accepted by the bulk contact import.
+    """
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class ContactImportError(BaseModel):
+    """
+    Model for a row that could not be imported.
+
+    Attributes:
+        row (int): The 1-based position of the row in the uploaded file, not counting the CSV header.
+        detail (str): Why the row was rejected.
+    """
+    row: int
+    detail: str
+
+
+class ContactImportResult(BaseModel):
+    """
+    Model for the outcome of a bulk contact import.
+
+    Attributes:
+        imported (int): The number of contacts created.
+        errors (List[ContactImportError]): The rows that were rejected.
+    """
+    imported: int = 0
+    errors: List[ContactImportError] = []
@@ -0,0 +1,25 @@
+"""
+Email Schemas
+
+This module defines the Pydantic models for outgoing email data structures.
+"""
+
+from typing import List, Optional
+
+from pydantic import BaseModel, EmailStr
+
+
+class EmailOut(BaseModel):
+    """
+    Model representing an outgoing email.
+
+    Attributes:
+        subject (str): The subject of the email.
+        recipients (List[EmailStr]): The recipient email addresses.
+        body (str): The plain text body of the email.
+        html (Optional[str]): The HTML body of the email, if any.
+    """
+    subject: str
+    recipients: List[EmailStr]
+    body: str
+    html: Optional[str] = None
@@ -1,16 +1,30 @@
-import json
+import asyncio
+import hashlib
+import math
 import os
+import random
+import secrets
+import time
+import uuid
 from abc import abstractmethod, ABC
 from datetime import datetime, timedelta
-from typing import Optional, List
+from typing import TYPE_CHECKING, Any, Dict, Optional, List
 
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, Request, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from pydantic import HttpUrl
 
 from schemas.auth import Token
+from schemas.emails import EmailOut
 from schemas.users import UserCreate, UserOut, UserInDB
+from services.email_templates import EmailTemplates
+from services.single_flight import SingleFlight
+
+if TYPE_CHECKING:
+    from clients.local_cache import LocalTTLCache
+    from services.login_throttle import LoginThrottle
 
 SECRET_KEY = os.environ.get("AUTH_SECRET_KEY")
 ALGORITHM = os.environ.get("AUTH_JWT_ALGORITHM")
@@ -18,6 +32,15 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("AUTH_ACCESS_TOKEN_EXPIRE_MINUT
 CONFIRMATION_TOKEN_EXPIRE_HOURS = int(os.environ.get("AUTH_CONFIRMATION_TOKEN_EXPIRE_HOURS", 24))
 PASSWORD_RESET_TOKEN_EXPIRE_HOURS = int(os.environ.get("PASSWORD_RESET_TOKEN_EXPIRE_HOURS", 1))
 DOMAIN_NAME = os.environ.get("DOMAIN_NAME", "http://localhost:8000")
+USER_CACHE_EARLY_REFRESH_BETA = float(os.environ.get("USER_CACHE_EARLY_REFRESH_BETA", 1))
+USER_CACHE_LOCK_ENABLED = os.environ.get("USER_CACHE_LOCK_ENABLED", "false").lower() == "true"
+USER_CACHE_LOCK_TTL = int(os.environ.get("USER_CACHE_LOCK_TTL", 5))
+USER_CACHE_LOCK_WAIT = float(os.environ.get("USER_CACHE_LOCK_WAIT", 1))
+USER_CACHE_LOCK_POLL_INTERVAL = 0.05
+USER_NEGATIVE_CACHE_TTL = int(os.environ.get("USER_NEGATIVE_CACHE_TTL", 60))
+TOKEN_CLAIMS_CACHE_SIZE = int(os.environ.get("TOKEN_CLAIMS_CACHE_SIZE", 10000))
+AUTH_STATELESS_PRINCIPAL = os.environ.get("AUTH_STATELESS_PRINCIPAL", "false").lower() == "true"
+MISSING_USER = {"missing": True}
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
@@ -25,25 +48,63 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 class IUserRepository(ABC):
     @abstractmethod
-    def get_by_username(self, username: str):
+    async def get_by_username(self, username: str):
         pass
 
     @abstractmethod
-    def get_by_email(self, email: str):
+    async def get_by_email(self, email: str):
         pass
 
     @abstractmethod
-    def create(self, user_data: dict):
+    async def create(self, user_data: dict):
         pass
 
     @abstractmethod
-    def mark_email_confirmed(self, user_id: int):
+    async def mark_email_confirmed(self, user_id: int):
+        pass
+
+    @abstractmethod
+    async def end_transaction(self):
         pass
 
 
 class IEmailSender(ABC):
     @abstractmethod
-    def send_email(self, subject: str, recipients: List, body: str):
+    def send_email(self, subject: str, recipients: List, body: str, html: Optional[str] = None):
+        pass
+
+    @abstractmethod
+    async def send_many(self, emails: List[EmailOut]) -> List[Optional[Exception]]:
+        pass
+
+
+class IPasswordHasher(ABC):
+    @abstractmethod
+    async def hash(self, password: str) -> str:
+        pass
+
+    @abstractmethod
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        pass
+
+
+class ITokenVersions(ABC):
+    @abstractmethod
+    async def get_version(self, user_id: int) -> int:
+        pass
+
+    @abstractmethod
+    async def bump(self, user_id: int) -> int:
+        pass
+
+
+class ITokenRevocations(ABC):
+    @abstractmethod
+    async def is_revoked(self, jti: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def revoke(self, jti: str, expires_at: float):
         pass
 
 
@@ -60,34 +121,104 @@ class ICache(ABC):
     async def delete(self, key: str):
         pass
 
-class CustomJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        return super().default(obj)
+    @abstractmethod
+    async def get_object(self, key: str) -> Any:
+        pass
+
+    @abstractmethod
+    async def set_object(self, key: str, value: Any, ttl: int):
+        pass
+
+    @abstractmethod
+    async def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        pass
+
+    @abstractmethod
+    async def set_many(self, items: Dict[str, str], ttl: int):
+        pass
+
+    @abstractmethod
+    async def delete_many(self, keys: List[str]):
+        pass
+
+    @abstractmethod
+    async def set_if_absent(self, key: str, value: str, ttl: int) -> bool:
+        pass
+
+    @abstractmethod
+    async def incr(self, key: str, ttl: int) -> int:
+        pass
+
+
+def user_cache_key(username: str) -> str:
+    # Versioned: before early refresh, "user:{username}" held the bare user, which the entries
+    # read here do not fit, and older processes cannot read these entries either.
+    return f"user:v2:{username}"
+
+
+def missing_email_cache_key(email: str) -> str:
+    return f"missing-email:{email}"
+
+
+def user_from_cache(data: dict) -> UserOut:
+    # Cached users were validated before they were stored, so they are rebuilt without running
+    # validation again; only the fields the cache stores as strings are converted back.
+    if data.keys() != UserOut.model_fields.keys():
+        return UserOut.model_validate(data)
+    avatar_url = data["avatar_url"]
+    return UserOut.model_construct(**{
+        **data,
+        "created_at": datetime.fromisoformat(data["created_at"]),
+        "avatar_url": HttpUrl(avatar_url) if avatar_url is not None else None,
+    })
+
 
 class AuthService:
-    def __init__(self, user_repository: IUserRepository, email_sender: IEmailSender, cache: ICache):
+    def __init__(self, user_repository: IUserRepository, email_sender: IEmailSender, cache: ICache,
+                 password_hasher: IPasswordHasher, login_throttle: "LoginThrottle", claims_cache: "LocalTTLCache",
+                 token_versions: ITokenVersions, token_revocations: ITokenRevocations, email_templates: EmailTemplates):
         self.user_repository = user_repository
         self.email_client = email_sender
         self.cache = cache
-
-    def hash_password(self, password: str) -> str:
-        return pwd_context.hash(password)
-
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
-
-    def authenticate_user(self, username: str, password: str) -> Optional[UserOut]:
-        user = self.user_repository.get_by_username(username)
-        if user and self.verify_password(password, user.hashed_password):
+        self.password_hasher = password_hasher
+        self.login_throttle = login_throttle
+        self.claims_cache = claims_cache
+        self.token_versions = token_versions
+        self.token_revocations = token_revocations
+        self.email_templates = email_templates
+        self._dummy_hash: Optional[str] = None
+        self._user_loads = SingleFlight()
+
+    async def hash_password(self, password: str) -> str:
+        return await self.password_hasher.hash(password)
+
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.password_hasher.verify(plain_password, hashed_password)
+
+    async def authenticate_user(self, username: str, password: str) -> Optional[UserOut]:
+        user = await self.user_repository.get_by_username(username)
+        # The connection goes back to the pool before waiting for bcrypt, so a burst of logins
+        # queued for the hasher does not hold the pool from every other request.
+        await self.user_repository.end_transaction()
+        if user is None:
+            # Checked against a throwaway hash, so unknown usernames take as long as wrong passwords.
+            await self.verify_password(password, await self._get_dummy_hash())
+            return None
+        if await self.verify_password(password, user.hashed_password):
             return user
         return None
 
+    async def _get_dummy_hash(self) -> str:
+        if self._dummy_hash is None:
+            self._dummy_hash = await self.hash_password(secrets.token_urlsafe(16))
+        return self._dummy_hash
+
     def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None) -> str:
         to_encode = data.copy()
         expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
         to_encode.update({"exp": expire})
+        # "jti" identifies this one token, so it can be revoked on its own.
+        to_encode.setdefault("jti", uuid.uuid4().hex)
         return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
     def create_confirmation_token(self, email: str) -> str:
@@ -95,36 +226,32 @@ class AuthService:
         to_encode = {"sub": email, "exp": expire}
         return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-    def confirm_email(self, token: str) -> UserOut:
+    async def confirm_email(self, token: str) -> UserOut:
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
             email: str = payload.get("sub")
             if email is None:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid token")
-            user = self.user_repository.get_by_email(email)
+            user = await self.user_repository.get_by_email(email)
             if not user:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-            self.user_repository.mark_email_confirmed(user.id)
+            await self.user_repository.mark_email_confirmed(user.id)
+            await self.cache.delete(user_cache_key(user.username))
             return UserOut.from_orm(user)
         except JWTError:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired token")
 
     async def send_confirmation_email(self, user: UserOut, token: str):
-        subject = "Confirm your email"
         confirmation_url = f"https://{DOMAIN_NAME}/auth/confirm/{token}"
-        body = f"""
-        Hello {user.username},
-
-        Please confirm your email by clicking the link below:
-        {confirmation_url}
-        """
-        await self.email_client.send_email(subject, [user.email], body)
+        email = self.email_templates.render(
+            "confirmation", [user.email], username=user.username, url=confirmation_url
+        )
+        await self.email_client.send_email(email.subject, email.recipients, email.body, email.html)
 
     async def register_user(self, user: UserCreate) -> UserOut:
-        if self.user_repository.get_by_email(user.email):
-            raise HTTPException(status_code=409, detail="Email already registered")
-
-        hashed_password = self.hash_password(user.password)
+        # A taken email or username is rejected with 409 by create() itself, in the same statement
+        # that inserts, so there is no separate check for concurrent registrations to slip past.
+        hashed_password = await self.hash_password(user.password)
         user_in_db = UserInDB(
             username=user.username,
             email=user.email,
@@ -132,25 +259,52 @@ class AuthService:
             hashed_password=hashed_password
         )
 
-        new_user = self.user_repository.create(user_in_db)
+        new_user = await self.user_repository.create(user_in_db)
+        await self.cache.delete_many([user_cache_key(new_user.username), missing_email_cache_key(new_user.email)])
 
         confirmation_token = self.create_confirmation_token(new_user.email)
         await self.send_confirmation_email(UserOut.from_orm(new_user), confirmation_token)
         return UserOut.from_orm(new_user)
 
-    def login_user(self, username: str, password: str) -> Token:
-        user = self.authenticate_user(username, password)
+    async def login_user(self, username: str, password: str, client_ip: Optional[str] = None) -> Token:
+        await self.login_throttle.check(username, client_ip)
+        user = await self.authenticate_user(username, password)
         if not user:
+            await self.login_throttle.record_failure(username, client_ip)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid username or password",
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-        access_token = self.create_access_token(data={"sub": user.username})
+        await self.login_throttle.record_success(username)
+        # "ver" lets every token issued so far be revoked at once by bumping the user's version.
+        claims = {"sub": user.username, "ver": await self.token_versions.get_version(user.id)}
+        if AUTH_STATELESS_PRINCIPAL:
+            claims["usr"] = UserOut.from_orm(user).model_dump(mode="json")
+        access_token = self.create_access_token(data=claims)
         return Token(access_token=access_token, token_type="bearer")
 
-    async def get_current_user(self, token: str = Depends(oauth2_scheme)):
+    def get_token_claims(self, token: str, request: Optional[Request] = None) -> dict:
+        # Verified claims are kept on the request for later callers in the same request, and in a
+        # process-local cache keyed by the token's hash until the token expires. The returned
+        # dict is shared and must not be modified.
+        if request is not None and getattr(request.state, "token_claims", None) is not None:
+            return request.state.token_claims
+
+        key = hashlib.sha256(token.encode()).hexdigest()
+        claims = self.claims_cache.get(key)
+        if claims is None:
+            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            ttl = claims.get("exp", 0) - time.time()
+            if ttl > 0:
+                self.claims_cache.set(key, claims, ttl)
+
+        if request is not None:
+            request.state.token_claims = claims
+        return claims
+
+    async def get_current_user(self, token: str = Depends(oauth2_scheme), request: Request = None):
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
@@ -158,59 +312,130 @@ class AuthService:
         )
 
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            payload = self.get_token_claims(token, request)
             username: str = payload.get("sub")
             if username is None:
                 raise credentials_exception
         except JWTError:
             raise credentials_exception
 
-        cached_user = await self.cache.get(f"user:{username}")
-        if cached_user:
-            return UserOut(**json.loads(cached_user))
-
-        user = self.user_repository.get_by_username(username)
-        if user is None:
+        jti = payload.get("jti")
+        if jti is not None and await self.token_revocations.is_revoked(jti):
             raise credentials_exception
 
-        user_out = UserOut.from_orm(user)
-
-        user_data = json.dumps(user_out.dict(), cls=CustomJSONEncoder)
-        await self.cache.set(f"user:{username}", user_data, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
-
+        if AUTH_STATELESS_PRINCIPAL and "usr" in payload:
+            # The claims were signed by us, so the user is built from them without any lookup.
+            user_out = user_from_cache(payload["usr"])
+        else:
+            user_out = await self._get_user(username)
+        if user_out is None or payload.get("ver", 0) < await self.token_versions.get_version(user_out.id):
+            raise credentials_exception
         return user_out
 
-    def create_password_reset_token(self, email: str) -> str:
-        user = self.user_repository.get_by_email(email)
+    async def logout(self, token: str):
+        try:
+            payload = self.get_token_claims(token)
+        except JWTError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        jti = payload.get("jti")
+        if jti is not None:
+            await self.token_revocations.revoke(jti, payload["exp"])
+
+    async def _get_user(self, username: str) -> Optional[UserOut]:
+        key = user_cache_key(username)
+        entry = await self.cache.get_object(key)
+        if entry:
+            if entry.get("missing"):
+                return None
+            if not self._should_refresh_early(entry):
+                return user_from_cache(entry["user"])
+        return await self._user_loads.do(key, lambda: self._load_user(username))
+
+    @staticmethod
+    def _should_refresh_early(entry: dict) -> bool:
+        # Probabilistic early expiration ("XFetch"): the closer the entry is to expiring, and the
+        # longer it took to load, the likelier a request is to reload it before it expires.
+        remaining = entry["expires_at"] - time.time()
+        jitter = -math.log(1.0 - random.random())
+        return entry["delta"] * USER_CACHE_EARLY_REFRESH_BETA * jitter >= remaining
+
+    async def _load_user(self, username: str) -> Optional[UserOut]:
+        key = user_cache_key(username)
+        lock_key = f"lock:{key}"
+        locked = False
+        if USER_CACHE_LOCK_ENABLED:
+            locked = await self.cache.set_if_absent(lock_key, "1", USER_CACHE_LOCK_TTL)
+            if not locked:
+                # Another process is loading the user; use its result unless it takes too long.
+                entry = await self._wait_for_cached_user(key)
+                if entry is not None:
+                    return None if entry.get("missing") else user_from_cache(entry["user"])
+
+        try:
+            started = time.monotonic()
+            user = await self.user_repository.get_by_username(username)
+            if user is None:
+                # Remembered briefly, so tokens of deleted users do not reach the database each time.
+                await self.cache.set_object(key, MISSING_USER, USER_NEGATIVE_CACHE_TTL)
+                return None
+            user_out = UserOut.from_orm(user)
+            ttl = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+            entry = {
+                "user": user_out.model_dump(mode="json"),
+                "delta": time.monotonic() - started,
+                "expires_at": time.time() + ttl,
+            }
+            await self.cache.set_object(key, entry, ttl)
+            return user_out
+        finally:
+            if locked:
+                await self.cache.delete(lock_key)
+
+    async def _wait_for_cached_user(self, key: str) -> Optional[dict]:
+        deadline = time.monotonic() + USER_CACHE_LOCK_WAIT
+        while True:
+            entry = await self.cache.get_object(key)
+            if entry:
+                return entry
+            if time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(USER_CACHE_LOCK_POLL_INTERVAL)
+
+    async def create_password_reset_token(self, email: str) -> str:
+        email_not_found = HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Email not found")
+        missing_key = missing_email_cache_key(email)
+        if await self.cache.get(missing_key):
+            raise email_not_found
+        user = await self.user_repository.get_by_email(email)
         if not user:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Email not found")
+            await self.cache.set(missing_key, "1", USER_NEGATIVE_CACHE_TTL)
+            raise email_not_found
         expire = datetime.utcnow() + timedelta(hours=PASSWORD_RESET_TOKEN_EXPIRE_HOURS)
         payload = {"sub": email, "exp": expire}
         return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
-    def reset_password(self, token: str, new_password: str):
+    async def reset_password(self, token: str, new_password: str):
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
             email: str = payload.get("sub")
             if email is None:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid token")
-            user = self.user_repository.get_by_email(email)
+            user = await self.user_repository.get_by_email(email)
             if not user:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-            hashed_password = self.hash_password(new_password)
-            self.user_repository.update_password(user.id, hashed_password)
+            await self.user_repository.end_transaction()
+            hashed_password = await self.hash_password(new_password)
+            await self.user_repository.update_password(user.id, hashed_password)
+            await self.cache.delete(user_cache_key(user.username))
+            await self.token_versions.bump(user.id)
         except JWTError:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired token")
 
     async def send_password_reset_email(self, email: str, token: str):
         reset_url = f"https://{DOMAIN_NAME}/auth/password-reset/confirm?token={token}"
-        subject = "Password Reset Request"
-        body = f"""
-        Hi,
-
-        Click the link below to reset your password:
-        {reset_url}
-
-        If you did not request a password reset, please ignore this email.
-        """
-        await self.email_client.send_email(subject, [email], body)
+        message = self.email_templates.render("password_reset", [email], url=reset_url)
+        await self.email_client.send_email(message.subject, message.recipients, message.body, message.html)
@@ -1,62 +1,281 @@
+import base64
+import codecs
+import csv
+import hashlib
+import io
+import json
+import uuid
 from abc import ABC, abstractmethod
-from typing import Optional
+from datetime import date
+from typing import Any, AsyncIterator, List, Optional, Tuple
 
-from schemas.contacts import ContactCreate, ContactUpdate
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+
+from schemas.contacts import (ContactCreate, ContactUpdate, ContactOut, ContactSortKey, ContactExportFormat,
+                              ContactImportFormat, ContactImportError, ContactImportResult)
+from services.auth_service import ICache
+
+EXPORT_FIELDS = ["id", *ContactCreate.model_fields]
+IMPORT_BATCH_SIZE = 1000
+CONTACT_VERSION_TTL = 24 * 60 * 60
 
 
 class IContactRepository(ABC):
     @abstractmethod
-    def get_all_by_user(self, user_id: int):
+    async def get_page_by_user(self, user_id: int, limit: int, sort_by: str = "id",
+                               after: Optional[Tuple[Any, int]] = None):
+        pass
+
+    @abstractmethod
+    async def get_by_id_and_user(self, contact_id: int, user_id: int):
+        pass
+
+    @abstractmethod
+    async def create_for_user(self, contact: ContactCreate, user_id: int):
         pass
 
     @abstractmethod
-    def get_by_id_and_user(self, contact_id: int, user_id: int):
+    async def create_many_for_user(self, contacts: List[ContactCreate], user_id: int) -> List[Optional[str]]:
         pass
 
     @abstractmethod
-    def create_for_user(self, contact: ContactCreate, user_id: int):
+    async def update_for_user(self, contact_id: int, contact: ContactUpdate, user_id: int):
         pass
 
     @abstractmethod
-    def update_for_user(self, contact_id: int, contact: ContactUpdate, user_id: int):
+    async def delete_for_user(self, contact_id: int, user_id: int):
         pass
 
     @abstractmethod
-    def delete_for_user(self, contact_id: int, user_id: int):
+    async def search_by_user(self, user_id: int, first_name: Optional[str] = None, last_name: Optional[str] = None,
+                             email: Optional[str] = None, limit: Optional[int] = None):
         pass
 
     @abstractmethod
-    def search_by_user(self, user_id: int, first_name: Optional[str] = None, last_name: Optional[str] = None,
-                       email: Optional[str] = None):
+    async def search_ranked_by_user(self, user_id: int, term: str, limit: int):
         pass
 
     @abstractmethod
-    def get_upcoming_birthdays_by_user(self, user_id: int):
+    async def get_upcoming_birthdays_by_user(self, user_id: int, days: int = 7):
+        pass
+
+    @abstractmethod
+    def stream_by_user(self, user_id: int, batch_size: int = 1000):
         pass
 
 
 class ContactService:
-    def __init__(self, repository: IContactRepository):
+    def __init__(self, repository: IContactRepository, cache: ICache):
         self.contact_repository = repository
+        self.cache = cache
+
+    async def get_user_contacts(self, user_id: int, limit: int = 50, sort_by: ContactSortKey = ContactSortKey.id,
+                                cursor: Optional[str] = None):
+        after = self._decode_cursor(cursor, sort_by) if cursor else None
+        contacts = await self.contact_repository.get_page_by_user(user_id, limit + 1, sort_by.value, after)
+
+        next_cursor = None
+        if len(contacts) > limit:
+            contacts = contacts[:limit]
+            last = contacts[-1]
+            next_cursor = self._encode_cursor(sort_by, getattr(last, sort_by.value), last.id)
+        return contacts, next_cursor
+
+    async def get_user_contact(self, contact_id: int, user_id: int):
+        return await self.contact_repository.get_by_id_and_user(contact_id, user_id)
+
+    async def create_contact(self, contact: ContactCreate, user_id: int):
+        created_contact = await self.contact_repository.create_for_user(contact, user_id)
+        await self._bump_versions(user_id)
+        return created_contact
+
+    async def update_user_contact(self, contact_id: int, contact: ContactUpdate, user_id: int):
+        updated_contact = await self.contact_repository.update_for_user(contact_id, contact, user_id)
+        if updated_contact is not None:
+            await self._bump_versions(user_id, contact_id)
+            await self.cache.set(self._contact_version_key(user_id, contact_id), uuid.uuid4().hex,
+                                 CONTACT_VERSION_TTL)
+        return updated_contact
+
+    async def delete_user_contact(self, contact_id: int, user_id: int):
+        deleted_contact = await self.contact_repository.delete_for_user(contact_id, user_id)
+        if deleted_contact is not None:
+            await self._bump_versions(user_id, contact_id)
+        return deleted_contact
+
+    async def get_contacts_etag(self, user_id: int, variant: str = "") -> str:
+        version = await self._get_version(self._contacts_version_key(user_id))
+        return self._make_etag(version, variant)
+
+    async def get_contact_etag(self, user_id: int, contact_id: int) -> str:
+        # A contact gets its own version only once it is updated; until then its tag follows the
+        # list version, so reads of any id, existing or not, never create keys.
+        contact_version, contacts_version = await self.cache.get_many(
+            [self._contact_version_key(user_id, contact_id), self._contacts_version_key(user_id)]
+        )
+        version = contact_version or contacts_version or await self._get_version(self._contacts_version_key(user_id))
+        return self._make_etag(version, str(contact_id))
+
+    async def search_user_contacts(self, user_id: int, first_name: Optional[str] = None,
+                                   last_name: Optional[str] = None, email: Optional[str] = None, limit: int = 50):
+        return await self.contact_repository.search_by_user(user_id, first_name, last_name, email, limit)
+
+    async def rank_user_contacts(self, user_id: int, term: str, limit: int = 50):
+        return await self.contact_repository.search_ranked_by_user(user_id, term.strip(), limit)
+
+    async def get_upcoming_birthdays(self, user_id: int, days: int = 7):
+        return await self.contact_repository.get_upcoming_birthdays_by_user(user_id, days)
+
+    async def export_user_contacts(self, user_id: int, export_format: ContactExportFormat) -> AsyncIterator[str]:
+        if export_format == ContactExportFormat.csv:
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            yield buffer.getvalue()
+
+            async for batch in self.contact_repository.stream_by_user(user_id):
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(ContactOut.model_validate(contact).model_dump() for contact in batch)
+                yield buffer.getvalue()
+        else:
+            async for batch in self.contact_repository.stream_by_user(user_id):
+                yield "".join(ContactOut.model_validate(contact).model_dump_json() + "\n" for contact in batch)
+
+    async def import_user_contacts(self, user_id: int, chunks: AsyncIterator[bytes],
+                                   import_format: ContactImportFormat,
+                                   batch_size: int = IMPORT_BATCH_SIZE) -> ContactImportResult:
+        result = ContactImportResult()
+        lines = self._iter_lines(chunks)
+        if import_format == ContactImportFormat.csv:
+            records, validate = self._iter_csv_records(lines), ContactCreate.model_validate
+        else:
+            records, validate = self._iter_ndjson_records(lines), ContactCreate.model_validate_json
+
+        batch: List[ContactCreate] = []
+        batch_rows: List[int] = []
+        async for row, record in records:
+            try:
+                batch.append(validate(record))
+                batch_rows.append(row)
+            except ValidationError as e:
+                result.errors.append(ContactImportError(row=row, detail=self._format_validation_error(e)))
+                continue
+            if len(batch) >= batch_size:
+                await self._import_batch(user_id, batch, batch_rows, result)
+                batch, batch_rows = [], []
+        await self._import_batch(user_id, batch, batch_rows, result)
+
+        if result.imported:
+            await self._bump_versions(user_id)
+        result.errors.sort(key=lambda error: error.row)
+        return result
+
+    async def _import_batch(self, user_id: int, batch: List[ContactCreate], batch_rows: List[int],
+                            result: ContactImportResult):
+        conflicts = await self.contact_repository.create_many_for_user(batch, user_id)
+        for row, conflict in zip(batch_rows, conflicts):
+            if conflict:
+                result.errors.append(ContactImportError(row=row, detail=f"Contact with this {conflict} already exists"))
+            else:
+                result.imported += 1
+
+    async def _get_version(self, key: str) -> str:
+        version = await self.cache.get(key)
+        if version is None:
+            version = uuid.uuid4().hex
+            await self.cache.set(key, version, CONTACT_VERSION_TTL)
+        return version
+
+    async def _bump_versions(self, user_id: int, contact_id: Optional[int] = None):
+        # Versions are dropped rather than overwritten: a delete also evicts them from the local
+        # cache tier of every worker, and the next read starts a fresh version.
+        keys = [self._contacts_version_key(user_id)]
+        if contact_id is not None:
+            keys.append(self._contact_version_key(user_id, contact_id))
+        await self.cache.delete_many(keys)
+
+    @staticmethod
+    def _contacts_version_key(user_id: int) -> str:
+        return f"contacts:version:{user_id}"
+
+    @staticmethod
+    def _contact_version_key(user_id: int, contact_id: int) -> str:
+        return f"contact:version:{user_id}:{contact_id}"
 
-    def get_user_contacts(self, user_id: int):
-        return self.contact_repository.get_all_by_user(user_id)
+    @staticmethod
+    def _make_etag(version: str, variant: str) -> str:
+        return '"' + hashlib.sha256(f"{version}:{variant}".encode()).hexdigest()[:32] + '"'
 
-    def get_user_contact(self, contact_id: int, user_id: int):
-        return self.contact_repository.get_by_id_and_user(contact_id, user_id)
+    @staticmethod
+    async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        pending = ""
+        async for chunk in chunks:
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                yield line.rstrip("\r")
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            yield pending.rstrip("\r")
 
-    def create_contact(self, contact: ContactCreate, user_id: int):
-        return self.contact_repository.create_for_user(contact, user_id)
+    @staticmethod
+    async def _iter_ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, str]]:
+        row = 0
+        async for line in lines:
+            if line.strip():
+                row += 1
+                yield row, line
 
-    def update_user_contact(self, contact_id: int, contact: ContactUpdate, user_id: int):
-        return self.contact_repository.update_for_user(contact_id, contact, user_id)
+    @staticmethod
+    async def _iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, dict]]:
+        header = None
+        row = 0
+        record = None
+        async for line in lines:
+            # A quoted field may contain newlines: keep joining lines until the quotes balance.
+            record = line if record is None else f"{record}\n{line}"
+            if record.count('"') % 2:
+                continue
+            values, record = next(csv.reader([record]), []), None
+            if not values:
+                continue
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            row += 1
+            yield row, {name: value or None for name, value in zip(header, values)}
+        if record is not None and header is not None:
+            yield row + 1, {name: value or None for name, value in zip(header, next(csv.reader([record]), []))}
 
-    def delete_user_contact(self, contact_id: int, user_id: int):
-        return self.contact_repository.delete_for_user(contact_id, user_id)
+    @staticmethod
+    def _format_validation_error(error: ValidationError) -> str:
+        return "; ".join(
+            f"{'.'.join(map(str, e['loc']))}: {e['msg']}" if e["loc"] else e["msg"] for e in error.errors()
+        )
 
-    def search_user_contacts(self, user_id: int, first_name: Optional[str] = None, last_name: Optional[str] = None,
-                             email: Optional[str] = None):
-        return self.contact_repository.search_by_user(user_id, first_name, last_name, email)
+    @staticmethod
+    def _encode_cursor(sort_by: ContactSortKey, value: Any, contact_id: int) -> str:
+        if isinstance(value, date):
+            value = value.isoformat()
+        raw = json.dumps([sort_by.value, value, contact_id], separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
 
-    def get_upcoming_birthdays(self, user_id: int):
-        return self.contact_repository.get_upcoming_birthdays_by_user(user_id)
+    @staticmethod
+    def _decode_cursor(cursor: str, sort_by: ContactSortKey) -> Tuple[Any, int]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            cursor_sort, value, contact_id = json.loads(base64.urlsafe_b64decode(padded))
+            if cursor_sort != sort_by.value or not isinstance(contact_id, int):
+                raise ValueError("cursor does not match the requested sort")
+            if sort_by == ContactSortKey.id and value != contact_id:
+                raise ValueError("cursor value does not match its id")
+            if sort_by != ContactSortKey.id and value is not None and not isinstance(value, str):
+                raise TypeError("cursor value must be a string")
+            if sort_by == ContactSortKey.birthday and value is not None:
+                value = date.fromisoformat(value)
+            return value, contact_id
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
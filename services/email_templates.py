@@ -0,0 +1,56 @@
+import os
+from typing import Dict, Iterable, List, Tuple
+
+from mako.template import Template
+
+from schemas.emails import EmailOut
+
+EMAIL_TEMPLATES_DIR = os.environ.get(
+    "EMAIL_TEMPLATES_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "emails")
+)
+
+
+class EmailTemplates:
+    """
+    Compiles every email template once, when constructed, and renders emails from the compiled
+    templates.
+
+    Each email is a directory holding subject.mako, body.txt.mako and body.html.mako. Values
+    are HTML-escaped in the HTML body only, and a value missing from the context fails the
+    render instead of rendering as "UNDEFINED".
+    """
+
+    def __init__(self, directory: str = EMAIL_TEMPLATES_DIR):
+        self._templates: Dict[str, Tuple[Template, Template, Template]] = {}
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if os.path.isdir(path):
+                self._templates[name] = (
+                    self._compile(os.path.join(path, "subject.mako")),
+                    self._compile(os.path.join(path, "body.txt.mako")),
+                    self._compile(os.path.join(path, "body.html.mako"), default_filters=["str", "h"]),
+                )
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._templates)
+
+    def render(self, name: str, recipients: List[str], **context) -> EmailOut:
+        return self.render_many(name, [(recipients, context)])[0]
+
+    def render_many(self, name: str, messages: Iterable[Tuple[List[str], dict]]) -> List[EmailOut]:
+        subject, text, html = self._templates[name]
+        return [
+            EmailOut(
+                subject=subject.render(**context).strip(),
+                recipients=recipients,
+                body=text.render(**context),
+                html=html.render(**context),
+            )
+            for recipients, context in messages
+        ]
+
+    @staticmethod
+    def _compile(path: str, default_filters: List[str] = None) -> Template:
+        with open(path, encoding="utf-8") as file:
+            return Template(file.read(), strict_undefined=True, default_filters=default_filters, uri=path)
@@ -0,0 +1,47 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class _LeaderCancelled(Exception):
+    pass
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent loads of the same key within a process: while a load for a key is in
+    flight, later callers await its result instead of starting their own.
+
+    A failed load raises its exception in every caller waiting on it. If the caller running the
+    load is cancelled, the waiters are not; one of them runs the load again.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, loader: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is not None:
+            try:
+                return await asyncio.shield(call)
+            except _LeaderCancelled:
+                return await self.do(key, loader)
+
+        call = asyncio.get_running_loop().create_future()
+        self._calls[key] = call
+        try:
+            result = await loader()
+        except asyncio.CancelledError:
+            call.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+            # Marks a failure as retrieved even when no caller was waiting for it.
+            call.exception()
@@ -1,13 +1,18 @@
-from datetime import datetime
-from unittest.mock import AsyncMock, Mock, patch
+import asyncio
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from fastapi import HTTPException
-from jose import jwt
+from jose import JWTError, jwt
 
+from clients.local_cache import LocalTTLCache
 from schemas.auth import Token
 from schemas.users import UserCreate, UserOut
-from services.auth_service import AuthService
+from services.auth_service import AuthService, user_from_cache
+from services.email_templates import EmailTemplates
 
 TEST_SECRET_KEY = "testsecret"
 TEST_ALGORITHM = "HS256"
@@ -39,6 +44,14 @@ class FakeUser:
         self.hashed_password = hashed_password
 
 
+class FakePasswordHasher:
+    async def hash(self, password):
+        return f"hashed:{password}"
+
+    async def verify(self, plain_password, hashed_password):
+        return hashed_password == f"hashed:{plain_password}"
+
+
 @pytest.fixture(autouse=True)
 def patch_auth_service_constants():
     with patch("services.auth_service.SECRET_KEY", TEST_SECRET_KEY), \
@@ -52,7 +65,7 @@ def patch_auth_service_constants():
 
 @pytest.fixture
 def mock_user_repository():
-    return Mock()
+    return AsyncMock()
 
 
 @pytest.fixture
@@ -62,29 +75,58 @@ def mock_email_sender():
 
 @pytest.fixture
 def mock_cache():
+    cache = AsyncMock()
+    cache.get.return_value = None
+    cache.get_object.return_value = None
+    return cache
+
+
+@pytest.fixture
+def mock_login_throttle():
     return AsyncMock()
 
 
 @pytest.fixture
-def auth_service(mock_user_repository, mock_email_sender, mock_cache):
-    return AuthService(mock_user_repository, mock_email_sender, mock_cache)
+def mock_token_versions():
+    token_versions = AsyncMock()
+    token_versions.get_version.return_value = 0
+    return token_versions
+
 
+@pytest.fixture
+def mock_token_revocations():
+    token_revocations = AsyncMock()
+    token_revocations.is_revoked.return_value = False
+    return token_revocations
 
-def test_hash_password(auth_service):
+
+@pytest.fixture
+def auth_service(mock_user_repository, mock_email_sender, mock_cache, mock_login_throttle, mock_token_versions,
+                 mock_token_revocations):
+    return AuthService(
+        mock_user_repository, mock_email_sender, mock_cache, FakePasswordHasher(), mock_login_throttle,
+        LocalTTLCache(), mock_token_versions, mock_token_revocations, EmailTemplates(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_hash_password(auth_service):
     password = "testpass"
-    hashed = auth_service.hash_password(password)
+    hashed = await auth_service.hash_password(password)
     assert hashed != password
     assert isinstance(hashed, str)
 
 
-def test_verify_password(auth_service):
+@pytest.mark.asyncio
+async def test_verify_password(auth_service):
     password = "testpass"
-    hashed = auth_service.hash_password(password)
-    assert auth_service.verify_password(password, hashed) is True
-    assert auth_service.verify_password("wrongpass", hashed) is False
+    hashed = await auth_service.hash_password(password)
+    assert await auth_service.verify_password(password, hashed) is True
+    assert await auth_service.verify_password("wrongpass", hashed) is False
 
 
-def test_authenticate_user(auth_service, mock_user_repository):
+@pytest.mark.asyncio
+async def test_authenticate_user(auth_service, mock_user_repository):
     fake_user = FakeUser(
         1,
         "user1",
@@ -93,13 +135,13 @@ def test_authenticate_user(auth_service, mock_user_repository):
         False,
         None,
         "testpass",
-        auth_service.hash_password("testpass")
+        await auth_service.hash_password("testpass")
     )
     mock_user_repository.get_by_username.return_value = fake_user
-    result = auth_service.authenticate_user("user1", "testpass")
+    result = await auth_service.authenticate_user("user1", "testpass")
     assert result is not None
     assert result.username == "user1"
-    mock_user_repository.get_by_username.assert_called_once_with("user1")
+    mock_user_repository.get_by_username.assert_awaited_once_with("user1")
 
 
 def test_create_access_token(auth_service):
@@ -118,7 +160,8 @@ def test_create_confirmation_token(auth_service):
     assert "exp" in decoded
 
 
-def test_confirm_email(auth_service, mock_user_repository):
+@pytest.mark.asyncio
+async def test_confirm_email(auth_service, mock_user_repository, mock_cache):
     fake_user = FakeUser(
         1,
         "user1",
@@ -131,10 +174,11 @@ def test_confirm_email(auth_service, mock_user_repository):
     )
     mock_user_repository.get_by_email.return_value = fake_user
     token = auth_service.create_confirmation_token(fake_user.email)
-    result = auth_service.confirm_email(token)
+    result = await auth_service.confirm_email(token)
     assert result.email == fake_user.email
-    mock_user_repository.get_by_email.assert_called_once()
-    mock_user_repository.mark_email_confirmed.assert_called_once()
+    mock_user_repository.get_by_email.assert_awaited_once()
+    mock_user_repository.mark_email_confirmed.assert_awaited_once()
+    mock_cache.delete.assert_awaited_once_with("user:v2:user1")
 
 
 @pytest.mark.asyncio
@@ -172,12 +216,37 @@ async def test_register_user(auth_service, mock_user_repository, mock_email_send
     mock_user_repository.create.return_value = fake_user
     result = await auth_service.register_user(user_create)
     assert result.email == user_create.email
-    mock_user_repository.get_by_email.assert_called_with(user_create.email)
-    mock_user_repository.create.assert_called_once()
+    mock_user_repository.get_by_email.assert_not_called()
+    mock_user_repository.create.assert_awaited_once()
     mock_email_sender.send_email.assert_awaited_once()
 
 
-def test_login_user(auth_service, mock_user_repository):
+@pytest.mark.asyncio
+async def test_register_user_conflict(auth_service, mock_user_repository, mock_email_sender, mock_cache):
+    mock_user_repository.create.side_effect = HTTPException(status_code=409, detail="Username already taken")
+
+    with pytest.raises(HTTPException) as exc_info:
+        await auth_service.register_user(UserCreate(username="user1", email="user1@test.com", password="pass"))
+
+    assert exc_info.value.status_code == 409
+    mock_email_sender.send_email.assert_not_called()
+    mock_cache.delete_many.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_register_user_clears_negative_cache_entries(auth_service, mock_user_repository, mock_cache):
+    mock_user_repository.get_by_email.return_value = None
+    mock_user_repository.create.return_value = FakeUser(
+        1, "user1", "user1@test.com", datetime.utcnow(), False, None, "pass", "hashed"
+    )
+
+    await auth_service.register_user(UserCreate(username="user1", email="user1@test.com", password="pass"))
+
+    mock_cache.delete_many.assert_awaited_once_with(["user:v2:user1", "missing-email:user1@test.com"])
+
+
+@pytest.mark.asyncio
+async def test_login_user(auth_service, mock_user_repository):
     fake_user = FakeUser(
         1,
         "user1",
@@ -186,13 +255,66 @@ def test_login_user(auth_service, mock_user_repository):
         False,
         None,
         "pass",
-        auth_service.hash_password("pass")
+        await auth_service.hash_password("pass")
     )
     mock_user_repository.get_by_username.return_value = fake_user
-    token_data = auth_service.login_user("user1", "pass")
+    token_data = await auth_service.login_user("user1", "pass")
     assert isinstance(token_data, Token)
     with pytest.raises(HTTPException):
-        auth_service.login_user("user1", "wrongpass")
+        await auth_service.login_user("user1", "wrongpass")
+
+
+@pytest.mark.asyncio
+async def test_login_user_reports_attempts_to_throttle(auth_service, mock_user_repository, mock_login_throttle):
+    mock_user_repository.get_by_username.return_value = FakeUser(
+        1, "user1", "user1@test.com", datetime.utcnow(), False, None, "pass", "hashed:pass"
+    )
+
+    await auth_service.login_user("user1", "pass", "10.0.0.1")
+    mock_login_throttle.check.assert_awaited_once_with("user1", "10.0.0.1")
+    mock_login_throttle.record_success.assert_awaited_once_with("user1")
+
+    with pytest.raises(HTTPException):
+        await auth_service.login_user("user1", "wrongpass", "10.0.0.1")
+    mock_login_throttle.record_failure.assert_awaited_once_with("user1", "10.0.0.1")
+
+
+@pytest.mark.asyncio
+async def test_login_user_blocked_before_password_check(auth_service, mock_user_repository, mock_login_throttle):
+    mock_login_throttle.check.side_effect = HTTPException(status_code=429)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await auth_service.login_user("user1", "pass", "10.0.0.1")
+
+    assert exc_info.value.status_code == 429
+    mock_user_repository.get_by_username.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_authenticate_user_ends_transaction_before_hashing(auth_service, mock_user_repository):
+    calls = []
+    mock_user_repository.get_by_username.return_value = FakeUser(
+        1, "user1", "user1@test.com", datetime.utcnow(), False, None, "testpass", "hashed"
+    )
+    mock_user_repository.end_transaction.side_effect = lambda: calls.append("end_transaction")
+    auth_service.password_hasher = AsyncMock()
+    auth_service.password_hasher.verify.side_effect = lambda *args: calls.append("verify") or True
+
+    assert await auth_service.authenticate_user("user1", "testpass") is not None
+
+    assert calls == ["end_transaction", "verify"]
+
+
+@pytest.mark.asyncio
+async def test_authenticate_unknown_user_still_verifies_a_password(auth_service, mock_user_repository):
+    mock_user_repository.get_by_username.return_value = None
+    auth_service.password_hasher = AsyncMock(wraps=FakePasswordHasher())
+
+    assert await auth_service.authenticate_user("ghost", "pass") is None
+    assert await auth_service.authenticate_user("ghost", "pass") is None
+
+    auth_service.password_hasher.hash.assert_awaited_once()
+    assert auth_service.password_hasher.verify.await_count == 2
 
 
 @pytest.mark.asyncio
@@ -209,15 +331,279 @@ async def test_get_current_user(auth_service, mock_user_repository, mock_cache):
         "hashed"
     )
     mock_user_repository.get_by_username.return_value = fake_user
-    mock_cache.get.return_value = None
+    mock_cache.get_object.return_value = None
     token = auth_service.create_access_token({"sub": username})
     result = await auth_service.get_current_user(token)
     assert result.username == username
     assert result.email == "user1@test.com"
-    mock_cache.set.assert_awaited()
+    mock_cache.set_object.assert_awaited()
+
+
+def test_get_token_claims_verifies_each_token_once(auth_service):
+    token = auth_service.create_access_token({"sub": "user1"})
+
+    with patch("services.auth_service.jwt.decode", wraps=jwt.decode) as decode:
+        first = auth_service.get_token_claims(token)
+        second = auth_service.get_token_claims(token)
+
+    assert first["sub"] == second["sub"] == "user1"
+    decode.assert_called_once()
+
+
+def test_get_token_claims_keeps_claims_on_request(auth_service):
+    token = auth_service.create_access_token({"sub": "user1"})
+    request = MagicMock()
+    request.state = SimpleNamespace()
+
+    claims = auth_service.get_token_claims(token, request)
+
+    assert request.state.token_claims is claims
+    assert auth_service.get_token_claims(token, request) is claims
+
+
+def test_get_token_claims_does_not_cache_invalid_tokens(auth_service):
+    token = auth_service.create_access_token({"sub": "user1"}, expires_delta=timedelta(seconds=-1))
+
+    for _ in range(2):
+        with pytest.raises(JWTError):
+            auth_service.get_token_claims(token)
+    assert auth_service.claims_cache.stats()["size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_login_user_embeds_token_version(auth_service, mock_user_repository, mock_token_versions):
+    mock_user_repository.get_by_username.return_value = FakeUser(
+        1, "user1", "user1@test.com", datetime.utcnow(), False, None, "pass", "hashed:pass"
+    )
+    mock_token_versions.get_version.return_value = 3
+
+    token = await auth_service.login_user("user1", "pass")
+
+    claims = jwt.decode(token.access_token, TEST_SECRET_KEY, algorithms=[TEST_ALGORITHM])
+    assert claims["ver"] == 3
+    assert "usr" not in claims
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_rejects_token_with_old_version(auth_service, mock_user_repository,
+                                                               mock_token_versions):
+    mock_user_repository.get_by_username.return_value = FakeUser(
+        1, "user1", "user1@test.com", datetime.utcnow(), False, None, "pass", "hashed"
+    )
+    mock_token_versions.get_version.return_value = 1
+    token = auth_service.create_access_token({"sub": "user1", "ver": 0})
+
+    with pytest.raises(HTTPException) as exc_info:
+        await auth_service.get_current_user(token)
+
+    assert exc_info.value.status_code == 401
+    mock_token_versions.get_version.assert_awaited_once_with(1)
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_rejects_revoked_token(auth_service, mock_user_repository, mock_token_revocations):
+    mock_token_revocations.is_revoked.return_value = True
+    token = auth_service.create_access_token({"sub": "user1", "jti": "revoked-jti"})
+
+    with pytest.raises(HTTPException) as exc_info:
+        await auth_service.get_current_user(token)
 
+    assert exc_info.value.status_code == 401
+    mock_token_revocations.is_revoked.assert_awaited_once_with("revoked-jti")
+    mock_user_repository.get_by_username.assert_not_called()
 
-def test_create_password_reset_token(auth_service, mock_user_repository):
+
+@pytest.mark.asyncio
+async def test_logout_revokes_token_until_it_expires(auth_service, mock_token_revocations):
+    token = auth_service.create_access_token({"sub": "user1"}, expires_delta=timedelta(minutes=5))
+    claims = jwt.decode(token, TEST_SECRET_KEY, algorithms=[TEST_ALGORITHM])
+
+    await auth_service.logout(token)
+
+    mock_token_revocations.revoke.assert_awaited_once_with(claims["jti"], claims["exp"])
+
+
+@pytest.mark.asyncio
+async def test_logout_invalid_token(auth_service, mock_token_revocations):
+    with pytest.raises(HTTPException) as exc_info:
+        await auth_service.logout("invalid-token")
+
+    assert exc_info.value.status_code == 401
+    mock_token_revocations.revoke.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_stateless_principal_needs_no_lookup(auth_service, mock_user_repository, mock_cache):
+    mock_user_repository.get_by_username.return_value = FakeUser(
+        1, "user1", "user1@test.com", datetime(2026, 1, 2, 3, 4, 5), True,
+        "https://res.cloudinary.com/demo/avatar.png", "pass", "hashed:pass"
+    )
+
+    with patch("services.auth_service.AUTH_STATELESS_PRINCIPAL", True):
+        token = await auth_service.login_user("user1", "pass")
+        mock_user_repository.get_by_username.reset_mock()
+        user = await auth_service.get_current_user(token.access_token)
+
+    assert user.id == 1
+    assert user.email_confirmed is True
+    assert user.created_at == datetime(2026, 1, 2, 3, 4, 5)
+    assert str(user.avatar_url) == "https://res.cloudinary.com/demo/avatar.png"
+    mock_user_repository.get_by_username.assert_not_awaited()
+    mock_cache.get_object.assert_not_awaited()
+
+
+def cached_user_entry(username, expires_in, delta=0.01):
+    user = {
+        "id": 1,
+        "username": username,
+        "email": f"{username}@test.com",
+        "created_at": datetime.utcnow().isoformat(),
+        "email_confirmed": False,
+        "avatar_url": None,
+    }
+    return {"user": user, "delta": delta, "expires_at": time.time() + expires_in}
+
+
+def test_user_from_cache_restores_field_types():
+    user = UserOut(
+        id=1,
+        username="user1",
+        email="user1@test.com",
+        created_at=datetime(2026, 1, 2, 3, 4, 5),
+        email_confirmed=True,
+        avatar_url="https://res.cloudinary.com/demo/avatar.png",
+    )
+
+    restored = user_from_cache(user.model_dump(mode="json"))
+
+    assert restored == user
+    assert restored.model_dump_json() == user.model_dump_json()
+
+
+def test_user_from_cache_validates_entries_with_other_fields():
+    with pytest.raises(ValueError):
+        user_from_cache({"id": 1, "username": "user1"})
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_from_cache(auth_service, mock_user_repository, mock_cache):
+    mock_cache.get_object.return_value = cached_user_entry("user1", expires_in=1800)
+    token = auth_service.create_access_token({"sub": "user1"})
+
+    result = await auth_service.get_current_user(token)
+
+    assert result.username == "user1"
+    mock_user_repository.get_by_username.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_ignores_entries_cached_before_early_refresh(
+        auth_service, mock_user_repository, mock_cache):
+    old_entries = {"user:user1": cached_user_entry("user1", expires_in=1800)["user"]}
+    mock_cache.get_object.side_effect = lambda key: old_entries.get(key)
+    mock_user_repository.get_by_username.return_value = FakeUser(
+        1, "user1", "user1@test.com", datetime.utcnow(), False, None, "pass", "hashed"
+    )
+    token = auth_service.create_access_token({"sub": "user1"})
+
+    result = await auth_service.get_current_user(token)
+
+    assert result.username == "user1"
+    mock_user_repository.get_by_username.assert_awaited_once_with("user1")
+    assert mock_cache.set_object.await_args.args[0] == "user:v2:user1"
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_caches_unknown_subject(auth_service, mock_user_repository, mock_cache):
+    mock_user_repository.get_by_username.return_value = None
+    token = auth_service.create_access_token({"sub": "deleted"})
+
+    with pytest.raises(HTTPException) as exc_info:
+        await auth_service.get_current_user(token)
+
+    assert exc_info.value.status_code == 401
+    mock_cache.set_object.assert_awaited_once_with("user:v2:deleted", {"missing": True}, 60)
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_skips_database_for_cached_unknown_subject(
+        auth_service, mock_user_repository, mock_cache):
+    mock_cache.get_object.return_value = {"missing": True}
+    token = auth_service.create_access_token({"sub": "deleted"})
+
+    with pytest.raises(HTTPException) as exc_info:
+        await auth_service.get_current_user(token)
+
+    assert exc_info.value.status_code == 401
+    mock_user_repository.get_by_username.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_refreshes_entry_close_to_expiry(auth_service, mock_user_repository, mock_cache):
+    mock_user_repository.get_by_username.return_value = FakeUser(
+        1, "user1", "user1@test.com", datetime.utcnow(), True, None, "pass", "hashed"
+    )
+    mock_cache.get_object.return_value = cached_user_entry("user1", expires_in=0.5, delta=0.1)
+    token = auth_service.create_access_token({"sub": "user1"})
+
+    with patch("services.auth_service.random.random", return_value=0.999):
+        result = await auth_service.get_current_user(token)
+
+    assert result.email_confirmed
+    mock_user_repository.get_by_username.assert_awaited_once_with("user1")
+    mock_cache.set_object.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_cache_misses_load_user_once(auth_service, mock_user_repository, mock_cache):
+    async def slow_get_by_username(username):
+        await asyncio.sleep(0.01)
+        return FakeUser(1, username, "user1@test.com", datetime.utcnow(), False, None, "pass", "hashed")
+    mock_user_repository.get_by_username.side_effect = slow_get_by_username
+    mock_cache.get_object.return_value = None
+    token = auth_service.create_access_token({"sub": "user1"})
+
+    results = await asyncio.gather(*(auth_service.get_current_user(token) for _ in range(50)))
+
+    assert {result.username for result in results} == {"user1"}
+    mock_user_repository.get_by_username.assert_awaited_once()
+    mock_cache.set_object.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_waits_for_other_process_holding_lock(
+        auth_service, mock_user_repository, mock_cache):
+    mock_cache.get_object.side_effect = [None, None, cached_user_entry("user1", expires_in=1800)]
+    mock_cache.set_if_absent.return_value = False
+    token = auth_service.create_access_token({"sub": "user1"})
+
+    with patch("services.auth_service.USER_CACHE_LOCK_ENABLED", True), \
+            patch("services.auth_service.USER_CACHE_LOCK_POLL_INTERVAL", 0):
+        result = await auth_service.get_current_user(token)
+
+    assert result.username == "user1"
+    mock_cache.set_if_absent.assert_awaited_once_with("lock:user:v2:user1", "1", 5)
+    mock_user_repository.get_by_username.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_releases_lock_after_load(auth_service, mock_user_repository, mock_cache):
+    mock_user_repository.get_by_username.return_value = FakeUser(
+        1, "user1", "user1@test.com", datetime.utcnow(), False, None, "pass", "hashed"
+    )
+    mock_cache.get_object.return_value = None
+    mock_cache.set_if_absent.return_value = True
+    token = auth_service.create_access_token({"sub": "user1"})
+
+    with patch("services.auth_service.USER_CACHE_LOCK_ENABLED", True):
+        await auth_service.get_current_user(token)
+
+    mock_cache.set_object.assert_awaited_once()
+    mock_cache.delete.assert_awaited_once_with("lock:user:v2:user1")
+
+
+@pytest.mark.asyncio
+async def test_create_password_reset_token(auth_service, mock_user_repository):
     fake_user = FakeUser(
         1,
         "user1",
@@ -229,12 +615,36 @@ def test_create_password_reset_token(auth_service, mock_user_repository):
         "hashed"
     )
     mock_user_repository.get_by_email.return_value = fake_user
-    token = auth_service.create_password_reset_token("user1@test.com")
+    token = await auth_service.create_password_reset_token("user1@test.com")
     decoded = jwt.decode(token, TEST_SECRET_KEY, algorithms=[TEST_ALGORITHM])
     assert decoded["sub"] == "user1@test.com"
 
 
-def test_reset_password(auth_service, mock_user_repository):
+@pytest.mark.asyncio
+async def test_create_password_reset_token_caches_unknown_email(auth_service, mock_user_repository, mock_cache):
+    mock_user_repository.get_by_email.return_value = None
+
+    with pytest.raises(HTTPException) as exc_info:
+        await auth_service.create_password_reset_token("ghost@test.com")
+
+    assert exc_info.value.status_code == 404
+    mock_cache.set.assert_awaited_once_with("missing-email:ghost@test.com", "1", 60)
+
+
+@pytest.mark.asyncio
+async def test_create_password_reset_token_skips_database_for_cached_unknown_email(
+        auth_service, mock_user_repository, mock_cache):
+    mock_cache.get.return_value = "1"
+
+    with pytest.raises(HTTPException) as exc_info:
+        await auth_service.create_password_reset_token("ghost@test.com")
+
+    assert exc_info.value.status_code == 404
+    mock_user_repository.get_by_email.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_reset_password(auth_service, mock_user_repository, mock_cache, mock_token_versions):
     fake_user = FakeUser(
         1,
         "user1",
@@ -246,12 +656,20 @@ def test_reset_password(auth_service, mock_user_repository):
         "hashed"
     )
     mock_user_repository.get_by_email.return_value = fake_user
-    token = auth_service.create_password_reset_token("user1@test.com")
-    auth_service.reset_password(token, "newpass")
-    mock_user_repository.update_password.assert_called_once()
+    token = await auth_service.create_password_reset_token("user1@test.com")
+    await auth_service.reset_password(token, "newpass")
+    mock_user_repository.end_transaction.assert_awaited_once()
+    mock_user_repository.update_password.assert_awaited_once()
+    mock_cache.delete.assert_awaited_once_with("user:v2:user1")
+    mock_token_versions.bump.assert_awaited_once_with(1)
 
 
 @pytest.mark.asyncio
 async def test_send_password_reset_email(auth_service, mock_email_sender):
     await auth_service.send_password_reset_email("user1@test.com", "resettoken")
     mock_email_sender.send_email.assert_awaited_once()
+    subject, recipients, body, html = mock_email_sender.send_email.await_args.args
+    assert subject == "Password Reset Request"
+    assert recipients == ["user1@test.com"]
+    assert "/auth/password-reset/confirm?token=resettoken" in body
+    assert "/auth/password-reset/confirm?token=resettoken" in html
@@ -1,23 +1,31 @@
 from datetime import date
-from unittest.mock import Mock
+from unittest.mock import AsyncMock
 
 import pytest
+from fastapi import HTTPException
 
-from schemas.contacts import ContactCreate, ContactUpdate, ContactOut
+from schemas.contacts import (ContactCreate, ContactUpdate, ContactOut, ContactSortKey, ContactExportFormat,
+                              ContactImportFormat)
 from services.contact_service import ContactService
 
 
 @pytest.fixture
 def mock_repository():
-    return Mock()
+    return AsyncMock()
 
 
 @pytest.fixture
-def contact_service(mock_repository):
-    return ContactService(repository=mock_repository)
+def mock_cache():
+    return AsyncMock()
 
 
-def test_get_user_contacts(contact_service, mock_repository):
+@pytest.fixture
+def contact_service(mock_repository, mock_cache):
+    return ContactService(repository=mock_repository, cache=mock_cache)
+
+
+@pytest.mark.asyncio
+async def test_get_user_contacts(contact_service, mock_repository):
     user_id = 1
     expected_contacts = [
         ContactOut(
@@ -37,13 +45,55 @@ def test_get_user_contacts(contact_service, mock_repository):
             birthday=date(1992, 6, 15)
         )
     ]
-    mock_repository.get_all_by_user.return_value = expected_contacts
-    result = contact_service.get_user_contacts(user_id)
+    mock_repository.get_page_by_user.return_value = expected_contacts
+    result, next_cursor = await contact_service.get_user_contacts(user_id)
     assert result == expected_contacts
-    mock_repository.get_all_by_user.assert_called_once_with(user_id)
+    assert next_cursor is None
+    mock_repository.get_page_by_user.assert_awaited_once_with(user_id, 51, "id", None)
 
 
-def test_get_user_contact(contact_service, mock_repository):
+@pytest.mark.asyncio
+async def test_get_user_contacts_next_page(contact_service, mock_repository):
+    user_id = 1
+    page = [
+        ContactOut(id=1, first_name="John", last_name="Doe", email="john@doe.com",
+                   phone_number="123456789", birthday=date(1990, 1, 1)),
+        ContactOut(id=2, first_name="Jane", last_name="Smith", email="jane@smith.com",
+                   phone_number="987654321", birthday=date(1992, 6, 15)),
+    ]
+    mock_repository.get_page_by_user.return_value = page
+    result, next_cursor = await contact_service.get_user_contacts(user_id, limit=1, sort_by=ContactSortKey.birthday)
+    assert result == page[:1]
+    assert next_cursor is not None
+    mock_repository.get_page_by_user.assert_awaited_once_with(user_id, 2, "birthday", None)
+
+    mock_repository.get_page_by_user.reset_mock()
+    mock_repository.get_page_by_user.return_value = page[1:]
+    result, next_cursor = await contact_service.get_user_contacts(
+        user_id, limit=1, sort_by=ContactSortKey.birthday, cursor=next_cursor
+    )
+    assert result == page[1:]
+    assert next_cursor is None
+    mock_repository.get_page_by_user.assert_awaited_once_with(user_id, 2, "birthday", (date(1990, 1, 1), 1))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sort_by, cursor", [
+    (ContactSortKey.last_name, "not-a-cursor"),
+    (ContactSortKey.last_name, "WyJpZCIsMSwxXQ"),
+    (ContactSortKey.last_name, "WyJsYXN0X25hbWUiLDUsMV0"),
+    (ContactSortKey.last_name, "WyJsYXN0X25hbWUiLHsiYSI6MX0sMV0"),
+    (ContactSortKey.id, "WyJpZCIsIjEiLDFd"),
+])
+async def test_get_user_contacts_invalid_cursor(contact_service, mock_repository, sort_by, cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        await contact_service.get_user_contacts(1, sort_by=sort_by, cursor=cursor)
+    assert exc_info.value.status_code == 400
+    mock_repository.get_page_by_user.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_get_user_contact(contact_service, mock_repository):
     user_id = 1
     contact_id = 2
     expected_contact = ContactOut(
@@ -55,12 +105,13 @@ def test_get_user_contact(contact_service, mock_repository):
         birthday=date(1992, 6, 15)
     )
     mock_repository.get_by_id_and_user.return_value = expected_contact
-    result = contact_service.get_user_contact(contact_id, user_id)
+    result = await contact_service.get_user_contact(contact_id, user_id)
     assert result == expected_contact
-    mock_repository.get_by_id_and_user.assert_called_once_with(contact_id, user_id)
+    mock_repository.get_by_id_and_user.assert_awaited_once_with(contact_id, user_id)
 
 
-def test_create_contact(contact_service, mock_repository):
+@pytest.mark.asyncio
+async def test_create_contact(contact_service, mock_repository, mock_cache):
     user_id = 1
     new_contact = ContactCreate(
         first_name="Alice",
@@ -78,12 +129,14 @@ def test_create_contact(contact_service, mock_repository):
         birthday=date(1995, 3, 20)
     )
     mock_repository.create_for_user.return_value = expected_created_contact
-    result = contact_service.create_contact(new_contact, user_id)
+    result = await contact_service.create_contact(new_contact, user_id)
     assert result == expected_created_contact
-    mock_repository.create_for_user.assert_called_once_with(new_contact, user_id)
+    mock_repository.create_for_user.assert_awaited_once_with(new_contact, user_id)
+    mock_cache.delete_many.assert_awaited_once_with([f"contacts:version:{user_id}"])
 
 
-def test_update_user_contact(contact_service, mock_repository):
+@pytest.mark.asyncio
+async def test_update_user_contact(contact_service, mock_repository, mock_cache):
     user_id = 1
     contact_id = 2
     update_data = ContactUpdate(last_name="Doe2")
@@ -96,21 +149,30 @@ def test_update_user_contact(contact_service, mock_repository):
         birthday=date(1992, 6, 15)
     )
     mock_repository.update_for_user.return_value = updated_contact
-    result = contact_service.update_user_contact(contact_id, update_data, user_id)
+    result = await contact_service.update_user_contact(contact_id, update_data, user_id)
     assert result == updated_contact
-    mock_repository.update_for_user.assert_called_once_with(contact_id, update_data, user_id)
+    mock_repository.update_for_user.assert_awaited_once_with(contact_id, update_data, user_id)
+    mock_cache.delete_many.assert_awaited_once_with(
+        [f"contacts:version:{user_id}", f"contact:version:{user_id}:{contact_id}"]
+    )
+    key, _, ttl = mock_cache.set.await_args.args
+    assert key == f"contact:version:{user_id}:{contact_id}"
+    assert ttl > 0
 
 
-def test_delete_user_contact(contact_service, mock_repository):
+@pytest.mark.asyncio
+async def test_delete_user_contact(contact_service, mock_repository, mock_cache):
     user_id = 1
     contact_id = 2
     mock_repository.delete_for_user.return_value = True
-    result = contact_service.delete_user_contact(contact_id, user_id)
+    result = await contact_service.delete_user_contact(contact_id, user_id)
     assert result is True
-    mock_repository.delete_for_user.assert_called_once_with(contact_id, user_id)
+    mock_repository.delete_for_user.assert_awaited_once_with(contact_id, user_id)
+    mock_cache.delete_many.assert_awaited_once()
 
 
-def test_search_user_contacts(contact_service, mock_repository):
+@pytest.mark.asyncio
+async def test_search_user_contacts(contact_service, mock_repository):
     user_id = 1
     first_name = "Jane"
     last_name = None
@@ -126,12 +188,24 @@ def test_search_user_contacts(contact_service, mock_repository):
         )
     ]
     mock_repository.search_by_user.return_value = expected_result
-    result = contact_service.search_user_contacts(user_id, first_name=first_name, last_name=last_name, email=email)
+    result = await contact_service.search_user_contacts(user_id, first_name=first_name, last_name=last_name, email=email)
     assert result == expected_result
-    mock_repository.search_by_user.assert_called_once_with(user_id, first_name, last_name, email)
+    mock_repository.search_by_user.assert_awaited_once_with(user_id, first_name, last_name, email, 50)
 
 
-def test_get_upcoming_birthdays(contact_service, mock_repository):
+@pytest.mark.asyncio
+async def test_rank_user_contacts(contact_service, mock_repository):
+    expected_result = [ContactOut(id=3, first_name="John", last_name="Doe", email="john@doe.com",
+                                  phone_number="123456789", birthday=date(1990, 1, 1))]
+    mock_repository.search_ranked_by_user.return_value = expected_result
+
+    result = await contact_service.rank_user_contacts(1, "  jhon ", 10)
+    assert result == expected_result
+    mock_repository.search_ranked_by_user.assert_awaited_once_with(1, "jhon", 10)
+
+
+@pytest.mark.asyncio
+async def test_get_upcoming_birthdays(contact_service, mock_repository):
     user_id = 1
     expected_result = [
         ContactOut(
@@ -144,6 +218,148 @@ def test_get_upcoming_birthdays(contact_service, mock_repository):
         )
     ]
     mock_repository.get_upcoming_birthdays_by_user.return_value = expected_result
-    result = contact_service.get_upcoming_birthdays(user_id)
+    result = await contact_service.get_upcoming_birthdays(user_id, 30)
     assert result == expected_result
-    mock_repository.get_upcoming_birthdays_by_user.assert_called_once_with(user_id)
+    mock_repository.get_upcoming_birthdays_by_user.assert_awaited_once_with(user_id, 30)
+
+
+def _stream(*batches):
+    async def stream_by_user(user_id, batch_size=1000):
+        for batch in batches:
+            yield batch
+    return stream_by_user
+
+
+@pytest.mark.asyncio
+async def test_export_user_contacts_ndjson(contact_service, mock_repository):
+    mock_repository.stream_by_user = _stream(
+        [ContactOut(id=1, first_name="John", last_name="Doe", email="john@doe.com",
+                    phone_number="123456789", birthday=date(1990, 1, 1))],
+        [ContactOut(id=2, first_name="Jane", last_name="Smith", email="jane@smith.com",
+                    phone_number="987654321", birthday=date(1992, 6, 15), additional_data="Friend")],
+    )
+
+    chunks = [chunk async for chunk in contact_service.export_user_contacts(1, ContactExportFormat.ndjson)]
+
+    assert len(chunks) == 2
+    lines = "".join(chunks).splitlines()
+    assert [ContactOut.model_validate_json(line).id for line in lines] == [1, 2]
+    assert ContactOut.model_validate_json(lines[1]).additional_data == "Friend"
+
+
+@pytest.mark.asyncio
+async def test_export_user_contacts_csv(contact_service, mock_repository):
+    mock_repository.stream_by_user = _stream(
+        [ContactOut(id=1, first_name="John", last_name="Doe, Jr.", email="john@doe.com",
+                    phone_number="123456789", birthday=date(1990, 1, 1))],
+    )
+
+    chunks = [chunk async for chunk in contact_service.export_user_contacts(1, ContactExportFormat.csv)]
+
+    assert chunks[0] == "id,first_name,last_name,email,phone_number,birthday,additional_data\r\n"
+    assert chunks[1] == '1,John,"Doe, Jr.",john@doe.com,123456789,1990-01-01,\r\n'
+
+
+async def _chunks(data: bytes, size: int = 7):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+@pytest.mark.asyncio
+async def test_import_user_contacts_ndjson(contact_service, mock_repository):
+    mock_repository.create_many_for_user.side_effect = lambda contacts, user_id: (
+        [None, "email"] if len(contacts) == 2 else [None]
+    )
+    data = (
+        '{"first_name": "John", "last_name": "Doe", "email": "john@doe.com", '
+        '"phone_number": "1", "birthday": "1990-01-01"}\n'
+        '{"first_name": "Jane", "last_name": "Doe", "email": "not-an-email", '
+        '"phone_number": "2", "birthday": "1990-01-01"}\n'
+        '\n'
+        '{"first_name": "Jake", "last_name": "Doe", "email": "jake@doe.com", '
+        '"phone_number": "3", "birthday": "1990-01-01"}\n'
+        '{broken\n'
+        '{"first_name": "Józef", "last_name": "Doe", "email": "jozef@doe.com", '
+        '"phone_number": "4", "birthday": "1990-01-01"}'
+    ).encode()
+
+    result = await contact_service.import_user_contacts(1, _chunks(data), ContactImportFormat.ndjson, batch_size=2)
+
+    assert result.imported == 2
+    assert [error.row for error in result.errors] == [2, 3, 4]
+    assert result.errors[0].detail.startswith("email:")
+    assert result.errors[1].detail == "Contact with this email already exists"
+    assert "Invalid JSON" in result.errors[2].detail
+    first_batch, second_batch = [call.args[0] for call in mock_repository.create_many_for_user.call_args_list]
+    assert [contact.first_name for contact in first_batch] == ["John", "Jake"]
+    assert [contact.first_name for contact in second_batch] == ["Józef"]
+
+
+@pytest.mark.asyncio
+async def test_import_user_contacts_csv(contact_service, mock_repository):
+    mock_repository.create_many_for_user.side_effect = lambda contacts, user_id: [None] * len(contacts)
+    data = (
+        "\ufeffid,first_name,last_name,email,phone_number,birthday,additional_data\r\n"
+        '1,John,"Doe, Jr.",john@doe.com,1,1990-01-01,"line one\r\nline two"\r\n'
+        "2,Jane,Doe,jane@doe.com,2,,\r\n"
+    ).encode()
+
+    result = await contact_service.import_user_contacts(1, _chunks(data), ContactImportFormat.csv)
+
+    assert result.imported == 1
+    assert [(error.row, error.detail.split(":")[0]) for error in result.errors] == [(2, "birthday")]
+    (contact,) = mock_repository.create_many_for_user.call_args.args[0]
+    assert contact.last_name == "Doe, Jr."
+    assert contact.additional_data == "line one\nline two"
+
+
+@pytest.mark.asyncio
+async def test_delete_user_contact_not_found_keeps_versions(contact_service, mock_repository, mock_cache):
+    mock_repository.delete_for_user.return_value = None
+
+    assert await contact_service.delete_user_contact(999, 1) is None
+    mock_cache.delete_many.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_get_contacts_etag_reuses_stored_version(contact_service, mock_cache):
+    mock_cache.get.return_value = "v1"
+
+    etag = await contact_service.get_contacts_etag(1, "limit=10")
+
+    assert etag == await contact_service.get_contacts_etag(1, "limit=10")
+    assert etag != await contact_service.get_contacts_etag(1, "limit=20")
+    assert etag.startswith('"') and etag.endswith('"')
+    mock_cache.get.assert_awaited_with("contacts:version:1")
+    mock_cache.set.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_get_contact_etag_follows_list_version_until_updated(contact_service, mock_cache):
+    mock_cache.get_many.return_value = [None, "list-v1"]
+
+    etag = await contact_service.get_contact_etag(1, 5)
+
+    mock_cache.get_many.assert_awaited_once_with(["contact:version:1:5", "contacts:version:1"])
+    assert etag == contact_service._make_etag("list-v1", "5")
+    assert etag != await contact_service.get_contact_etag(1, 6)
+    mock_cache.set.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_get_contact_etag_uses_contact_version(contact_service, mock_cache):
+    mock_cache.get_many.return_value = ["contact-v1", "list-v1"]
+
+    assert await contact_service.get_contact_etag(1, 5) == contact_service._make_etag("contact-v1", "5")
+
+
+@pytest.mark.asyncio
+async def test_get_contact_etag_only_starts_list_version(contact_service, mock_cache):
+    mock_cache.get_many.return_value = [None, None]
+    mock_cache.get.return_value = None
+
+    etag = await contact_service.get_contact_etag(1, 999)
+
+    key, version, ttl = mock_cache.set.await_args.args
+    assert key == "contacts:version:1"
+    assert etag == contact_service._make_etag(version, "999")
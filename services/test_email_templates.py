@@ -0,0 +1,46 @@
+import pytest
+
+from services.email_templates import EmailTemplates
+
+
+@pytest.fixture(scope="module")
+def email_templates():
+    return EmailTemplates()
+
+
+def test_templates_are_compiled_once(email_templates):
+    assert email_templates.names == ["confirmation", "password_reset"]
+
+
+def test_render_confirmation(email_templates):
+    email = email_templates.render(
+        "confirmation", ["user1@test.com"], username="user1", url="https://example.com/auth/confirm/token"
+    )
+
+    assert email.subject == "Confirm your email"
+    assert email.recipients == ["user1@test.com"]
+    assert email.body.startswith("Hello user1,\n")
+    assert "https://example.com/auth/confirm/token" in email.body
+    assert '<a href="https://example.com/auth/confirm/token">' in email.html
+
+
+def test_render_escapes_html_only(email_templates):
+    email = email_templates.render("confirmation", ["user1@test.com"], username="<b>user1</b>", url="https://x")
+
+    assert "Hello <b>user1</b>," in email.body
+    assert "&lt;b&gt;user1&lt;/b&gt;" in email.html
+
+
+def test_render_fails_on_missing_value(email_templates):
+    with pytest.raises(NameError):
+        email_templates.render("confirmation", ["user1@test.com"], url="https://x")
+
+
+def test_render_many(email_templates):
+    emails = email_templates.render_many("password_reset", [
+        (["user1@test.com"], {"url": "https://x/1"}),
+        (["user2@test.com"], {"url": "https://x/2"}),
+    ])
+
+    assert [email.recipients for email in emails] == [["user1@test.com"], ["user2@test.com"]]
+    assert "https://x/2" in emails[1].body
@@ -0,0 +1,105 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+
+from services.login_throttle import LoginThrottle
+
+
+class FakeCache:
+    def __init__(self):
+        self.values = {}
+        self.ttls = {}
+
+    async def get_many(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    async def set(self, key, value, ttl):
+        self.values[key] = value
+        self.ttls[key] = ttl
+
+    async def incr(self, key, ttl):
+        self.values[key] = self.values.get(key, 0) + 1
+        self.ttls[key] = ttl
+        return self.values[key]
+
+    async def delete_many(self, keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+
+@pytest.fixture(autouse=True)
+def patch_throttle_constants():
+    with patch("services.login_throttle.LOGIN_MAX_FAILURES_PER_USERNAME", 3), \
+            patch("services.login_throttle.LOGIN_MAX_FAILURES_PER_IP", 5), \
+            patch("services.login_throttle.LOGIN_BACKOFF_BASE_SECONDS", 1), \
+            patch("services.login_throttle.LOGIN_BACKOFF_MAX_SECONDS", 60), \
+            patch("services.login_throttle.time.time", return_value=1000.0):
+        yield
+
+
+@pytest.fixture
+def cache():
+    return FakeCache()
+
+
+@pytest.fixture
+def throttle(cache):
+    return LoginThrottle(cache)
+
+
+@pytest.mark.asyncio
+async def test_allows_attempts_below_limit(throttle):
+    for _ in range(2):
+        await throttle.record_failure("user1", "10.0.0.1")
+
+    await throttle.check("user1", "10.0.0.1")
+
+
+@pytest.mark.asyncio
+async def test_blocks_username_with_exponential_backoff(throttle, cache):
+    for _ in range(3):
+        await throttle.record_failure("user1", "10.0.0.1")
+
+    with pytest.raises(HTTPException) as exc_info:
+        await throttle.check("user1", "10.0.0.2")
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers == {"Retry-After": "1"}
+
+    for _ in range(3):
+        await throttle.record_failure("user1", "10.0.0.1")
+    assert cache.ttls["login:blocked:user:user1"] == 8
+
+    for _ in range(10):
+        await throttle.record_failure("user1", "10.0.0.1")
+    assert cache.ttls["login:blocked:user:user1"] == 60
+
+
+@pytest.mark.asyncio
+async def test_blocks_ip_across_usernames(throttle):
+    for index in range(5):
+        await throttle.record_failure(f"user{index}", "10.0.0.1")
+
+    with pytest.raises(HTTPException):
+        await throttle.check("someone-else", "10.0.0.1")
+    await throttle.check("someone-else", "10.0.0.2")
+
+
+@pytest.mark.asyncio
+async def test_block_expires(throttle):
+    for _ in range(3):
+        await throttle.record_failure("user1")
+
+    with patch("services.login_throttle.time.time", return_value=1001.5):
+        await throttle.check("user1")
+
+
+@pytest.mark.asyncio
+async def test_success_resets_username_but_not_ip(throttle, cache):
+    for _ in range(3):
+        await throttle.record_failure("user1", "10.0.0.1")
+
+    await throttle.record_success("user1")
+
+    await throttle.check("user1")
+    assert cache.values["login:failures:ip:10.0.0.1"] == 3
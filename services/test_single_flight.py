@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_load():
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "value"
+
+    tasks = [asyncio.create_task(flight.do("key", loader)) for _ in range(10)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*tasks) == ["value"] * 10
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_failure_is_shared_and_key_is_released():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def failing_loader():
+        await release.wait()
+        raise ValueError("boom")
+
+    tasks = [asyncio.create_task(flight.do("key", failing_loader)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+    async def loader():
+        return "value"
+    assert await flight.do("key", loader) == "value"
+
+
+@pytest.mark.asyncio
+async def test_waiter_reloads_when_leader_is_cancelled():
+    flight = SingleFlight()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.Event().wait()
+        return "value"
+
+    leader = asyncio.create_task(flight.do("key", loader))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.do("key", loader))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await waiter == "value"
+    assert calls == 2
+    with pytest.raises(asyncio.CancelledError):
+        await leader
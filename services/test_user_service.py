@@ -1,8 +1,9 @@
+import threading
 from datetime import datetime
-from unittest.mock import Mock, MagicMock
+from unittest.mock import AsyncMock, Mock, MagicMock
 
 import pytest
-from fastapi import HTTPException, UploadFile
+from fastapi import BackgroundTasks, HTTPException, UploadFile
 
 from schemas.users import UserOut
 from services.user_service import UserService
@@ -34,7 +35,7 @@ class FakeUser:
 
 @pytest.fixture
 def mock_user_repository():
-    return Mock()
+    return AsyncMock()
 
 
 @pytest.fixture
@@ -43,19 +44,26 @@ def mock_image_storage():
 
 
 @pytest.fixture
-def user_service(mock_user_repository, mock_image_storage):
-    return UserService(mock_user_repository, mock_image_storage)
+def mock_cache():
+    return AsyncMock()
+
+
+@pytest.fixture
+def user_service(mock_user_repository, mock_image_storage, mock_cache):
+    return UserService(mock_user_repository, mock_image_storage, mock_cache)
 
 
-def test_change_avatar_user_not_found(user_service, mock_user_repository):
+@pytest.mark.asyncio
+async def test_change_avatar_user_not_found(user_service, mock_user_repository):
     mock_user_repository.get_by_id.return_value = None
     mock_file = MagicMock(spec=UploadFile)
     mock_file.file = MagicMock()
-    result = user_service.change_avatar(99, mock_file)
+    result = await user_service.change_avatar(99, mock_file)
     assert result is None
 
 
-def test_change_avatar_not_admin(user_service, mock_user_repository):
+@pytest.mark.asyncio
+async def test_change_avatar_not_admin(user_service, mock_user_repository):
     fake_user = FakeUser(
         id=1,
         username="testuser",
@@ -69,11 +77,12 @@ def test_change_avatar_not_admin(user_service, mock_user_repository):
     mock_file.file = MagicMock()
     mock_user_repository.get_by_id.return_value = fake_user
     with pytest.raises(HTTPException) as exc_info:
-        user_service.change_avatar(fake_user.id, mock_file)
+        await user_service.change_avatar(fake_user.id, mock_file)
     assert exc_info.value.status_code == 403
 
 
-def test_change_avatar_existing_avatar(user_service, mock_user_repository, mock_image_storage):
+@pytest.mark.asyncio
+async def test_change_avatar_existing_avatar(user_service, mock_user_repository, mock_image_storage, mock_cache):
     fake_user = FakeUser(
         id=1,
         username="adminuser",
@@ -97,17 +106,19 @@ def test_change_avatar_existing_avatar(user_service, mock_user_repository, mock_
         role="admin"
     )
     mock_user_repository.update_avatar.return_value = updated_user
-    result = user_service.change_avatar(fake_user.id, mock_file)
+    result = await user_service.change_avatar(fake_user.id, mock_file)
     mock_image_storage.delete_image.assert_called_once_with("folder/oldimage")
     mock_image_storage.upload_image.assert_called_once_with(mock_file.file, options={"folder": "user_avatars"})
-    mock_user_repository.update_avatar.assert_called_once_with(
+    mock_user_repository.update_avatar.assert_awaited_once_with(
         fake_user.id, "https://example.com/images/folder/newimage.jpg"
     )
+    mock_cache.delete.assert_awaited_once_with("user:v2:adminuser")
     assert isinstance(result, UserOut)
     assert str(result.avatar_url) == "https://example.com/images/folder/newimage.jpg"
 
 
-def test_change_avatar_no_existing_avatar(user_service, mock_user_repository, mock_image_storage):
+@pytest.mark.asyncio
+async def test_change_avatar_no_existing_avatar(user_service, mock_user_repository, mock_image_storage):
     fake_user = FakeUser(
         id=2,
         username="adminuser2",
@@ -131,16 +142,168 @@ def test_change_avatar_no_existing_avatar(user_service, mock_user_repository, mo
         role="admin"
     )
     mock_user_repository.update_avatar.return_value = updated_user
-    result = user_service.change_avatar(fake_user.id, mock_file)
+    result = await user_service.change_avatar(fake_user.id, mock_file)
     mock_image_storage.delete_image.assert_not_called()
     mock_image_storage.upload_image.assert_called_once_with(mock_file.file, options={"folder": "user_avatars"})
-    mock_user_repository.update_avatar.assert_called_once_with(
+    mock_user_repository.update_avatar.assert_awaited_once_with(
         fake_user.id, "https://example.com/images/folder/newavatar.jpg"
     )
     assert isinstance(result, UserOut)
     assert str(result.avatar_url) == "https://example.com/images/folder/newavatar.jpg"
 
 
+@pytest.mark.asyncio
+async def test_change_avatar_deletes_old_avatar_in_background(user_service, mock_user_repository, mock_image_storage):
+    fake_user = FakeUser(
+        id=1,
+        username="adminuser",
+        email="admin@user.com",
+        created_at=datetime.utcnow(),
+        email_confirmed=True,
+        avatar_url="https://example.com/images/folder/oldimage.jpg",
+        role="admin"
+    )
+    mock_file = MagicMock(spec=UploadFile)
+    mock_file.file = MagicMock()
+    mock_user_repository.get_by_id.return_value = fake_user
+    upload_threads = []
+
+    def upload_image(file, options=None):
+        upload_threads.append(threading.current_thread())
+        return {"secure_url": "https://example.com/images/folder/newimage.jpg"}
+
+    mock_image_storage.upload_image.side_effect = upload_image
+    mock_user_repository.update_avatar.return_value = FakeUser(
+        id=1,
+        username="adminuser",
+        email="admin@user.com",
+        created_at=datetime.utcnow(),
+        email_confirmed=True,
+        avatar_url="https://example.com/images/folder/newimage.jpg",
+        role="admin"
+    )
+    background_tasks = BackgroundTasks()
+
+    result = await user_service.change_avatar(fake_user.id, mock_file, background_tasks)
+
+    assert str(result.avatar_url) == "https://example.com/images/folder/newimage.jpg"
+    assert upload_threads and upload_threads[0] is not threading.main_thread()
+    mock_image_storage.delete_image.assert_not_called()
+
+    await background_tasks()
+    mock_image_storage.delete_image.assert_called_once_with("folder/oldimage")
+
+
+@pytest.mark.asyncio
+async def test_change_avatar_deletes_old_avatar_when_update_changes_same_user(
+        user_service, mock_user_repository, mock_image_storage):
+    user = FakeUser(
+        id=1,
+        username="adminuser",
+        email="admin@user.com",
+        created_at=datetime.utcnow(),
+        email_confirmed=True,
+        avatar_url="https://example.com/images/folder/oldimage.jpg",
+        role="admin"
+    )
+    mock_file = MagicMock(spec=UploadFile)
+    mock_file.file = MagicMock()
+    mock_user_repository.get_by_id.return_value = user
+    mock_image_storage.upload_image.return_value = {"secure_url": "https://example.com/images/folder/newimage.jpg"}
+
+    async def update_avatar(user_id, avatar_url):
+        # Like the session's identity map: the user read first is the one that is updated.
+        user.avatar_url = avatar_url
+        return user
+
+    mock_user_repository.update_avatar.side_effect = update_avatar
+
+    await user_service.change_avatar(user.id, mock_file)
+
+    mock_image_storage.delete_image.assert_called_once_with("folder/oldimage")
+
+
+@pytest.mark.asyncio
+async def test_change_avatar_ends_transaction_before_upload(user_service, mock_user_repository, mock_image_storage):
+    calls = []
+    mock_user_repository.get_by_id.return_value = FakeUser(
+        id=1,
+        username="adminuser",
+        email="admin@user.com",
+        created_at=datetime.utcnow(),
+        email_confirmed=True,
+        avatar_url=None,
+        role="admin"
+    )
+    mock_file = MagicMock(spec=UploadFile)
+    mock_file.file = MagicMock()
+    mock_user_repository.end_transaction.side_effect = lambda: calls.append("end_transaction")
+    mock_image_storage.upload_image.side_effect = lambda file, options=None: calls.append("upload") or {
+        "secure_url": "https://example.com/images/folder/newimage.jpg"
+    }
+    mock_user_repository.update_avatar.return_value = mock_user_repository.get_by_id.return_value
+
+    await user_service.change_avatar(1, mock_file)
+
+    assert calls == ["end_transaction", "upload"]
+
+
+@pytest.mark.asyncio
+async def test_change_avatar_user_deleted_during_upload(user_service, mock_user_repository, mock_image_storage,
+                                                        mock_cache):
+    mock_user_repository.get_by_id.return_value = FakeUser(
+        id=1,
+        username="adminuser",
+        email="admin@user.com",
+        created_at=datetime.utcnow(),
+        email_confirmed=True,
+        avatar_url="https://example.com/images/folder/oldimage.jpg",
+        role="admin"
+    )
+    mock_file = MagicMock(spec=UploadFile)
+    mock_file.file = MagicMock()
+    mock_image_storage.upload_image.return_value = {"secure_url": "https://example.com/images/folder/newimage.jpg"}
+    mock_user_repository.update_avatar.return_value = None
+    background_tasks = BackgroundTasks()
+
+    assert await user_service.change_avatar(1, mock_file, background_tasks) is None
+
+    mock_cache.delete.assert_not_awaited()
+    await background_tasks()
+    mock_image_storage.delete_image.assert_called_once_with("folder/newimage")
+
+
+@pytest.mark.asyncio
+async def test_change_avatar_failed_upload_keeps_old_avatar(user_service, mock_user_repository, mock_image_storage):
+    fake_user = FakeUser(
+        id=1,
+        username="adminuser",
+        email="admin@user.com",
+        created_at=datetime.utcnow(),
+        email_confirmed=True,
+        avatar_url="https://example.com/images/folder/oldimage.jpg",
+        role="admin"
+    )
+    mock_file = MagicMock(spec=UploadFile)
+    mock_file.file = MagicMock()
+    mock_user_repository.get_by_id.return_value = fake_user
+    mock_image_storage.upload_image.side_effect = ConnectionError("upload failed")
+
+    with pytest.raises(ConnectionError):
+        await user_service.change_avatar(fake_user.id, mock_file, BackgroundTasks())
+
+    mock_user_repository.update_avatar.assert_not_called()
+    mock_image_storage.delete_image.assert_not_called()
+
+
+def test_delete_image_failure_is_logged(user_service, mock_image_storage, caplog):
+    mock_image_storage.delete_image.side_effect = ConnectionError("delete failed")
+
+    user_service._delete_image("folder/oldimage")
+
+    assert "Failed to delete avatar folder/oldimage" in caplog.text
+
+
 def test_extract_public_id(user_service):
     url = "https://example.com/images/user_avatars/old_pic.png"
     public_id = user_service._extract_public_id(url)
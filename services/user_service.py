@@ -1,18 +1,27 @@
+import logging
 from abc import ABC, abstractmethod
 from typing import Optional, Dict
 
-from fastapi import UploadFile, HTTPException
+from fastapi import BackgroundTasks, UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
 
 from schemas.users import UserOut
+from services.auth_service import ICache, user_cache_key
+
+logger = logging.getLogger("user_service")
 
 
 class IUserUpdateRepository(ABC):
     @abstractmethod
-    def get_by_id(self, user_id: int):
+    async def get_by_id(self, user_id: int):
+        pass
+
+    @abstractmethod
+    async def update_avatar(self, user_id: int, avatar_url: str):
         pass
 
     @abstractmethod
-    def update_avatar(self, user_id: int, avatar_url: str):
+    async def end_transaction(self):
         pass
 
 
@@ -27,29 +36,57 @@ class IImageStorage(ABC):
 
 
 class UserService:
-    def __init__(self, user_repository: IUserUpdateRepository, image_client: IImageStorage):
+    def __init__(self, user_repository: IUserUpdateRepository, image_client: IImageStorage, cache: ICache):
         self.user_repository = user_repository
         self.image_client = image_client
+        self.cache = cache
 
-    def change_avatar(self, user_id: int, file: UploadFile) -> Optional[UserOut]:
-        user = self.user_repository.get_by_id(user_id)
+    async def change_avatar(self, user_id: int, file: UploadFile,
+                            background_tasks: Optional[BackgroundTasks] = None) -> Optional[UserOut]:
+        user = await self.user_repository.get_by_id(user_id)
         if not user:
             return None
 
         if user.role != "admin":
             raise HTTPException(status_code=403, detail="Only admins can change their avatars.")
-
-        existing_avatar_url = getattr(user, "avatar_url", None)
-        if existing_avatar_url:
-            public_id = self._extract_public_id(existing_avatar_url)
-            self.image_client.delete_image(public_id)
-
-        upload_result = self.image_client.upload_image(file.file, options={"folder": "user_avatars"})
+        # Read before update_avatar, which changes the same user object when the session is shared.
+        existing_avatar_url = user.avatar_url
+        # The connection goes back to the pool instead of idling in a transaction during the upload.
+        await self.user_repository.end_transaction()
+
+        # The image storage client blocks on HTTP, so it runs in the threadpool instead of the event loop.
+        upload_result = await run_in_threadpool(
+            self.image_client.upload_image, file.file, options={"folder": "user_avatars"}
+        )
         avatar_url = upload_result.get("secure_url")
 
-        updated_user = self.user_repository.update_avatar(user_id, avatar_url)
+        updated_user = await self.user_repository.update_avatar(user_id, avatar_url)
+        if updated_user is None:
+            # The user was deleted during the upload: the new image belongs to no one, and the old
+            # one is left to whatever removed the user.
+            await self._schedule_image_deletion(self._extract_public_id(avatar_url), background_tasks)
+            return None
+        await self.cache.delete(user_cache_key(updated_user.username))
+
+        # The old image is deleted only once the new one is stored and saved.
+        if existing_avatar_url and existing_avatar_url != avatar_url:
+            await self._schedule_image_deletion(self._extract_public_id(existing_avatar_url), background_tasks)
         return UserOut.from_orm(updated_user)
 
+    async def _schedule_image_deletion(self, public_id: str, background_tasks: Optional[BackgroundTasks]):
+        # Deleted after the response when background tasks are given.
+        if background_tasks is not None:
+            background_tasks.add_task(self._delete_image, public_id)
+        else:
+            await run_in_threadpool(self._delete_image, public_id)
+
+    def _delete_image(self, public_id: str):
+        try:
+            self.image_client.delete_image(public_id)
+        except Exception as e:
+            # No user refers to the image any more; a leftover image is only wasted storage.
+            logger.warning(f"Failed to delete avatar {public_id}: {e}")
+
     @staticmethod
     def _extract_public_id(avatar_url: str) -> str:
         parts = avatar_url.split("/")
@@ -0,0 +1,3 @@
+<p>Hello ${username},</p>
+<p>Please confirm your email by clicking the link below:</p>
+<p><a href="${url}">${url}</a></p>
@@ -0,0 +1,4 @@
+Hello ${username},
+
+Please confirm your email by clicking the link below:
+${url}
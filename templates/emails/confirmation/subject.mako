@@ -0,0 +1 @@
+Confirm your email
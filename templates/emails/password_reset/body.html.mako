@@ -0,0 +1,4 @@
+<p>Hi,</p>
+<p>Click the link below to reset your password:</p>
+<p><a href="${url}">${url}</a></p>
+<p>If you did not request a password reset, please ignore this email.</p>
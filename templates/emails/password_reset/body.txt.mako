@@ -0,0 +1,6 @@
+Hi,
+
+Click the link below to reset your password:
+${url}
+
+If you did not request a password reset, please ignore this email.
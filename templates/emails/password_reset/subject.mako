@@ -0,0 +1 @@
+Password Reset Request